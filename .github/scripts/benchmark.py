@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+翻译流程检查与基准测试工具 - 基于本地模拟服务器运行 translate.py，无需消耗API额度
+
+用法：
+    python .github/scripts/benchmark.py parity                  # 线程引擎与异步引擎的结果一致性检查
+    python .github/scripts/benchmark.py parity --stream         # 同上，使用流式输出
+    python .github/scripts/benchmark.py stress                  # 高并发下每次调用的模型/温度选择是否互不干扰
+    python .github/scripts/benchmark.py stream-parse            # 长值、小分块下流式解析的结果与耗时
+    python .github/scripts/benchmark.py run                     # 对全量/智能翻译流程进行端到端基准测试
+    python .github/scripts/benchmark.py compare BASE.json HEAD.json  # 比较两次基准测试结果
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import random
+import tempfile
+import subprocess
+import urllib.request
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+sys.path.insert(0, SCRIPT_DIR)
+
+from mock_deepseek import MockDeepSeekServer, LATENCY_DISTRIBUTIONS  # noqa: E402
+
+BENCHMARK_DIR = os.path.join(SCRIPT_DIR, "cache", "benchmarks")
+BENCHMARK_MODES = ('full', 'smart')
+
+# 比较结果时各指标的优劣方向：True 表示越大越好
+METRIC_DIRECTIONS = {
+    'wall_time': False,
+    'requests_per_sec': True,
+    'keys_per_sec': True,
+    'latency_p50': False,
+    'latency_p95': False,
+    'latency_p99': False,
+    'api_calls': False,
+    'retries': False,
+    'backoff_time': False,
+    'hedge_tokens': False,
+    'first_key_p50': False,
+    'prompt_tokens': False,
+    'prompt_cache_hit_rate': True,
+    'cost_usd': False,
+    'peak_rss_mb': False,
+}
+
+def prepare_workspace(work_dir: str, languages: Optional[List[str]] = None):
+    """将源文件与翻译输出复制到临时目录，避免测试改动仓库中的文件
+
+    Args:
+        work_dir: 临时工作目录
+        languages: 只保留这些目标语言（None 表示保留 languages.json 中的全部语言）
+    """
+    shutil.copytree(os.path.join(REPO_ROOT, "Localization-Resource-Pack", "assets"),
+                    os.path.join(work_dir, "Localization-Resource-Pack", "assets"))
+    with open(os.path.join(REPO_ROOT, "Localization-Resource-Pack", "languages.json"), 'r', encoding='utf-8') as f:
+        target_languages = json.load(f)
+    if languages:
+        target_languages = {code: name for code, name in target_languages.items() if code in languages}
+    with open(os.path.join(work_dir, "Localization-Resource-Pack", "languages.json"), 'w', encoding='utf-8') as f:
+        json.dump(target_languages, f, ensure_ascii=False, indent=2)
+    translate_dir = os.path.join(REPO_ROOT, "translate")
+    if os.path.isdir(translate_dir):
+        shutil.copytree(translate_dir, os.path.join(work_dir, "translate"))
+
+def load_translate_module(work_dir: str, api_url: str, extra_env: Dict[str, str] = None):
+    """在临时目录中导入 translate.py（模块在导入时读取工作目录与环境变量）"""
+    os.chdir(work_dir)
+    os.environ['DEEPSEEK_API_URL'] = api_url
+    os.environ['TRANSLATION_MEMORY'] = 'false'  # 避免缓存掩盖真实请求
+    os.environ['TRANSLATION_BATCH_LEARNING'] = 'false'  # 每次都从默认统计开始，保证结果可比
+    os.environ['TRANSLATION_CHECKPOINT'] = 'false'  # 不重放也不写入仓库缓存目录中的检查点日志
+    for key, value in (extra_env or {}).items():
+        os.environ[key] = value
+    import translate
+    translate.DEEPSEEK_API_URL = api_url
+    # 清单默认位于脚本目录（即仓库中），改为临时目录中的路径，避免基准测试读写仓库中的清单
+    translate.SOURCE_MANIFEST_FILE = os.path.join(work_dir, ".github", "scripts", "state", "source_manifest.json")
+    return translate
+
+def build_requests(translate, translator, languages: List[str]) -> List:
+    """为所有命名空间和指定语言构建全量翻译请求"""
+    target_languages = translate.get_all_target_languages()
+    selected: List[Tuple[str, str]] = [(code, target_languages[code]) for code in languages if code in target_languages]
+    all_requests = []
+    for namespace in translate.get_namespace_list():
+        source_dict = translate.get_merged_reference_translations(namespace)
+        if not source_dict:
+            continue
+        prepared = translator.prepare_texts_for_translation(source_dict)
+        all_requests.extend(translator.prepare_translation_requests(prepared, selected, silent=True, namespace=namespace))
+    return all_requests
+
+def run_parity(args) -> int:
+    """分别使用线程引擎和异步引擎执行同一组请求，比较翻译结果与请求次数"""
+    server = MockDeepSeekServer(fail_first=args.fail_first)
+    api_url = server.start()
+    work_dir = tempfile.mkdtemp(prefix="translate-parity-")
+    try:
+        prepare_workspace(work_dir)
+        translate = load_translate_module(work_dir, api_url,
+                                          {'TRANSLATION_STREAM': 'true' if args.stream else 'false'})
+
+        outcomes = {}
+        for engine in translate.TRANSLATION_ENGINES:
+            translator = translate.DeepSeekTranslator("mock-key", engine=engine)
+            requests = build_requests(translate, translator, args.languages)
+            server.reset()
+            results = translator.execute_requests_concurrently(requests)
+            translator.finish_run()
+            outcomes[engine] = (results, server.request_count, len(requests))
+
+        thread_results, thread_calls, request_total = outcomes['thread']
+        async_results, async_calls, _ = outcomes['async']
+        print(f"请求数: {request_total}，API调用: thread={thread_calls} async={async_calls}")
+
+        mismatches = []
+        for namespace in sorted(set(thread_results) | set(async_results)):
+            for lang in sorted(set(thread_results.get(namespace, {})) | set(async_results.get(namespace, {}))):
+                left = thread_results.get(namespace, {}).get(lang)
+                right = async_results.get(namespace, {}).get(lang)
+                if left != right:
+                    mismatches.append(f"{namespace}/{lang}")
+        if thread_calls != async_calls:
+            mismatches.append(f"API调用次数不同: {thread_calls} != {async_calls}")
+
+        if mismatches:
+            print("✗ 引擎结果不一致:")
+            for item in mismatches:
+                print(f"  {item}")
+            return 1
+        print("✓ 线程引擎与异步引擎结果一致")
+        return 0
+    finally:
+        os.chdir(REPO_ROOT)
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_stream_parse(args) -> int:
+    """以不同分块大小将长值JSON输出喂给流式解析器，检查结果与 json.loads 一致且耗时与输出长度成线性关系
+
+    DeepSeek 流式输出每个分块约为一个token（几个字符），长字符串被反复从头扫描时耗时随分块数成倍增长
+    """
+    import translate
+
+    rng = random.Random(args.seed)
+    alphabet = 'abcdef ghij，。中文日本語é"\\\n\t/'
+    expected = {f"option.key_{index}": ''.join(rng.choice(alphabet) for _ in range(args.value_chars))
+                for index in range(args.keys)}
+    content = f"```json\n{json.dumps(expected, ensure_ascii=False, indent=2)}\n```"
+
+    start = time.process_time()
+    json.loads(content[len("```json\n"):-len("\n```")])
+    print(f"输出 {len(content)} 字符（{args.keys} 个键，每个值 {args.value_chars} 字符），json.loads {time.process_time() - start:.4f}s")
+
+    failures = []
+    for chunk_chars in sorted(args.chunk_sizes):
+        parser = translate.StreamingObjectParser()
+        parsed = []
+        start = time.process_time()
+        for offset in range(0, len(content), chunk_chars):
+            parsed.extend(parser.feed(content[offset:offset + chunk_chars]))
+        elapsed = time.process_time() - start
+        print(f"  分块 {chunk_chars:>3} 字符：{math.ceil(len(content) / chunk_chars)} 次 feed，CPU {elapsed:.4f}s")
+        if dict(parsed) != expected or len(parsed) != len(expected):
+            failures.append(f"分块 {chunk_chars} 字符的解析结果与 json.loads 不一致")
+        if elapsed > args.max_seconds:
+            failures.append(f"分块 {chunk_chars} 字符耗时 {elapsed:.2f}s 超过上限 {args.max_seconds}s")
+
+    if failures:
+        print("✗ 流式解析检查失败:")
+        for item in failures:
+            print(f"  {item}")
+        return 1
+    print("✓ 各分块大小的解析结果一致，耗时均在上限内")
+    return 0
+
+def run_stress(args) -> int:
+    """在数百个并发请求下检查模型与温度的选择只取决于请求自身的验证失败次数
+
+    模拟服务器对基础模型的请求一律返回空结果：每个请求都应按温度序列以基础模型调用，
+    验证失败达到切换次数后改用另一种模式并成功。若某个请求的模式切换影响了其他并发请求，
+    服务器端按“模型@温度”统计的调用次数就会偏离期望值。
+    """
+    work_dir = tempfile.mkdtemp(prefix="translate-stress-")
+    server = None
+    try:
+        prepare_workspace(work_dir)
+        env = {
+            'TRANSLATION_INITIAL_CONCURRENCY': str(args.workers),
+            'TRANSLATION_MAX_CONCURRENCY': str(args.workers),
+        }
+        translate = load_translate_module(work_dir, "http://127.0.0.1:0/chat/completions", env)
+        failed = False
+        for engine in translate.TRANSLATION_ENGINES:
+            translator = translate.DeepSeekTranslator("mock-key", engine=engine)
+            base_model = translator.base_config.model
+            server = MockDeepSeekServer(latency=args.latency, latency_distribution='lognormal', latency_spread=0.5,
+                                        seed=args.seed, fail_models={base_model})
+            translate.DEEPSEEK_API_URL = server.start()
+            languages = args.languages or list(translate.get_all_target_languages())
+            requests = build_requests(translate, translator, languages)
+
+            # 每个请求的期望调用序列：基础模型依次失败，直到切换到另一种模式
+            expected_sequence: List[str] = []
+            for validation_failures in range(translator.retry_policy.budget('validation')):
+                config = translator._attempt_config(validation_failures)
+                expected_sequence.append(f"{config.model}@{config.temperature}")
+                if config.model != base_model:
+                    break
+            expected = {config: count * len(requests) for config, count in Counter(expected_sequence).items()}
+            expected_keys = sum(len(translator._core_key_order(request.texts)) for request in requests)
+
+            start_time = time.perf_counter()
+            results = translator.execute_requests_concurrently(requests)
+            wall_time = time.perf_counter() - start_time
+            translator.finish_run()
+            actual = server.stats()['configs']
+            translated_keys = sum(len(translations) for by_lang in results.values() for translations in by_lang.values())
+            server.stop()
+            server = None
+
+            print(f"[{engine}] {len(requests)} 个请求，并发上限 {args.workers}，峰值并发 {translator.concurrency_limiter.peak_in_flight}，"
+                  f"耗时 {wall_time:.2f}s，完成 {translated_keys}/{expected_keys} 个键")
+            for config in sorted(set(expected) | set(actual)):
+                marker = "✓" if expected.get(config, 0) == actual.get(config, 0) else "✗"
+                print(f"  {marker} {config}: 期望 {expected.get(config, 0)}，实际 {actual.get(config, 0)}")
+            if actual != expected or translated_keys != expected_keys:
+                failed = True
+
+        if failed:
+            print("✗ 模型/温度选择受到并发请求干扰")
+            return 1
+        print("✓ 所有请求的模型/温度选择均与其自身的重试次数一致")
+        return 0
+    finally:
+        os.chdir(REPO_ROOT)
+        if server is not None:
+            server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def git_output(args: List[str], cwd: str = REPO_ROOT) -> str:
+    result = subprocess.run(['git', *args], capture_output=True, text=True, cwd=cwd)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+def prepare_smart_history(work_dir: str, change_count: int):
+    """在临时目录中构造两次提交：基线 + 修改若干源文本，使智能翻译模式检测到键级差异"""
+    def git(*args):
+        subprocess.run(['git', *args], cwd=work_dir, check=True, capture_output=True)
+
+    git('init', '-q')
+    git('config', 'user.email', 'benchmark@localhost')
+    git('config', 'user.name', 'benchmark')
+    git('add', '-A')
+    git('commit', '-q', '-m', 'baseline')
+
+    assets_dir = os.path.join(work_dir, "Localization-Resource-Pack", "assets")
+    source_files = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(assets_dir) if os.path.basename(root) == 'lang'
+        for name in files if name.endswith('.json')
+    )
+    contents = []
+    for path in source_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            contents.append((path, json.load(f)))
+
+    # 在各源文件之间轮流修改，直到达到指定数量
+    changed = 0
+    offsets = [0] * len(contents)
+    while changed < change_count and any(offsets[i] < len(data) for i, (_, data) in enumerate(contents)):
+        for i, (_, data) in enumerate(contents):
+            if changed >= change_count or offsets[i] >= len(data):
+                continue
+            key = list(data)[offsets[i]]
+            offsets[i] += 1
+            if isinstance(data[key], str) and data[key]:
+                data[key] = f"{data[key]}（已修改）"
+                changed += 1
+
+    for path, data in contents:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    git('commit', '-q', '-am', f'modify {changed} source texts')
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def run_scenario(args) -> int:
+    """在子进程中执行单个基准场景（由 run 子命令调用），结果写入 --result-file"""
+    import resource
+
+    work_dir = tempfile.mkdtemp(prefix=f"translate-bench-{args.mode}-")
+    try:
+        prepare_workspace(work_dir, args.languages)
+        translate = load_translate_module(work_dir, args.api_url, {
+            'FORCE_TRANSLATE': 'true' if args.mode == 'full' else 'false',
+            'TRANSLATION_LANGUAGE_GROUPS': args.language_groups,
+            'TRANSLATION_PROMPT_LAYOUT': args.prompt_layout,
+            'TRANSLATION_HEDGE': 'true' if args.hedge_percentile > 0 else 'false',
+            'TRANSLATION_HEDGE_PERCENTILE': str(args.hedge_percentile),
+            'TRANSLATION_HEDGE_MODEL': args.hedge_model,
+            'TRANSLATION_STREAM': 'true' if args.stream else 'false',
+            'TRANSLATION_SCHEDULE': args.schedule,
+            'TRANSLATION_DEDUP': 'false' if args.no_dedup else 'true',
+            **({'TRANSLATION_INITIAL_CONCURRENCY': str(args.concurrency),
+                'TRANSLATION_MAX_CONCURRENCY': str(args.concurrency)} if args.concurrency else {}),
+        })
+        if args.mode == 'smart':
+            if args.smart_detection == 'manifest':
+                # 以修改前的源文本生成清单，模拟已稳定运行过的仓库
+                translate.TranslationWorkspace().flush()
+            prepare_smart_history(work_dir, args.smart_changes)
+        translator = translate.DeepSeekTranslator("mock-key", engine=args.engine)
+
+        # 与 main() 相同：工作区加载与写回计入总耗时
+        start_time = time.perf_counter()
+        workspace = translate.TranslationWorkspace()
+        try:
+            if args.mode == 'full':
+                translate.run_full_translation(translator, workspace)
+            else:
+                translate.run_smart_translation(translator, workspace)
+        finally:
+            workspace.flush()
+            translator.finish_run()
+        wall_time = time.perf_counter() - start_time
+
+        latencies = list(translator.transport.stats.latencies)
+        if translator.async_transport is not None and translator.async_transport.stats is not translator.transport.stats:
+            latencies.extend(translator.async_transport.stats.latencies)
+        stats = translator.run_stats
+        usage_report = translator.usage_ledger.report()
+        usage = usage_report['totals']
+        usage_by_outcome = usage_report['by_outcome']
+        retries = stats['api_failures'] + stats['validation_failures']
+        metrics = {
+            'engine': translator.engine,
+            'wall_time': round(wall_time, 3),
+            'translation_requests': stats['requests_completed'],
+            'api_calls': stats['api_calls'],
+            'keys_translated': stats['keys_translated'],
+            'requests_per_sec': round(stats['api_calls'] / wall_time, 2) if wall_time > 0 else 0,
+            'keys_per_sec': round(stats['keys_translated'] / wall_time, 2) if wall_time > 0 else 0,
+            'latency_p50': round(percentile(latencies, 50), 4),
+            'latency_p95': round(percentile(latencies, 95), 4),
+            'latency_p99': round(percentile(latencies, 99), 4),
+            'retries': retries,
+            'api_failures': stats['api_failures'],
+            'validation_failures': stats['validation_failures'],
+            'group_calls': stats['group_calls'],
+            'group_fallbacks': stats['group_fallbacks'],
+            'prompt_tokens': stats['prompt_tokens'],
+            'completion_tokens': stats['completion_tokens'],
+            'prompt_cache_hit_rate': round(stats['prompt_cache_hit_tokens'] / stats['prompt_tokens'], 4) if stats['prompt_tokens'] else 0,
+            'retry_tokens': usage['retry_tokens'],
+            'cost_usd': usage['cost'],
+            'api_failures_by_class': {k[len('api_failures_'):]: v for k, v in stats.items() if k.startswith('api_failures_')},
+            'backoff_time': round(sum(translator.retry_policy.backoff_time.values()), 3),
+            'hedges_fired': translator.hedger.counts['fired'],
+            'hedges_won': translator.hedger.counts['won'],
+            'hedge_tokens': int(sum(usage_by_outcome.get('hedge', {}).get(name, 0) for name in ('prompt_tokens', 'completion_tokens'))),
+            'stream_calls': translator.stream_stats.calls,
+            'stream_aborts': translator.stream_stats.aborts,
+            'first_key_p50': round(translator.stream_stats.first_key_percentile(50), 4),
+            'stream_saved_tokens': int(translator.stream_stats.saved_tokens),
+            'breaker_opens': translator.circuit_breaker.opens,
+            'breaker_pause_time': round(translator.circuit_breaker.paused_time, 3),
+            'peak_window': translator.concurrency_limiter.peak_in_flight,
+            'schedule': translator.schedule_report(),
+            'dedup_keys': translator.source_dedup.duplicate_keys,
+            'untranslatable_keys': translator.source_dedup.untranslatable_keys,
+            'dedup_saved_tokens': int(translator.source_dedup.saved_tokens),
+            'files_parsed': workspace.source_files_parsed + workspace.translation_files_parsed,
+            'files_written': translate.FILE_WRITE_STATS.written,
+            'files_unchanged': translate.FILE_WRITE_STATS.unchanged,
+            'io_time': round(workspace.load_time + workspace.write_time, 3),
+            'git_spawns': translate.GIT_STATS.spawns,
+            'git_time': round(translate.GIT_STATS.time, 3),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        return 0
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def start_mock_process(args) -> Tuple[subprocess.Popen, str]:
+    """以独立进程启动模拟服务器，避免服务器线程与被测流程争用GIL"""
+    command = [
+        sys.executable, os.path.join(SCRIPT_DIR, "mock_deepseek.py"), '--port', '0',
+        '--latency', str(args.latency), '--latency-distribution', args.latency_distribution,
+        '--latency-spread', str(args.latency_spread), '--latency-per-token', str(args.latency_per_token),
+        '--rate-limit-rate', str(args.rate_limit_rate),
+        '--server-error-rate', str(args.server_error_rate), '--malformed-rate', str(args.malformed_rate),
+        '--bad-value-rate', str(args.bad_value_rate), '--fail-first', str(args.fail_first), '--seed', str(args.seed),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, encoding='utf-8')
+    line = process.stdout.readline()
+    if ': ' not in line:
+        process.kill()
+        raise RuntimeError(f"模拟服务器启动失败: {line!r}")
+    return process, line.split(': ', 1)[1].strip()
+
+def mock_call(api_url: str, path: str, method: str = 'GET') -> Dict:
+    base_url = api_url.rsplit('/chat/completions', 1)[0]
+    request = urllib.request.Request(base_url + path, data=b'' if method == 'POST' else None, method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+def run_benchmark(args) -> int:
+    """依次在子进程中运行各基准场景，汇总结果并保存为以提交哈希命名的JSON文件"""
+    process, api_url = start_mock_process(args)
+    commit = git_output(['rev-parse', '--short', 'HEAD']) or 'unknown'
+    dirty = bool(git_output(['status', '--porcelain', '--untracked-files=no']))
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {
+            'engine': args.engine or os.getenv('TRANSLATION_ENGINE', 'thread'),
+            'languages': args.languages or 'all',
+            'smart_changes': args.smart_changes,
+            'smart_detection': args.smart_detection,
+            'language_groups': args.language_groups,
+            'prompt_layout': args.prompt_layout,
+            'hedge_percentile': args.hedge_percentile,
+            'hedge_model': args.hedge_model,
+            'stream': args.stream,
+            'schedule': args.schedule,
+            'dedup': not args.no_dedup,
+            'concurrency': args.concurrency or 'adaptive',
+            'latency': args.latency,
+            'latency_distribution': args.latency_distribution,
+            'latency_spread': args.latency_spread,
+            'latency_per_token': args.latency_per_token,
+            'rate_limit_rate': args.rate_limit_rate,
+            'server_error_rate': args.server_error_rate,
+            'malformed_rate': args.malformed_rate,
+            'bad_value_rate': args.bad_value_rate,
+            'fail_first': args.fail_first,
+            'seed': args.seed,
+        },
+        'scenarios': {}
+    }
+    try:
+        for mode in args.modes:
+            mock_call(api_url, '/reset', 'POST')
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as handle:
+                result_file = handle.name
+            command = [sys.executable, os.path.abspath(__file__), 'scenario', '--mode', mode,
+                       '--api-url', api_url, '--smart-changes', str(args.smart_changes),
+                       '--smart-detection', args.smart_detection, '--language-groups', args.language_groups,
+                       '--prompt-layout', args.prompt_layout, '--hedge-percentile', str(args.hedge_percentile),
+                       '--hedge-model', args.hedge_model, '--schedule', args.schedule,
+                       '--concurrency', str(args.concurrency), '--result-file', result_file]
+            if args.engine:
+                command += ['--engine', args.engine]
+            if args.stream:
+                command.append('--stream')
+            if args.no_dedup:
+                command.append('--no-dedup')
+            if args.languages:
+                command += ['--languages', *args.languages]
+            print(f"运行场景 {mode} ...", flush=True)
+            completed = subprocess.run(command, cwd=REPO_ROOT,
+                                       stdout=None if args.verbose else subprocess.DEVNULL)
+            try:
+                if completed.returncode != 0:
+                    print(f"✗ 场景 {mode} 执行失败（退出码 {completed.returncode}）")
+                    return 1
+                with open(result_file, 'r', encoding='utf-8') as f:
+                    metrics = json.load(f)
+            finally:
+                os.unlink(result_file)
+            metrics['server'] = mock_call(api_url, '/stats')
+            report['scenarios'][mode] = metrics
+            print(f"  {metrics['wall_time']:.2f}s，{metrics['requests_per_sec']} 请求/秒，{metrics['keys_per_sec']} 键/秒，"
+                  f"延迟 p50/p95/p99 = {metrics['latency_p50']:.3f}/{metrics['latency_p95']:.3f}/{metrics['latency_p99']:.3f}s，"
+                  f"重试 {metrics['retries']} 次，上下文缓存命中率 {metrics['prompt_cache_hit_rate']:.1%}，峰值内存 {metrics['peak_rss_mb']} MB")
+            if metrics.get('hedges_fired'):
+                print(f"  对冲 {metrics['hedges_fired']} 次（对冲先返回 {metrics['hedges_won']} 次），对冲消耗 {metrics['hedge_tokens']} token")
+            schedule = metrics.get('schedule')
+            if schedule:
+                predicted, actual = schedule['predicted_critical'], schedule['actual_critical']
+                print(f"  调度 {schedule['policy']}（峰值并发 {schedule['concurrency']}）关键路径："
+                      f"预测 {schedule['predicted_makespan']:.2f}s（{predicted['request']}，{predicted['start']:.2f}s 开始，耗时 {predicted['duration']:.2f}s），"
+                      f"实际 {schedule['actual_makespan']:.2f}s（{actual['request']}，{actual['start']:.2f}s 开始，耗时 {actual['duration']:.2f}s）")
+            if metrics.get('dedup_keys') or metrics.get('untranslatable_keys'):
+                print(f"  源文本去重：合并 {metrics['dedup_keys']} 个重复文本，跳过 {metrics['untranslatable_keys']} 个无需翻译的文本，"
+                      f"估算节省输出 {metrics['dedup_saved_tokens']} token")
+            if metrics.get('stream_calls'):
+                print(f"  流式调用 {metrics['stream_calls']} 次，首个键耗时 p50 {metrics['first_key_p50']:.3f}s，"
+                      f"提前中止 {metrics['stream_aborts']} 次（估算节省输出 {metrics['stream_saved_tokens']} token）")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ 结果已保存到 {output}")
+    return 0
+
+def run_compare(args) -> int:
+    """比较两次基准测试结果，劣化超过阈值的指标返回非零退出码"""
+    with open(args.base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, 'r', encoding='utf-8') as f:
+        head = json.load(f)
+    if base.get('config') != head.get('config'):
+        print("⚠️ 两次测试的配置不同，结果可能不可比")
+
+    regressions = []
+    print(f"基线 {base.get('commit')} -> 对比 {head.get('commit')}")
+    for mode in sorted(set(base['scenarios']) & set(head['scenarios'])):
+        print(f"[{mode}]")
+        for metric, higher_is_better in METRIC_DIRECTIONS.items():
+            old = base['scenarios'][mode].get(metric)
+            new = head['scenarios'][mode].get(metric)
+            if old is None or new is None:
+                continue
+            if old:
+                change = (new - old) / old * 100
+            else:
+                change = 0.0 if new == old else math.copysign(math.inf, new - old)
+            worse = change < -args.threshold if higher_is_better else change > args.threshold
+            marker = " ✗" if worse else ""
+            print(f"  {metric:<18} {old:>10} -> {new:<10} ({change:+.1f}%){marker}")
+            if worse:
+                regressions.append(f"{mode}.{metric}")
+
+    if regressions:
+        print(f"✗ 超过 {args.threshold}% 的劣化: {', '.join(regressions)}")
+        return 1
+    print("✓ 未发现超过阈值的劣化")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="翻译流程检查与基准测试工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parity = subparsers.add_parser('parity', help="检查线程引擎与异步引擎的结果一致性")
+    parity.add_argument('--languages', nargs='+', default=['en_us', 'ja_jp', 'de_de'],
+                        help="参与检查的目标语言")
+    parity.add_argument('--fail-first', type=int, default=1,
+                        help="模拟服务器对每个请求内容的前 N 次响应返回缺少键的结果，以覆盖验证重试路径")
+    parity.add_argument('--stream', action='store_true', help="以流式输出执行两个引擎")
+    parity.set_defaults(handler=run_parity)
+
+    stress = subparsers.add_parser('stress', help="检查高并发下每次调用的模型/温度选择互不干扰")
+    stress.add_argument('--workers', type=int, default=300, help="并发上限（线程数）")
+    stress.add_argument('--languages', nargs='+', default=None, help="参与检查的目标语言，默认全部")
+    stress.add_argument('--latency', type=float, default=0.05, help="模拟服务器平均响应延迟（秒）")
+    stress.add_argument('--seed', type=int, default=0, help="延迟抽样的随机数种子")
+    stress.set_defaults(handler=run_stress)
+
+    stream_parse = subparsers.add_parser('stream-parse', help="检查长值、小分块下流式解析的结果与耗时")
+    stream_parse.add_argument('--keys', type=int, default=40, help="输出中的键数")
+    stream_parse.add_argument('--value-chars', type=int, default=1000, help="每个值的字符数（含引号、反斜杠等转义字符）")
+    stream_parse.add_argument('--chunk-sizes', type=int, nargs='+', default=[1, 3, 16, 50], help="每次 feed 的字符数")
+    stream_parse.add_argument('--max-seconds', type=float, default=0.5, help="单个分块大小允许的CPU耗时上限（秒）")
+    stream_parse.add_argument('--seed', type=int, default=0, help="随机值的种子")
+    stream_parse.set_defaults(handler=run_stream_parse)
+
+    run = subparsers.add_parser('run', help="使用模拟服务器对全量/智能翻译流程进行端到端基准测试")
+    run.add_argument('--modes', nargs='+', choices=BENCHMARK_MODES, default=list(BENCHMARK_MODES),
+                     help="要运行的场景：full（FORCE_TRANSLATE 全量翻译）、smart（基于Git差异的智能翻译）")
+    run.add_argument('--engine', choices=('thread', 'async'), default=None, help="并发引擎，默认读取 TRANSLATION_ENGINE")
+    run.add_argument('--languages', nargs='+', default=None, help="只测试这些目标语言，默认全部")
+    run.add_argument('--smart-changes', type=int, default=30, help="smart 场景中修改的源文本数量")
+    run.add_argument('--smart-detection', choices=('manifest', 'git'), default='manifest',
+                     help="smart 场景的变更检测方式：manifest（预先生成源文本清单）或 git（无清单，回退到Git差异）")
+    run.add_argument('--language-groups', default='false',
+                     help="多语言分组（TRANSLATION_LANGUAGE_GROUPS）：false、true 或自定义分组如 es_es+es_mx,fr_fr+fr_ca")
+    run.add_argument('--prompt-layout', choices=('prefix', 'template'), default='prefix',
+                     help="提示词布局（TRANSLATION_PROMPT_LAYOUT）：prefix（共享前缀）或 template（按模板原样替换）")
+    run.add_argument('--hedge-percentile', type=float, default=0,
+                     help="对冲请求的延迟分位数（TRANSLATION_HEDGE_PERCENTILE），0 表示不启用对冲")
+    run.add_argument('--hedge-model', default='', help="对冲调用使用的模型（TRANSLATION_HEDGE_MODEL），默认与原调用相同")
+    run.add_argument('--stream', action='store_true', help="启用流式输出（TRANSLATION_STREAM）")
+    run.add_argument('--schedule', choices=('lpt', 'plan'), default='lpt', help="请求调度策略（TRANSLATION_SCHEDULE）")
+    run.add_argument('--concurrency', type=int, default=0, help="固定并发上限（0 表示使用自适应并发窗口）")
+    run.add_argument('--no-dedup', action='store_true', help="关闭源文本去重（TRANSLATION_DEDUP=false）")
+    run.add_argument('--latency', type=float, default=0.05, help="模拟服务器平均响应延迟（秒）")
+    run.add_argument('--latency-distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal', help="延迟分布")
+    run.add_argument('--latency-spread', type=float, default=0.5, help="延迟分布的离散程度")
+    run.add_argument('--latency-per-token', type=float, default=0.0, help="按输出token数追加的生成耗时（秒/token）")
+    run.add_argument('--rate-limit-rate', type=float, default=0.0, help="注入 429 的概率")
+    run.add_argument('--server-error-rate', type=float, default=0.0, help="注入 5xx 的概率")
+    run.add_argument('--malformed-rate', type=float, default=0.0, help="注入格式错误输出的概率")
+    run.add_argument('--bad-value-rate', type=float, default=0.0, help="注入值类型错误（某个键的值为数组）的概率")
+    run.add_argument('--fail-first', type=int, default=0, help="每个请求内容前 N 次返回缺少键的结果")
+    run.add_argument('--seed', type=int, default=0, help="故障注入的随机数种子")
+    run.add_argument('--output', default=None, help="结果文件路径，默认 .github/scripts/cache/benchmarks/<提交哈希>.json")
+    run.add_argument('--verbose', action='store_true', help="显示被测流程的日志输出")
+    run.set_defaults(handler=run_benchmark)
+
+    compare = subparsers.add_parser('compare', help="比较两次基准测试结果")
+    compare.add_argument('base', help="基线结果文件")
+    compare.add_argument('head', help="对比结果文件")
+    compare.add_argument('--threshold', type=float, default=10.0, help="视为劣化的变化百分比")
+    compare.set_defaults(handler=run_compare)
+
+    scenario = subparsers.add_parser('scenario', help="（内部）在子进程中运行单个场景")
+    scenario.add_argument('--mode', choices=BENCHMARK_MODES, required=True)
+    scenario.add_argument('--api-url', required=True)
+    scenario.add_argument('--engine', choices=('thread', 'async'), default=None)
+    scenario.add_argument('--languages', nargs='+', default=None)
+    scenario.add_argument('--smart-changes', type=int, default=30)
+    scenario.add_argument('--smart-detection', choices=('manifest', 'git'), default='manifest')
+    scenario.add_argument('--language-groups', default='false')
+    scenario.add_argument('--prompt-layout', choices=('prefix', 'template'), default='prefix')
+    scenario.add_argument('--hedge-percentile', type=float, default=0)
+    scenario.add_argument('--hedge-model', default='')
+    scenario.add_argument('--stream', action='store_true')
+    scenario.add_argument('--schedule', choices=('lpt', 'plan'), default='lpt')
+    scenario.add_argument('--concurrency', type=int, default=0)
+    scenario.add_argument('--no-dedup', action='store_true')
+    scenario.add_argument('--result-file', required=True)
+    scenario.set_defaults(handler=run_scenario)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+DeepSeek API 本地模拟服务器 - 在不消耗API额度的情况下测试翻译流程
+
+实现 /chat/completions 接口：从用户提示词中取出待翻译的JSON，
+对每个值做确定性的伪翻译（添加目标语言标记，保留占位符）后按 DeepSeek 响应格式返回；
+多语言分组请求返回以语言代码为顶层键的JSON对象。
+模拟 DeepSeek 上下文缓存：与此前请求相同的前缀（按缓存单元对齐）计入 prompt_cache_hit_tokens。
+可配置响应延迟分布，并按比例注入 429/5xx 错误、格式错误的模型输出与值类型错误的键；
+请求体中 "stream": true 时以 SSE 分块返回（延迟分摊到各分块之间，客户端中途断开时停止发送）；
+GET /stats 返回服务器端计数，POST /reset 清空计数。
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+JSON_BLOCK_PATTERN = re.compile(r"```json\s*\n(.*?)\n\s*```", re.DOTALL)
+TARGET_LANGUAGE_PATTERN = re.compile(r"翻译(?:成|为)(.+?)[：:。]")
+GROUP_LANGUAGES_PATTERN = re.compile(r"语言代码依次为：(.+)")
+GROUP_LANGUAGE_ITEM_PATTERN = re.compile(r"([a-z]{2,3}_[a-z]{2,3})（([^）]+)）")
+CACHE_UNIT_CHARS = 128  # 缓存单元（模拟计数中每2个字符计1个token，即64个token）
+STREAM_CHUNK_CHARS = 16  # 流式响应每个分块的输出字符数
+STREAM_FIRST_CHUNK_SHARE = 0.2  # 流式响应在首个分块前等待的延迟比例（模拟排队与思考），其余分摊到各分块之间
+
+def extract_source_json(user_prompt: str) -> Optional[Dict]:
+    """从用户提示词中提取待翻译的JSON（取最后一个可解析的 ```json 代码块，否则取首尾大括号之间的内容）"""
+    for block in reversed(JSON_BLOCK_PATTERN.findall(user_prompt)):
+        try:
+            data = json.loads(block)
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            continue
+    start = user_prompt.find('{')
+    end = user_prompt.rfind('}')
+    if start != -1 and end > start:
+        try:
+            data = json.loads(user_prompt[start:end + 1])
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+    return None
+
+def pseudo_translate(source: Dict, target_language: str) -> Dict[str, str]:
+    """确定性伪翻译：列表取第一个元素，值前添加目标语言标记"""
+    translated = {}
+    for key, value in source.items():
+        if isinstance(value, list):
+            value = value[0] if value else ""
+        translated[key] = f"[{target_language}] {value}" if value else ""
+    return translated
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # 默认的 listen 队列只有5，高并发同时建连时会溢出导致连接被重置
+    request_queue_size = 512
+
+class MockDeepSeekServer:
+    """可在进程内启动的模拟服务器
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示自动分配
+        fail_first: 每个不同的请求内容前 N 次返回缺少键的结果（用于触发验证重试）
+        latency: 平均响应延迟（秒）
+        latency_distribution: 延迟分布，fixed / uniform（latency ± latency_spread）/ lognormal（latency_spread 为对数标准差）
+        latency_spread: 延迟分布的离散程度
+        latency_per_token: 成功响应按输出token数追加的生成耗时（秒/token），使大批次的响应更慢
+        rate_limit_rate: 返回 429 的概率
+        server_error_rate: 返回 500/502/503 的概率
+        malformed_rate: 返回无法解析的模型输出（截断JSON或纯文本）的概率
+        bad_value_rate: 将输出中位于三分之一处的键的值改为数组的概率（用于触发流式输出的提前中止）
+        seed: 随机数种子，保证同一配置下注入的故障序列可复现
+        fail_models: 对这些模型的请求一律返回空的翻译结果（用于触发验证失败后的温度调整与模式切换）
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fail_first: int = 0,
+                 latency: float = 0.0, latency_distribution: str = 'fixed', latency_spread: float = 0.0,
+                 latency_per_token: float = 0.0, rate_limit_rate: float = 0.0, server_error_rate: float = 0.0,
+                 malformed_rate: float = 0.0, bad_value_rate: float = 0.0, seed: int = 0, fail_models: Iterable[str] = ()):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延迟分布: {latency_distribution}")
+        self.fail_first = fail_first
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.latency_per_token = latency_per_token
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.malformed_rate = malformed_rate
+        self.bad_value_rate = bad_value_rate
+        self.fail_models = set(fail_models)
+        self.request_count = 0
+        self.content_counts: Counter = Counter()
+        self.model_counts: Counter = Counter()
+        self.config_counts: Counter = Counter()  # "模型@温度" -> 请求次数
+        self.status_counts: Counter = Counter()
+        self.injected_counts: Counter = Counter()
+        self.stream_counts: Counter = Counter()  # completed 发送完毕 / aborted 客户端中途断开
+        self.prefix_cache = set()
+        self.cache_hit_tokens = 0
+        self.cache_miss_tokens = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _MockHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/chat/completions"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def reset(self):
+        """清空请求计数（包括 fail_first 的计数）"""
+        with self._lock:
+            self.request_count = 0
+            self.content_counts.clear()
+            self.model_counts.clear()
+            self.config_counts.clear()
+            self.status_counts.clear()
+            self.injected_counts.clear()
+            self.stream_counts.clear()
+            self.prefix_cache.clear()
+            self.cache_hit_tokens = 0
+            self.cache_miss_tokens = 0
+
+    def stats(self) -> Dict:
+        """服务器端计数"""
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "models": dict(self.model_counts),
+                "configs": dict(self.config_counts),
+                "statuses": {str(k): v for k, v in self.status_counts.items()},
+                "injected": dict(self.injected_counts),
+                "streams": dict(self.stream_counts),
+                "cache_hit_tokens": self.cache_hit_tokens,
+                "cache_miss_tokens": self.cache_miss_tokens
+            }
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def sample_latency(self) -> float:
+        """按配置的分布抽取一次响应延迟"""
+        if self.latency <= 0:
+            return 0.0
+        with self._lock:
+            if self.latency_distribution == 'uniform':
+                return max(0.0, self._random.uniform(self.latency - self.latency_spread, self.latency + self.latency_spread))
+            if self.latency_distribution == 'lognormal':
+                # 取 mu 使分布均值等于 latency
+                mu = math.log(self.latency) - self.latency_spread ** 2 / 2
+                return self._random.lognormvariate(mu, self.latency_spread)
+            return self.latency
+
+    def pick_fault(self) -> Optional[str]:
+        """按配置的概率决定本次请求注入的故障类型"""
+        with self._lock:
+            roll = self._random.random()
+            for fault, rate in (('rate_limit', self.rate_limit_rate),
+                                ('server_error', self.server_error_rate),
+                                ('malformed', self.malformed_rate),
+                                ('bad_value', self.bad_value_rate)):
+                if roll < rate:
+                    self.injected_counts[fault] += 1
+                    return fault
+                roll -= rate
+            return None
+
+    def handle(self, payload: Dict) -> Tuple[int, Union[Dict, Iterator[bytes]], Dict[str, str]]:
+        """处理一次请求，返回 (状态码, 响应体, 额外响应头)；成功的流式请求的响应体为 SSE 事件的迭代器"""
+        streaming = bool(payload.get('stream'))
+        latency = self.sample_latency()
+        time.sleep(latency * STREAM_FIRST_CHUNK_SHARE if streaming else latency)
+        fault = self.pick_fault()
+        if fault == 'rate_limit':
+            status, body, headers = 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": "1"}
+        elif fault == 'server_error':
+            with self._lock:
+                status = self._random.choice((500, 502, 503))
+            body, headers = {"error": {"message": "Server is busy", "type": "server_error"}}, {}
+        else:
+            status, body, headers = 200, self.build_response(payload, malformed=(fault == 'malformed'),
+                                                             bad_value=(fault == 'bad_value')), {}
+            generation = body['usage']['completion_tokens'] * self.latency_per_token
+            if streaming:
+                body = self.stream_events(body, latency * (1 - STREAM_FIRST_CHUNK_SHARE) + generation)
+            else:
+                time.sleep(generation)
+        with self._lock:
+            self.status_counts[status] += 1
+            if status != 200:
+                self.request_count += 1
+        return status, body, headers
+
+    def lookup_prefix_cache(self, prompt: str) -> int:
+        """返回与此前请求共享的前缀字符数（按缓存单元对齐），并缓存本次请求的全部前缀"""
+        digest = hashlib.sha256()
+        prefix_hashes = []
+        for start in range(0, len(prompt) - CACHE_UNIT_CHARS + 1, CACHE_UNIT_CHARS):
+            digest.update(prompt[start:start + CACHE_UNIT_CHARS].encode('utf-8'))
+            prefix_hashes.append(digest.hexdigest())
+        hit_units = 0
+        with self._lock:
+            for prefix_hash in prefix_hashes:
+                if prefix_hash not in self.prefix_cache:
+                    break
+                hit_units += 1
+            self.prefix_cache.update(prefix_hashes)
+        return hit_units * CACHE_UNIT_CHARS
+
+    def build_response(self, payload: Dict, malformed: bool = False, bad_value: bool = False) -> Dict:
+        """根据请求体生成 chat.completion 响应"""
+        messages = payload.get('messages', [])
+        system_prompt = next((m['content'] for m in messages if m.get('role') == 'system'), "")
+        user_prompt = next((m['content'] for m in messages if m.get('role') == 'user'), "")
+        model = payload.get('model', 'deepseek-chat')
+
+        content_hash = hashlib.sha256(user_prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            self.request_count += 1
+            self.content_counts[content_hash] += 1
+            self.model_counts[model] += 1
+            self.config_counts[f"{model}@{payload.get('temperature')}"] += 1
+            occurrence = self.content_counts[content_hash]
+
+        source = extract_source_json(user_prompt) or {}
+        group_match = GROUP_LANGUAGES_PATTERN.search(user_prompt)
+        if group_match:
+            # 分组请求：每种语言的伪翻译与单语言请求相同，fail_first 只影响第一种语言
+            languages = GROUP_LANGUAGE_ITEM_PATTERN.findall(group_match.group(1))
+            output = {code: pseudo_translate(source, name) for code, name in languages}
+            translated = output[languages[0][0]] if languages else {}
+        else:
+            # 前缀缓存布局中目标语言位于末尾，取最后一处
+            matches = TARGET_LANGUAGE_PATTERN.findall(user_prompt)
+            target_language = matches[-1].strip() if matches else "xx"
+            output = translated = pseudo_translate(source, target_language)
+        if occurrence <= self.fail_first and translated:
+            translated.pop(next(iter(translated)))
+        if model in self.fail_models:
+            output = {code: {} for code in output} if group_match else {}
+        if bad_value and translated:
+            bad_key = list(translated)[len(translated) // 3]
+            translated[bad_key] = [translated[bad_key]]
+
+        content = "```json\n" + json.dumps(output, ensure_ascii=False, indent=2) + "\n```"
+        if malformed:
+            # 一半截断JSON，一半只返回说明文字
+            content = content[:len(content) // 2] if occurrence % 2 else "抱歉，我无法完成这个翻译请求。"
+        prompt_tokens = (len(system_prompt) + len(user_prompt)) // 2
+        completion_tokens = len(content) // 2
+        # 思考模式的输出token包含推理内容，这里按与输出等长模拟
+        reasoning_tokens = completion_tokens if model == 'deepseek-reasoner' else 0
+        completion_tokens += reasoning_tokens
+        cache_hit_tokens = min(prompt_tokens, self.lookup_prefix_cache(system_prompt + "\0" + user_prompt) // 2)
+        with self._lock:
+            self.cache_hit_tokens += cache_hit_tokens
+            self.cache_miss_tokens += prompt_tokens - cache_hit_tokens
+        return {
+            "id": f"mock-{content_hash[:12]}-{occurrence}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "completion_tokens_details": {"reasoning_tokens": reasoning_tokens},
+                "prompt_cache_hit_tokens": cache_hit_tokens,
+                "prompt_cache_miss_tokens": prompt_tokens - cache_hit_tokens
+            }
+        }
+
+    def stream_events(self, response: Dict, duration: float) -> Iterator[bytes]:
+        """将 chat.completion 响应拆分为 chat.completion.chunk 的 SSE 事件，在 duration 秒内逐个产出"""
+        content = response['choices'][0]['message']['content']
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        base = {"id": response['id'], "object": "chat.completion.chunk",
+                "created": response['created'], "model": response['model']}
+        chunks = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}]
+        if response['model'] == 'deepseek-reasoner':
+            chunks.append({**base, "choices": [{"index": 0, "delta": {"reasoning_content": "（模拟推理）"}, "finish_reason": None}]})
+        chunks += [{**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]} for piece in pieces]
+        chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        chunks.append({**base, "choices": [], "usage": response['usage']})
+        interval = duration / len(chunks)
+        for chunk in chunks:
+            if interval > 0:
+                time.sleep(interval)
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+        yield b"data: [DONE]\n\n"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path == '/stats':
+                    self._send(200, server.stats())
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                if self.path == '/reset':
+                    server.reset()
+                    self._send(200, server.stats())
+                    return
+                try:
+                    payload = json.loads(body or b'{}')
+                except json.JSONDecodeError:
+                    self._send(400, {"error": {"message": "invalid JSON body"}})
+                    return
+                self._send(*server.handle(payload))
+
+            def _send(self, status: int, body: Union[Dict, Iterator[bytes]], headers: Optional[Dict[str, str]] = None):
+                if not isinstance(body, dict):
+                    self._send_stream(status, body)
+                    return
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已放弃该请求（如被取消的对冲调用）
+                    self.close_connection = True
+
+            def _send_stream(self, status: int, events: Iterator[bytes]):
+                """以分块传输编码逐个发送 SSE 事件"""
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for event in events:
+                        self.wfile.write(f"{len(event):X}\r\n".encode('ascii') + event + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端中止了流式请求（输出验证失败或被取消的对冲调用），停止生成
+                    self.close_connection = True
+                    outcome = 'aborted'
+                else:
+                    outcome = 'completed'
+                with server._lock:
+                    server.stream_counts[outcome] += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="DeepSeek API 本地模拟服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail-first', type=int, default=0, help="每个请求内容前 N 次返回缺少键的结果")
+    parser.add_argument('--latency', type=float, default=0.0, help="平均响应延迟（秒）")
+    parser.add_argument('--latency-distribution', choices=LATENCY_DISTRIBUTIONS, default='fixed', help="延迟分布")
+    parser.add_argument('--latency-spread', type=float, default=0.0,
+                        help="uniform 为最大偏移（秒），lognormal 为对数标准差")
+    parser.add_argument('--latency-per-token', type=float, default=0.0, help="按输出token数追加的生成耗时（秒/token）")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help="返回 5xx 的概率")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="返回格式错误输出的概率")
+    parser.add_argument('--bad-value-rate', type=float, default=0.0, help="将某个键的值改为数组的概率")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子")
+    parser.add_argument('--fail-models', nargs='*', default=[], help="对这些模型的请求一律返回空的翻译结果")
+    args = parser.parse_args()
+
+    server = MockDeepSeekServer(args.host, args.port, fail_first=args.fail_first,
+                                latency=args.latency, latency_distribution=args.latency_distribution,
+                                latency_spread=args.latency_spread, latency_per_token=args.latency_per_token,
+                                rate_limit_rate=args.rate_limit_rate,
+                                server_error_rate=args.server_error_rate, malformed_rate=args.malformed_rate,
+                                bad_value_rate=args.bad_value_rate, seed=args.seed, fail_models=args.fail_models)
+    print(f"模拟服务器已启动: {server.url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
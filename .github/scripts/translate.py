@@ -6,18 +6,37 @@
 import os
 import sys
 import json
+import argparse
+import asyncio
 import requests
+import requests.adapters
 import time
 import subprocess
 import re
-
+import hashlib
+import math
+import random
+import threading
+import unicodedata
+
+import heapq
+import itertools
+import gzip
+import queue
+import atexit
+import contextvars
+from contextlib import contextmanager
 import concurrent.futures
+from collections import Counter, OrderedDict, deque
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Set
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import logging
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 # 检测是否在GitHub Actions环境中运行
 IS_GITHUB_ACTIONS = os.getenv('GITHUB_ACTIONS') == 'true'
@@ -36,13 +55,326 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+EVENTS_FILE = os.path.join(LOG_DIR, "events.jsonl")
+BLOB_DIR = os.path.join(LOG_DIR, "blobs")
+ERROR_SUMMARY_FILE = os.path.join(LOG_DIR, "error_summary.log")
+LOG_LEVELS = {'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+class EventLog:
+    """结构化事件流：所有日志以事件的形式进入队列，由单个后台线程批量写出
+
+    调用方（包括工作线程与事件循环）只做入队，不接触磁盘或标准输出。后台线程每批事件：
+    写入 events.jsonl（每行一个事件），再交给渲染器生成人类可读的输出（translation.log、控制台、
+    GitHub Actions 的注释与 ::group:: 分组、error_summary.log）。提示词与响应等大段正文按内容哈希
+    去重，gzip 压缩后保存在 blobs/ 目录，事件中只记录哈希。
+    """
+    FLUSH_INTERVAL = 0.1  # 收到事件后先等待一小段时间再成批写出，避免每个事件都唤醒写出线程争用GIL
+    _STOP = object()
+
+    def __init__(self, events_file: str = EVENTS_FILE, blob_dir: str = BLOB_DIR):
+        self.events_file = events_file
+        self.blob_dir = blob_dir
+        self.renderers: List[Callable[[Dict[str, any]], None]] = []
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._blob_digests: Set[str] = set()
+        self.events_written = 0
+        self.blobs_written = 0
+        self.blob_bytes = 0
+        self.blobs_deduplicated = 0
+
+    def emit(self, kind: str, **fields):
+        """记录一个事件（只入队，立即返回）"""
+        self._ensure_started()
+        self._queue.put({'ts': time.time(), 'kind': kind, **fields})
+
+    def blob(self, text: Optional[str]) -> Optional[str]:
+        """登记一段正文，返回其内容哈希；同一内容只压缩写入一次"""
+        if text is None:
+            return None
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        with self._lock:
+            if digest in self._blob_digests:
+                self.blobs_deduplicated += 1
+                return digest
+            self._blob_digests.add(digest)
+        self._ensure_started()
+        self._queue.put(('blob', digest, data))
+        return digest
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            if items[0] is not self._STOP:
+                time.sleep(self.FLUSH_INTERVAL)
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for item in items:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, tuple):
+                    self._write_blob(*item[1:])
+                else:
+                    self._write_event(item)
+            self._flush_outputs()
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_event(self, event: Dict[str, any]):
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.events_file), exist_ok=True)
+                self._file = open(self.events_file, 'w', encoding='utf-8')
+            self._file.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+            self.events_written += 1
+        except OSError as e:
+            sys.stderr.write(f"写入事件日志失败：{e}\n")
+        for renderer in self.renderers:
+            try:
+                renderer(event)
+            except Exception as e:
+                sys.stderr.write(f"渲染日志事件失败：{e}\n")
+
+    def _write_blob(self, digest: str, data: bytes):
+        path = os.path.join(self.blob_dir, f"{digest}.txt.gz")
+        try:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            compressed = gzip.compress(data)
+            with open(path, 'wb') as f:
+                f.write(compressed)
+            self.blobs_written += 1
+            self.blob_bytes += len(compressed)
+        except OSError as e:
+            sys.stderr.write(f"写入正文块失败 {path}：{e}\n")
+
+    def _flush_outputs(self):
+        if self._file is not None:
+            self._file.flush()
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        sys.stdout.flush()
+
+    def flush(self):
+        """等待队列中的事件全部写出"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """写出剩余事件并停止后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> str:
+        return (f"事件日志：{self.events_written} 个事件，正文块 {self.blobs_written} 个"
+                f"（压缩后 {self.blob_bytes} 字节，去重跳过 {self.blobs_deduplicated} 个）")
+
+def render_main_log(event: Dict[str, any]):
+    """渲染器：带 message 的事件写入 translation.log 与控制台（GitHub Actions 中输出注释与分组）"""
+    kind = event['kind']
+    if kind == 'section_start':
+        if IS_GITHUB_ACTIONS:
+            print(f"::group::{event['title']}")
+        return
+    if kind == 'section_end':
+        if IS_GITHUB_ACTIONS:
+            print("::endgroup::")
+        return
+    message = event.get('message')
+    if message is None:
+        return
+    level = event.get('level', 'info')
+    record = logger.makeRecord(logger.name, LOG_LEVELS.get(level, logging.INFO), __file__, 0, message, None, None)
+    record.created = event['ts']
+    record.msecs = (event['ts'] - int(event['ts'])) * 1000
+    logger.handle(record)
+
+    if IS_GITHUB_ACTIONS:
+        # GitHub Actions 特殊格式输出到控制台
+        if level == "error":
+            print(f"::error::{message}")
+        elif level == "warning":
+            print(f"::warning::{message}")
+        else:
+            timestamp = datetime.fromtimestamp(event['ts']).strftime("%H:%M:%S")
+            print(f"::notice::[{timestamp}] {message}")
+
+class ErrorSummaryRenderer:
+    """渲染器：由 session_start 与 attempt_failed 事件生成 error_summary.log"""
+
+    def __init__(self, file_path: str = ERROR_SUMMARY_FILE):
+        self.file_path = file_path
+        self._file = None
+
+    def __call__(self, event: Dict[str, any]):
+        kind = event['kind']
+        if kind == 'session_start':
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            self._file = open(self.file_path, 'w', encoding='utf-8')
+            self._file.write(f"翻译错误汇总日志\n")
+            self._file.write(f"会话开始时间: {datetime.fromtimestamp(event['ts']).isoformat()}\n")
+            self._file.write(f"模式: {event['mode']}\n")
+            self._file.write("=" * 80 + "\n\n")
+        elif kind == 'attempt_failed' and self._file is not None:
+            error = event['error']
+            blobs = ', '.join(f"{name}={digest}" for name, digest in event['blobs'].items() if digest)
+            self._file.write(f"[{datetime.fromtimestamp(event['ts']).isoformat()}] 尝试 {event['attempt']} 失败: {error[:100]}{'...' if len(error) > 100 else ''}\n")
+            self._file.write(f"  命名空间: {event['namespace']}\n")
+            self._file.write(f"  目标语言: {event['language']}\n")
+            self._file.write(f"  正文块: {blobs}\n")
+            self._file.write(f"  文本数量: {event['texts']}\n")
+            self._file.write(f"  模型: {event['model']}\n")
+            self._file.write(f"  温度: {event['temperature']}\n\n")
+            self._file.flush()
+
+EVENT_LOG = EventLog()
+EVENT_LOG.renderers.extend([render_main_log, ErrorSummaryRenderer()])
+atexit.register(EVENT_LOG.close)
+
+def log_event(kind: str, message: Optional[str] = None, level: str = "info", **fields):
+    """记录一个结构化事件；带 message 的事件同时渲染为人类可读的日志"""
+    if message is not None:
+        fields['message'] = message
+        fields['level'] = level
+    EVENT_LOG.emit(kind, **fields)
+
+TRACE_FILE = os.path.join(LOG_DIR, "trace.json")
+# 当前协程/线程所属的追踪轨道：0 为编排流程，其余为各翻译请求
+_trace_lane: contextvars.ContextVar = contextvars.ContextVar('trace_lane', default=0)
+# 当前调用是否为对冲请求（对冲调用的用量单独记账）
+_hedge_call: contextvars.ContextVar = contextvars.ContextVar('translation_hedge_call', default=False)
+
+class Tracer:
+    """轻量级分段计时，输出 Chrome Trace Event 格式（可在 chrome://tracing 或 ui.perfetto.dev 中打开）
+
+    每个翻译请求占用一条独立轨道（线程引擎与异步引擎一致），编排阶段位于轨道 0。
+    只记录开始时间与耗时，运行结束时一次性写出，并汇总最慢的请求及其各阶段耗时。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, any]] = []
+        self._lanes: Dict[int, str] = {0: "编排"}
+        self._lane_ids = itertools.count(1)
+
+    def enter_lane(self, name: str) -> contextvars.Token:
+        """为当前上下文分配一条新轨道，返回用于恢复的令牌"""
+        lane = next(self._lane_ids)
+        self._lanes[lane] = name
+        return _trace_lane.set(lane)
+
+    @staticmethod
+    def exit_lane(token: contextvars.Token):
+        _trace_lane.reset(token)
+
+    def add(self, name: str, start: float, duration: float, category: str = 'translate', **args):
+        """记录一个已完成的区间（start 为 time.perf_counter() 时间）"""
+        if not self.enabled:
+            return
+        self._events.append({
+            'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': _trace_lane.get(),
+            'ts': round((start - self._origin) * 1e6, 1), 'dur': round(max(0.0, duration) * 1e6, 1),
+            'args': args
+        })
+
+    @contextmanager
+    def span(self, name: str, category: str = 'translate', **args):
+        """计时一个代码块"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, category, **args)
+
+    def add_network(self, start: float, response: Optional['TransportResponse']):
+        """记录一次HTTP调用；有响应时拆分为连接建立与等待服务器两段"""
+        end = time.perf_counter()
+        self.add('network', start, end - start, status=response.status_code if response is not None else None)
+        if response is not None:
+            if response.connect_time > 0:
+                self.add('connect', start, response.connect_time)
+            self.add('server_wait', end - response.server_time, response.server_time)
+
+    def slowest_requests(self, limit: int) -> List[Tuple[str, float, Dict[str, float]]]:
+        """返回耗时最长的请求 [(轨道名称, 总耗时, {阶段: 累计耗时})]"""
+        requests_by_lane = {event['tid']: event for event in self._events if event['name'] == 'request'}
+        phases: Dict[int, Counter] = {}
+        for event in self._events:
+            if event['tid'] in requests_by_lane and event['name'] not in ('request', 'network'):
+                phases.setdefault(event['tid'], Counter())[event['name']] += event['dur'] / 1e6
+        slowest = sorted(requests_by_lane.values(), key=lambda event: event['dur'], reverse=True)[:limit]
+        return [(self._lanes.get(event['tid'], str(event['tid'])), event['dur'] / 1e6, dict(phases.get(event['tid'], {})))
+                for event in slowest]
+
+    def phase_totals(self) -> Counter:
+        """各阶段在所有请求中的累计耗时（秒）"""
+        totals: Counter = Counter()
+        for event in self._events:
+            if event['tid'] != 0 and event['name'] not in ('request', 'network'):
+                totals[event['name']] += event['dur'] / 1e6
+        return totals
+
+    def save(self, file_path: str = TRACE_FILE) -> bool:
+        if not self.enabled or not self._events:
+            return False
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': lane, 'args': {'name': name}}
+                    for lane, name in self._lanes.items()]
+        metadata.append({'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': "translate.py"}})
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': metadata + self._events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+            return True
+        except OSError as e:
+            log_progress(f"保存追踪文件失败：{e}", "warning")
+            return False
+
+    def reset(self):
+        """清空已记录的区间（每次运行结束写出后调用）"""
+        self._origin = time.perf_counter()
+        self._events = []
+        self._lanes = {0: "编排"}
+
+TRACER = Tracer(enabled=os.getenv('TRANSLATION_TRACE', 'true').lower() == 'true')
+
 def flush_logs():
-    """强制刷新所有日志处理器"""
+    """等待后台线程写出所有事件，并刷新日志处理器"""
+    EVENT_LOG.flush()
     for handler in logging.getLogger().handlers:
         handler.flush()
 
 def close_logs():
-    """关闭所有日志处理器"""
+    """停止事件写出线程并关闭所有日志处理器"""
+    EVENT_LOG.close()
     for handler in logging.getLogger().handlers:
         if hasattr(handler, 'close'):
             handler.close()
@@ -71,39 +403,17 @@ class ChangeType(Enum):
     MODIFIED = "modified"
 
 def log_progress(message: str, level: str = "info"):
-    """统一的进度日志函数，在GitHub Actions中使用特殊格式"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-
-    # 始终写入日志文件
-    if level == "error":
-        logger.error(message)
-    elif level == "warning":
-        logger.warning(message)
-    else:
-        logger.info(message)
-
-    if IS_GITHUB_ACTIONS:
-        # GitHub Actions 特殊格式输出到控制台
-        if level == "error":
-            print(f"::error::{message}")
-        elif level == "warning":
-            print(f"::warning::{message}")
-        else:
-            print(f"::notice::[{timestamp}] {message}")
-
-    # 强制刷新输出缓冲区
-    sys.stdout.flush()
+    """统一的进度日志函数（由后台线程写入日志文件，在GitHub Actions中使用特殊格式）"""
+    log_event('log', message, level)
 
 def log_section(title: str):
     """记录主要章节，在GitHub Actions中使用分组"""
-    if IS_GITHUB_ACTIONS:
-        print(f"::group::{title}")
+    log_event('section_start', title=title)
     log_progress(f"=== {title} ===")
 
 def log_section_end():
     """结束章节分组"""
-    if IS_GITHUB_ACTIONS:
-        print("::endgroup::")
+    log_event('section_end')
 
 class ProgressTracker:
     """进度跟踪器"""
@@ -138,12 +448,18 @@ class ProgressTracker:
         return f"总进度: {completed_tasks}/{total_tasks} ({percentage:.1f}%) - 已用时 {elapsed:.1f}s"
 
 # 配置
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', "https://api.deepseek.com/chat/completions")
 ASSETS_DIR = "Localization-Resource-Pack/assets"
 TRANSLATE_DIR = "translate"
 SYSTEM_PROMPT_FILE = "Localization-Resource-Pack/assets/system_prompt.md"
 USER_PROMPT_FILE = "Localization-Resource-Pack/assets/user_prompt.md"
 LANGUAGES_FILE = "Localization-Resource-Pack/languages.json"
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+TRANSLATION_MEMORY_FILE = os.path.join(CACHE_DIR, "translation_memory.json")
+BATCH_STATS_FILE = os.path.join(CACHE_DIR, "batch_stats.json")
+CHECKPOINT_JOURNAL_FILE = os.path.join(CACHE_DIR, "checkpoint_journal.jsonl")
+SOURCE_MANIFEST_FILE = os.path.join(os.path.dirname(__file__), "state", "source_manifest.json")
+USAGE_REPORT_FILE = "translation_usage.json"  # 与 translation.log 位于同一目录
 
 # 默认目标语言列表（当外部文件不存在或无效时使用）
 DEFAULT_TARGET_LANGUAGES = {
@@ -196,12 +512,1925 @@ def get_all_target_languages() -> dict:
     """获取所有目标语言（从文件或默认值）"""
     return TARGET_LANGUAGES
 
+# 多语言分组：同组语言的译文高度相似，可在一次API调用中同时翻译
+DEFAULT_LANGUAGE_GROUPS = (
+    ('es_es', 'es_mx'),
+    ('fr_fr', 'fr_ca'),
+    ('zh_tw', 'zh_hk'),
+)
+
+def parse_language_groups(value: str) -> List[Tuple[str, ...]]:
+    """解析 TRANSLATION_LANGUAGE_GROUPS：false 关闭，true 使用默认分组，
+    也可自定义为逗号分隔的分组、组内语言以 + 连接（如 es_es+es_mx,fr_fr+fr_ca）"""
+    value = (value or '').strip()
+    if value.lower() in ('', 'false'):
+        return []
+    if value.lower() == 'true':
+        return list(DEFAULT_LANGUAGE_GROUPS)
+    groups = []
+    seen: Set[str] = set()
+    for part in value.split(','):
+        codes = tuple(dict.fromkeys(code.strip() for code in part.split('+') if code.strip()))
+        if len(codes) < 2:
+            continue
+        if seen & set(codes):
+            log_progress(f"语言分组 {part.strip()} 与其他分组重复，已忽略", "warning")
+            continue
+        seen.update(codes)
+        groups.append(codes)
+    return groups
+
+# 分组请求追加在用户提示词末尾的输出格式说明
+GROUP_OUTPUT_INSTRUCTION = """## 多语言输出
 
+本次需要同时翻译为 {count} 种语言，每种语言分别遵守上述全部要求。请输出一个JSON对象：顶层键为语言代码，值为该语言的完整翻译结果（键与待翻译内容完全相同）。语言代码依次为：{languages}"""
+
+class TranslationMemory:
+    """翻译记忆：缓存已通过验证的译文，避免重复请求 API
+
+    缓存键由 (规范化源文本, 目标语言, 提示词模板哈希, 模型) 计算得出，
+    提示词或模型变化后旧条目自然失效。条目按 LRU 顺序保存，超过容量时淘汰最久未使用的条目。
+    所有方法都是线程安全的，供并发请求共享。
+    """
+    FILE_VERSION = 1
+
+    def __init__(self, file_path: str = TRANSLATION_MEMORY_FILE, max_entries: int = 50000, enabled: bool = True):
+        self.file_path = file_path
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if enabled:
+            self._load()
+
+    @staticmethod
+    def normalize_source(value: any) -> str:
+        """规范化源文本：列表值序列化为JSON，统一Unicode形式与换行符（不去除首尾空白，空白在游戏文本中有意义）"""
+        if isinstance(value, list):
+            text = json.dumps(value, ensure_ascii=False)
+        else:
+            text = str(value)
+        return unicodedata.normalize('NFC', text).replace('\r\n', '\n')
+
+    def make_key(self, source_value: any, target_lang: str, prompt_hash: str, model: str) -> str:
+        """计算缓存键"""
+        raw = json.dumps([self.normalize_source(source_value), target_lang, prompt_hash, model], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """从磁盘加载翻译记忆，文件缺失或损坏时从空缓存开始"""
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.FILE_VERSION:
+                log_progress("翻译记忆文件版本不匹配，忽略旧缓存", "warning")
+                return
+            for key, value in data.get('entries', []):
+                self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            log_progress(f"已加载翻译记忆：{len(self._entries)} 条")
+        except Exception as e:
+            log_progress(f"加载翻译记忆失败：{e}，使用空缓存", "warning")
+            self._entries.clear()
+
+    def lookup(self, texts: Dict[str, any], target_lang: str, prompt_hash: str, model: str) -> Dict[str, str]:
+        """查询一批文本，返回命中的 {key: translation}"""
+        if not self.enabled or not texts:
+            return {}
+
+        found = {}
+        with self._lock:
+            for key, value in texts.items():
+                cache_key = self.make_key(value, target_lang, prompt_hash, model)
+                cached = self._entries.get(cache_key)
+                if cached is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                found[key] = cached
+        return found
+
+    def store(self, texts: Dict[str, any], translations: Dict[str, str], target_lang: str, prompt_hash: str, model: str):
+        """写入已通过验证的译文，仅保存 texts 中存在的键"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for key, translated in translations.items():
+                if key not in texts or not isinstance(translated, str):
+                    continue
+                cache_key = self.make_key(texts[key], target_lang, prompt_hash, model)
+                self._entries[cache_key] = translated
+                self._entries.move_to_end(cache_key)
+                self.stores += 1
+                self._dirty = True
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def save(self) -> bool:
+        """将翻译记忆写回磁盘（无变更时跳过）"""
+        if not self.enabled or not self._dirty:
+            return True
+
+        with self._lock:
+            data = {
+                'version': self.FILE_VERSION,
+                'entries': list(self._entries.items())
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.file_path)
+            return True
+        except Exception as e:
+            log_progress(f"保存翻译记忆失败：{e}", "warning")
+            return False
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total) * 100 if total > 0 else 0
+        return (f"翻译记忆：命中 {self.hits}，未命中 {self.misses}（命中率 {hit_rate:.1f}%），"
+                f"写入 {self.stores}，淘汰 {self.evictions}，当前 {len(self._entries)}/{self.max_entries} 条")
+
+class CheckpointJournal:
+    """检查点日志：请求通过验证后立即追加一行JSON，中断后的下一次运行据此跳过已完成的请求
+
+    每条记录以请求指纹（源文本、目标语言、提示词模板哈希、模型）为键，并保存核心键源文本与各语言译文。
+    启动时重放日志：指纹一致的请求直接返回记录的结果；记录同时写入翻译记忆，
+    因此批次划分变化后已付费的译文仍可逐键复用。运行成功且译文全部写回后清空日志。
+    请求线程（及事件循环）只将记录入队，由后台线程成批写入并 fsync，磁盘I/O不占用请求的执行时间；
+    进程被强制终止时最后一批尚未写出的记录会丢失，下次运行重新请求即可。
+    """
+    _STOP = object()
+
+    def __init__(self, file_path: str = CHECKPOINT_JOURNAL_FILE, enabled: bool = True):
+        self.file_path = file_path
+        self.enabled = enabled
+        self._entries: Dict[str, Dict[str, any]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.loaded = 0
+        self.replayed = 0
+        self.appended = 0
+        if enabled:
+            self._load()
+
+    @staticmethod
+    def fingerprint(texts: Dict[str, any], languages: List[str], prompt_hash: str, model: str) -> str:
+        """计算请求指纹（texts 含 __core_keys__，键顺序参与计算）"""
+        raw = json.dumps([list(texts.items()), languages, prompt_hash, model], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """读取日志；进程被终止时最后一行可能不完整，损坏的行直接跳过"""
+        if not os.path.exists(self.file_path):
+            return
+        skipped = 0
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry['key']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+        except OSError as e:
+            log_progress(f"读取检查点日志失败：{e}，忽略已有记录", "warning")
+            self._entries.clear()
+            return
+        self.loaded = len(self._entries)
+        if self.loaded or skipped:
+            log_progress(f"已加载检查点日志：{self.loaded} 个已完成的请求" + (f"（跳过 {skipped} 行损坏记录）" if skipped else ""))
+
+    def seed_memory(self, memory: 'TranslationMemory'):
+        """将日志中的译文写入翻译记忆，批次划分变化时仍可逐键命中"""
+        for entry in self._entries.values():
+            for lang_code, result in entry['results'].items():
+                memory.store(entry['texts'], result, lang_code, entry['prompt_hash'], entry['model'])
+
+    def lookup(self, key: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """返回已完成请求的 {lang_code: translation_result}，未记录时返回 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.replayed += 1
+            return {lang_code: dict(result) for lang_code, result in entry['results'].items()}
+
+    def append(self, key: str, texts: Dict[str, any], results: Dict[str, Dict[str, str]], prompt_hash: str, model: str):
+        """追加一条已完成请求的记录（只入队，由后台线程写入磁盘）"""
+        if not self.enabled:
+            return
+        entry = {'key': key, 'prompt_hash': prompt_hash, 'model': model, 'texts': texts, 'results': results}
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.appended += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="checkpoint-journal-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _run(self):
+        """后台写出线程：取出队列中已有的全部记录一次写入，每批只 fsync 一次"""
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(line is self._STOP for line in lines)
+            lines = [line for line in lines if line is not self._STOP]
+            if lines:
+                try:
+                    if self._file is None:
+                        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                        self._file = open(self.file_path, 'a', encoding='utf-8')
+                    self._file.write(''.join(lines))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    log_progress(f"写入检查点日志失败：{e}", "warning")
+            if stop:
+                return
+
+    def close(self):
+        """写出队列中剩余的记录并停止后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """运行成功后清空日志（译文已写回文件，翻译记忆已保存）"""
+        if not self.enabled:
+            return
+        self.close()
+        with self._lock:
+            self._entries.clear()
+            try:
+                if os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+            except OSError as e:
+                log_progress(f"清空检查点日志失败：{e}", "warning")
+
+    def summary(self) -> str:
+        return f"检查点日志：重放 {self.replayed} 个请求，新记录 {self.appended} 个请求（启动时已有 {self.loaded} 个）"
+
+# CJK 字符（含日文假名、韩文音节与全角符号）
+CJK_CHAR_PATTERN = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+
+def estimate_tokens_heuristic(text: str) -> int:
+    """按 DeepSeek 官方换算粗略估算token数：中日韩字符约0.6个token，其他字符约0.3个token"""
+    if not text:
+        return 0
+    cjk_count = len(CJK_CHAR_PATTERN.findall(text))
+    return max(1, int(cjk_count * 0.6 + (len(text) - cjk_count) * 0.3 + 0.5))
+
+def create_token_estimator(name: str) -> Callable[[str], int]:
+    """根据名称创建token估算函数：heuristic（默认）或 tiktoken（需安装 tiktoken，缺失时回退）"""
+    if name == 'tiktoken':
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding('cl100k_base')
+            return lambda text: len(encoding.encode(text)) if text else 0
+        except ImportError:
+            log_progress("未安装 tiktoken，使用启发式token估算", "warning")
+    elif name != 'heuristic':
+        log_progress(f"未知的token估算方式 {name}，使用启发式估算", "warning")
+    return estimate_tokens_heuristic
+
+class BatchPlanner:
+    """基于token估算的批次规划
+
+    按每个键值对的估算输出token数（源文本token × 目标语言膨胀系数）贪心打包批次，
+    使单个批次的预计耗时不超过目标延迟、输出不超过token预算。
+    每次成功响应后更新该语言的膨胀系数和该模型的每token耗时（指数滑动平均），并持久化到缓存目录。
+    同时记录各语言每个请求的平均调用次数（含重试），供调度器估算请求耗时。
+    """
+    FILE_VERSION = 1
+    SMOOTHING = 0.2
+    # 每个估算输出token的耗时初始值（含思考时间），随实际响应逐步校准
+    DEFAULT_SECONDS_PER_TOKEN = {'deepseek-reasoner': 0.05, 'deepseek-chat': 0.02}
+    ITEM_OVERHEAD_TOKENS = 4  # 引号、冒号、逗号与缩进
+
+    def __init__(self, estimator: Optional[Callable[[str], int]] = None, target_latency: float = 40.0,
+                 max_tokens: int = 4000, max_keys: int = 80, file_path: str = BATCH_STATS_FILE, persist: bool = True):
+        self.estimate = estimator or estimate_tokens_heuristic
+        self.target_latency = target_latency
+        self.max_tokens = max(1, max_tokens)
+        self.max_keys = max(1, max_keys)
+        self.file_path = file_path
+        self.persist = persist
+        self.expansion: Dict[str, float] = {}
+        self.seconds_per_token: Dict[str, float] = dict(self.DEFAULT_SECONDS_PER_TOKEN)
+        self.attempts: Dict[str, float] = {}  # 语言 -> 每个请求的平均调用次数
+        self.observations = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        if persist:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.FILE_VERSION:
+                return
+            self.expansion.update({k: float(v) for k, v in data.get('expansion', {}).items()})
+            self.seconds_per_token.update({k: float(v) for k, v in data.get('seconds_per_token', {}).items()})
+            self.attempts.update({k: float(v) for k, v in data.get('attempts', {}).items()})
+        except (json.JSONDecodeError, OSError, AttributeError, ValueError) as e:
+            log_progress(f"批次规划统计读取失败，使用默认值: {e}", "warning")
+
+    def value_tokens(self, value: any) -> int:
+        return self.estimate(json.dumps(value, ensure_ascii=False) if isinstance(value, list) else str(value))
+
+    def item_cost(self, key: str, value: any, ratio: float) -> float:
+        """单个键值对的估算输出token数"""
+        return self.estimate(key) + self.value_tokens(value) * ratio + self.ITEM_OVERHEAD_TOKENS
+
+    def output_tokens(self, texts: Dict[str, any], target_lang: str) -> float:
+        """一批文本翻译为指定语言的估算输出token数"""
+        ratio = self.expansion.get(target_lang, 1.0)
+        return sum(self.item_cost(key, value, ratio) for key, value in texts.items())
+
+    def expected_attempts(self, target_lang: str) -> float:
+        return self.attempts.get(target_lang, 1.0)
+
+    def model_seconds_per_token(self, model: str) -> float:
+        return self.seconds_per_token.get(model, self.DEFAULT_SECONDS_PER_TOKEN['deepseek-reasoner'])
+
+    def output_budget(self, model: str) -> int:
+        """单个批次的输出token预算：目标延迟对应的token数与硬上限取较小值"""
+        seconds_per_token = self.model_seconds_per_token(model)
+        return max(1, min(self.max_tokens, int(self.target_latency / max(seconds_per_token, 1e-6))))
+
+    def plan(self, items: List[Tuple[str, any]], target_langs: List[str], model: str,
+             reserve_ratio: float = 0.9) -> List[Tuple[int, int]]:
+        """将有序键值对划分为连续区间 [(start, end), ...]，为上下文预留 1 - reserve_ratio 的预算
+
+        多语言分组请求按组内语言的平均膨胀系数规划，批次大小与单语言请求相同：
+        单次输出随语言数成倍增加，请求数与重复发送的提示词按组大小减少
+        """
+        budget = self.output_budget(model) * reserve_ratio
+        ratio = sum(self.expansion.get(lang, 1.0) for lang in target_langs) / max(1, len(target_langs))
+        costs = [self.item_cost(key, value, ratio) for key, value in items]
+
+        # 第一遍：贪心装箱，得到满足预算的最少批次数
+        ranges: List[Tuple[int, int]] = []
+        start = 0
+        used = 0.0
+        for index, cost in enumerate(costs):
+            if index > start and (used + cost > budget or index - start >= self.max_keys):
+                ranges.append((start, index))
+                start = index
+                used = 0.0
+            used += cost
+        if start < len(items):
+            ranges.append((start, len(items)))
+        if len(ranges) <= 1:
+            return ranges
+
+        # 第二遍：保持批次数不变，按累计token均分，避免末尾出现很小的批次
+        total = sum(costs)
+        batch_count = len(ranges)
+        balanced: List[Tuple[int, int]] = []
+        start = 0
+        cumulative = 0.0
+        for index, cost in enumerate(costs):
+            if len(balanced) < batch_count - 1 and index > start and cumulative + cost / 2 > total * (len(balanced) + 1) / batch_count:
+                balanced.append((start, index))
+                start = index
+            cumulative += cost
+        balanced.append((start, len(items)))
+        if all(end - begin <= self.max_keys and sum(costs[begin:end]) <= budget * 1.1 for begin, end in balanced):
+            return balanced
+        return ranges
+
+    def observe(self, target_lang: str, model: str, source: Dict[str, any], translated: Dict[str, str], elapsed: float):
+        """根据一次成功响应更新膨胀系数与每token耗时"""
+        self.observe_group(model, source, {target_lang: translated}, elapsed)
+
+    def observe_group(self, model: str, source: Dict[str, any], translated_by_lang: Dict[str, Dict[str, str]], elapsed: float):
+        """observe 的多语言版本：分别更新各语言的膨胀系数，耗时按所有语言的输出token合计"""
+        observed_ratios: Dict[str, float] = {}
+        output_tokens = 0
+        for target_lang, translated in translated_by_lang.items():
+            source_tokens = sum(self.value_tokens(source[k]) for k in translated if k in source)
+            if source_tokens <= 0:
+                continue
+            translated_tokens = sum(self.value_tokens(v) for k, v in translated.items() if k in source)
+            observed_ratios[target_lang] = translated_tokens / source_tokens
+            output_tokens += sum(self.estimate(k) + self.value_tokens(v) + self.ITEM_OVERHEAD_TOKENS for k, v in translated.items())
+        if not observed_ratios or output_tokens <= 0:
+            return
+        with self._lock:
+            for target_lang, observed in observed_ratios.items():
+                previous = self.expansion.get(target_lang)
+                self.expansion[target_lang] = observed if previous is None else previous + self.SMOOTHING * (observed - previous)
+            observed_speed = elapsed / output_tokens
+            previous_speed = self.seconds_per_token.get(model)
+            self.seconds_per_token[model] = (observed_speed if previous_speed is None
+                                             else previous_speed + self.SMOOTHING * (observed_speed - previous_speed))
+            self.observations += 1
+            self._dirty = True
+
+    def observe_attempts(self, target_langs: List[str], calls: int):
+        """记录一个已完成请求的API调用次数（首次调用 + 重试）"""
+        with self._lock:
+            for target_lang in target_langs:
+                previous = self.attempts.get(target_lang)
+                self.attempts[target_lang] = calls if previous is None else previous + self.SMOOTHING * (calls - previous)
+            self._dirty = True
+
+    def save(self) -> bool:
+        """保存学习到的统计（无变化或未启用持久化时跳过）"""
+        if not self.persist or not self._dirty:
+            return True
+        with self._lock:
+            data = {
+                'version': self.FILE_VERSION,
+                'expansion': {k: round(v, 4) for k, v in sorted(self.expansion.items())},
+                'seconds_per_token': {k: round(v, 6) for k, v in sorted(self.seconds_per_token.items())},
+                'attempts': {k: round(v, 3) for k, v in sorted(self.attempts.items())}
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.file_path)
+            return True
+        except Exception as e:
+            log_progress(f"保存批次规划统计失败：{e}", "warning")
+            return False
+
+    def summary(self) -> str:
+        ratios = "，".join(f"{lang} {ratio:.2f}" for lang, ratio in sorted(self.expansion.items(), key=lambda x: -x[1])[:5])
+        speeds = "，".join(f"{model} {value:.3f}s/token" for model, value in sorted(self.seconds_per_token.items()))
+        return (f"批次规划：本次学习 {self.observations} 次响应，膨胀系数最高的语言 {ratios or '无'}；"
+                f"输出速度 {speeds}")
+
+# API错误分类：过载类错误会触发并发窗口收缩
+OVERLOAD_ERROR_CLASSES = {'rate_limit', 'server_error', 'timeout', 'connection'}
+
+class ApiHttpError(Exception):
+    """API返回了非2xx状态码"""
+    def __init__(self, status_code: int, headers: Dict[str, str], body: str):
+        super().__init__(f"HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+class TranslationValidationError(ValueError):
+    """翻译结果未通过验证
+
+    Attributes:
+        accepted: 已通过类型与占位符检查的 {key: translation}
+        failed_keys: 未通过检查或缺失的键
+    """
+    def __init__(self, message: str, accepted: Dict[str, str], failed_keys: List[str]):
+        super().__init__(message)
+        self.accepted = accepted
+        self.failed_keys = failed_keys
+
+class ApiTimeoutError(Exception):
+    """API请求超时（连接或读取）"""
+
+class ApiConnectionError(Exception):
+    """无法建立或保持与API的连接"""
+
+def classify_api_error(error: Exception) -> str:
+    """将API调用异常归类为 rate_limit / server_error / timeout / connection / client_error / validation / other"""
+    if isinstance(error, TranslationValidationError):
+        return 'validation'
+    if isinstance(error, ApiHttpError):
+        if error.status_code == 429:
+            return 'rate_limit'
+        if error.status_code >= 500:
+            return 'server_error'
+        return 'client_error'
+    if isinstance(error, ApiTimeoutError):
+        return 'timeout'
+    if isinstance(error, ApiConnectionError):
+        return 'connection'
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status == 429:
+            return 'rate_limit'
+        if status >= 500:
+            return 'server_error'
+        return 'client_error'
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'connection'
+    return 'other'
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 自适应并发限制器
+
+    - 加性增长：请求成功且延迟低于目标值时，窗口每个请求增长 1/window（约每轮增长1）
+    - 乘性收缩：遇到 429/5xx/超时/连接错误时窗口乘以收缩系数；
+      收缩后才发出的请求再失败才会继续收缩，避免同一轮失败把窗口连续砍到底
+    - 按申请顺序（FIFO）放行等待中的请求
+    """
+    def __init__(self, initial_window: int = 8, min_window: int = 1, max_window: int = 64,
+                 latency_target: float = 45.0, decrease_factor: float = 0.5):
+        self.min_window = max(1, min_window)
+        self.max_window = max(self.min_window, max_window)
+        self.window = float(min(max(initial_window, self.min_window), self.max_window))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.rejections = 0  # 因窗口已满而排队等待的次数
+        self.increases = 0
+        self.decreases = 0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving_ticket = 0
+        self._abandoned_tickets: Set[int] = set()
+        self._async_waiters: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._last_decrease_time = 0.0
+
+    def _can_grant_locked(self, ticket: int) -> bool:
+        return ticket == self._serving_ticket and self.in_flight < int(self.window)
+
+    def _grant_locked(self) -> float:
+        self._serving_ticket += 1
+        while self._serving_ticket in self._abandoned_tickets:
+            self._abandoned_tickets.discard(self._serving_ticket)
+            self._serving_ticket += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self._notify_locked()
+        return time.time()
+
+    def _notify_locked(self):
+        """唤醒等待中的线程，以及持有下一个票号的协程"""
+        self._cond.notify_all()
+        waiter = self._async_waiters.pop(self._serving_ticket, None)
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    def acquire(self) -> float:
+        """申请一个并发槽位，窗口已满时阻塞等待；返回申请成功的时间戳（释放时使用）"""
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            waited = False
+            while not self._can_grant_locked(ticket):
+                if not waited:
+                    self.rejections += 1
+                    waited = True
+                self._cond.wait()
+            return self._grant_locked()
+
+    def try_acquire(self) -> Optional[float]:
+        """不等待地申请槽位：没有排队中的请求且窗口未满时返回时间戳，否则返回 None"""
+        with self._cond:
+            if self._next_ticket != self._serving_ticket or self.in_flight >= int(self.window):
+                return None
+            self._next_ticket += 1
+            return self._grant_locked()
+
+    async def acquire_async(self) -> float:
+        """acquire 的协程版本：等待时让出事件循环，而不是阻塞线程"""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+        waited = False
+        while True:
+            with self._cond:
+                if self._can_grant_locked(ticket):
+                    return self._grant_locked()
+                if not waited:
+                    self.rejections += 1
+                    waited = True
+                future = loop.create_future()
+                self._async_waiters[ticket] = (loop, future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # 放弃排队：跳过该票号，避免阻塞后续请求
+                with self._cond:
+                    self._async_waiters.pop(ticket, None)
+                    if ticket == self._serving_ticket:
+                        self._serving_ticket += 1
+                        while self._serving_ticket in self._abandoned_tickets:
+                            self._abandoned_tickets.discard(self._serving_ticket)
+                            self._serving_ticket += 1
+                        self._notify_locked()
+                    else:
+                        self._abandoned_tickets.add(ticket)
+                raise
+
+    def release(self, start_time: float, outcome: str):
+        """释放槽位并根据结果调整窗口
+
+        Args:
+            start_time: acquire 返回的时间戳
+            outcome: 'success'（API正常返回）、'overload'（429/5xx/超时等）或 'failure'（其他错误，不调整窗口）
+        """
+        now = time.time()
+        latency = now - start_time
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == 'success':
+                if latency <= self.latency_target and self.window < self.max_window:
+                    self.window = min(self.max_window, self.window + 1.0 / self.window)
+                    self.increases += 1
+            elif outcome == 'overload':
+                if start_time >= self._last_decrease_time and self.window > self.min_window:
+                    self.window = max(self.min_window, self.window * self.decrease_factor)
+                    self._last_decrease_time = now
+                    self.decreases += 1
+            self._notify_locked()
+
+    def status(self) -> str:
+        return f"并发 {self.in_flight}/{int(self.window)}，排队 {self.rejections} 次"
+
+    def summary(self) -> str:
+        return (f"并发控制：最终窗口 {int(self.window)}（范围 {self.min_window}-{self.max_window}），"
+                f"峰值并发 {self.peak_in_flight}，扩大 {self.increases} 次，收缩 {self.decreases} 次，排队 {self.rejections} 次")
+
+class RetryPolicy:
+    """按错误类别区分的重试策略
+
+    - 指数退避 + 全抖动：第 n 次失败后在 [0, min(上限, 基数 × 2^(n-1))] 内随机等待，
+      避免大量并发请求在同一时刻集中重试
+    - 响应带有 Retry-After（秒数或HTTP日期）时，等待时间不少于服务器要求的时长
+    - 每种错误类别有独立的重试预算；客户端错误（除429外的4xx）几乎不可能通过重试恢复
+    - 验证失败以外的API失败另有合计上限（默认 10 次，与按类别计数之前相同），避免单个请求在各类别间累计数十次调用
+    - 统计退避等待与API调用的累计耗时，运行结束时输出两者的比例
+    """
+    # 错误类别 -> (基础等待秒数, 最长等待秒数, 重试预算即允许的最多失败次数)
+    # 可恢复的类别单独最多 10 次（长尾请求可能连续超时多次），同时受 API 失败合计上限约束，可通过 TRANSLATION_RETRY_BUDGETS 调低；
+    # 客户端错误（认证失败、请求格式错误等）重试不会改变结果，失败一次即放弃
+    DEFAULT_SCHEDULE = {
+        'rate_limit': (2.0, 60.0, 10),
+        'server_error': (2.0, 30.0, 10),
+        'timeout': (2.0, 30.0, 10),
+        'connection': (2.0, 30.0, 10),
+        'client_error': (1.0, 5.0, 1),
+        'other': (1.0, 10.0, 10),  # 主要是无法解析的模型输出，重试通常能恢复
+        'validation': (0.5, 2.0, 10),
+    }
+    DEFAULT_API_BUDGET = 10  # 验证失败以外所有类别合计允许的最多失败次数（预算配置中的 api 项）
+    MAX_RETRY_AFTER = 300.0  # 服务器要求的等待时间上限，避免异常响应让请求无限期挂起
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, rng: Optional[random.Random] = None):
+        self.schedule = dict(self.DEFAULT_SCHEDULE)
+        self.api_budget = self.DEFAULT_API_BUDGET
+        for error_class, budget in (budgets or {}).items():
+            if error_class == 'api':
+                self.api_budget = budget
+                continue
+            base, cap, _ = self.schedule.get(error_class, self.schedule['other'])
+            self.schedule[error_class] = (base, cap, budget)
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.backoff_time: Counter = Counter()  # 错误类别 -> 累计退避秒数
+        self.retry_after_hits = 0
+        self.work_time = 0.0  # API调用（占用并发槽位）的累计秒数
+        self.attempts = 0
+
+    def budget(self, error_class: str) -> int:
+        return self.schedule.get(error_class, self.schedule['other'])[2]
+
+    def should_retry(self, error_class: str, failures: int, api_failures: int = 0) -> bool:
+        """该类别已失败 failures 次、API失败合计 api_failures 次后是否还允许重试（验证失败不计入合计上限）"""
+        if error_class != 'validation' and api_failures >= self.api_budget:
+            return False
+        return failures < self.budget(error_class)
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """读取错误响应中的 Retry-After（秒），不存在或无法解析时返回 None"""
+        headers = getattr(error, 'headers', None) or {}
+        value = next((v for k, v in headers.items() if k.lower() == 'retry-after'), None)
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def next_delay(self, error_class: str, failures: int, error: Optional[Exception] = None) -> float:
+        """计算第 failures 次失败后的等待秒数，并计入退避耗时统计"""
+        base, cap, _ = self.schedule.get(error_class, self.schedule['other'])
+        delay = self._rng.uniform(0, min(cap, base * (2 ** max(0, failures - 1))))
+        retry_after = self.retry_after(error) if error is not None else None
+        with self._lock:
+            if retry_after is not None:
+                self.retry_after_hits += 1
+                delay = max(delay, min(retry_after, self.MAX_RETRY_AFTER))
+            delay = round(delay, 3)
+            self.backoff_time[error_class] += delay
+        return delay
+
+    def record_attempt(self, seconds: float):
+        with self._lock:
+            self.attempts += 1
+            self.work_time += seconds
+
+    def summary(self, breaker: Optional['CircuitBreaker'] = None) -> str:
+        backoff = sum(self.backoff_time.values())
+        paused = breaker.paused_time if breaker is not None else 0.0
+        waiting = backoff + paused
+        share = waiting / (waiting + self.work_time) * 100 if waiting + self.work_time > 0 else 0
+        by_class = "，".join(f"{name} {seconds:.1f}s" for name, seconds in self.backoff_time.most_common() if seconds > 0)
+        text = (f"重试退避：API调用累计 {self.work_time:.1f}s（{self.attempts} 次），退避等待累计 {backoff:.1f}s"
+                f"{f'（{by_class}）' if by_class else ''}，遵循 Retry-After {self.retry_after_hits} 次")
+        if breaker is not None and breaker.enabled:
+            text += f"，熔断 {breaker.opens} 次、暂停累计 {paused:.1f}s"
+        return text + f"；等待占比 {share:.1f}%"
+
+def parse_retry_budgets(value: str) -> Dict[str, int]:
+    """解析 TRANSLATION_RETRY_BUDGETS，如 "rate_limit=10,timeout=2" """
+    budgets: Dict[str, int] = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, count = item.partition('=')
+        try:
+            budgets[name.strip()] = max(0, int(count))
+        except ValueError:
+            log_progress(f"忽略无效的重试预算配置：{item.strip()}", "warning")
+    return budgets
+
+class CircuitBreaker:
+    """所有并发请求共享的熔断器
+
+    - 关闭：正常放行；连续 threshold 次过载类失败（429/5xx/超时/连接错误）后打开
+    - 打开：cooldown 秒内所有请求在发出前暂停，不再向持续失败的API施压
+    - 半开：冷却结束后只放行一个探测请求，成功则关闭；失败则重新打开，冷却时间加倍（不超过 max_cooldown）
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    POLL_INTERVAL = 1.0  # 半开状态下等待探测结果的轮询间隔
+
+    def __init__(self, threshold: int = 8, cooldown: float = 30.0, max_cooldown: float = 300.0, enabled: bool = True):
+        self.enabled = enabled
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opens = 0
+        self.paused_time = 0.0
+        self._open_until = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _pause_remaining(self) -> float:
+        """返回发出请求前还需等待的秒数；返回0时调用方可以立即发出请求"""
+        with self._lock:
+            if not self.enabled or self.state == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now < self._open_until:
+                    return self._open_until - now
+                self.state = self.HALF_OPEN
+                self._probe_started = now
+                return 0.0
+            # 半开：探测请求迟迟没有结果时（如被取消）允许新的探测
+            if self._probe_started is None or now - self._probe_started > self.cooldown:
+                self._probe_started = now
+                return 0.0
+            return self.POLL_INTERVAL
+
+    def _record_pause(self, seconds: float):
+        with self._lock:
+            self.paused_time += seconds
+
+    def wait(self) -> float:
+        """熔断打开时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        pause = self._pause_remaining()
+        while pause > 0:
+            time.sleep(pause)
+            waited += pause
+            pause = self._pause_remaining()
+        if waited:
+            self._record_pause(waited)
+        return waited
+
+    async def wait_async(self) -> float:
+        """wait 的协程版本"""
+        waited = 0.0
+        pause = self._pause_remaining()
+        while pause > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+            pause = self._pause_remaining()
+        if waited:
+            self._record_pause(waited)
+        return waited
+
+    def record(self, overloaded: bool):
+        """记录一次API调用结果：overloaded 表示过载类失败"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not overloaded:
+                if self.state != self.CLOSED:
+                    log_event('circuit_closed', "熔断器关闭：探测请求成功，恢复正常请求", "info")
+                self.state = self.CLOSED
+                self.consecutive_failures = 0
+                self.cooldown = self.base_cooldown
+                self._probe_started = None
+                return
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state == self.OPEN or self.consecutive_failures < self.threshold:
+                return
+            self.state = self.OPEN
+            self.opens += 1
+            self._open_until = time.monotonic() + self.cooldown
+            self._probe_started = None
+            log_event('circuit_open', f"熔断器打开：API连续失败 {self.consecutive_failures} 次，所有请求暂停 {self.cooldown:g} 秒",
+                      "warning", failures=self.consecutive_failures, cooldown=self.cooldown)
+
+class RequestHedger:
+    """对冲请求（可选）：调用耗时超过同模型已观测延迟的指定分位数仍未返回时，
+    再发出一个重复调用（可改用其他模型），采用先成功的结果并取消另一个
+
+    - 同模型的成功调用少于 min_samples 次时不对冲，避免冷启动阶段依据少量样本频繁对冲；
+      等待期间定期重新计算分位数，运行开始时已发出的调用在样本足够后同样可以被对冲
+    - 只有并发窗口中有空闲槽位时才发出对冲调用，不与排队中的正常请求争抢并发
+    - 对冲调用的token在用量报告中单独记为 hedge，便于权衡尾延迟收益与额外费用
+    """
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, hedge_model: Optional[str] = None,
+                 min_samples: int = 20, window: int = 500):
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 1.0), 100.0)
+        self.hedge_model = hedge_model or None
+        self.min_samples = max(1, min_samples)
+        self._latencies: Dict[str, deque] = {}
+        self._window = window
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()  # fired 发出 / won 对冲先返回 / no_slot 无空闲槽位未发出 / cancelled 已取消
+
+    POLL_INTERVAL = 0.25  # 等待主调用期间重新计算对冲时机的间隔（秒）
+
+    def next_wait(self, model: str, started: float) -> Optional[float]:
+        """主调用已等待到 started 之后，返回下一次检查前还应等待的秒数；返回 None 表示应立即发出对冲调用"""
+        delay = self.delay(model)
+        if delay is None:
+            return self.POLL_INTERVAL
+        remaining = started + delay - time.perf_counter()
+        return min(self.POLL_INTERVAL, remaining) if remaining > 0 else None
+
+    def observe(self, model: str, seconds: float):
+        """记录一次成功调用的耗时"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def delay(self, model: str) -> Optional[float]:
+        """返回发出对冲调用前的等待秒数；未启用或样本不足时返回 None（不对冲）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = self._latencies.get(model)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        rank = max(1, math.ceil(self.percentile / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def hedge_config(self, config: 'AttemptConfig') -> 'AttemptConfig':
+        return replace(config, model=self.hedge_model) if self.hedge_model else config
+
+    def record(self, event: str):
+        with self._lock:
+            self.counts[event] += 1
+
+    def summary(self, usage_ledger: 'UsageLedger') -> str:
+        hedge_bucket = usage_ledger.report()['by_outcome'].get('hedge', {})
+        hedge_tokens = int(hedge_bucket.get('prompt_tokens', 0) + hedge_bucket.get('completion_tokens', 0))
+        total = usage_ledger.total_tokens
+        return (f"对冲请求：发出 {self.counts['fired']} 次（对冲先返回 {self.counts['won']} 次，"
+                f"因无空闲槽位未发出 {self.counts['no_slot']} 次），对冲调用消耗 {hedge_tokens} token"
+                f"（{hedge_tokens / total if total else 0:.1%}），估算费用 ${hedge_bucket.get('cost', 0):.4f}")
+
+class StreamingParseError(ValueError):
+    """流式输出无法按扁平JSON对象解析
+
+    Attributes:
+        key: 值类型错误时对应的键，其余结构错误为 None
+    """
+    def __init__(self, message: str, key: Optional[str] = None):
+        super().__init__(message)
+        self.key = key
+
+class StreamingObjectParser:
+    """增量解析模型输出的扁平JSON对象 {"key": "value", ...}
+
+    每次 feed() 追加一段输出，返回其中新完成的 (key, value)；跳过开头的 ```json 代码块标记，
+    对象结束后的内容忽略。值必须是字符串，遇到数组、对象、数字等值或非JSON输出时抛出 StreamingParseError
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.state = 'start'  # start → key_or_end / key → colon → value → separator → done
+        self.pending_key: Optional[str] = None
+        # 未完整的字符串已扫描到的位置（相对 pos 的偏移）：下次 feed 从此处继续查找结束引号，
+        # 避免长字符串被反复从头扫描；引号是否被转义通过回溯其前面的反斜杠判断，无需另存转义状态
+        self.scan_offset = 1
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+            self.pos += 1
+
+    def _string_end(self) -> Optional[int]:
+        """返回从 pos 开始的JSON字符串的结束位置（不含），字符串尚未完整时返回 None 并记住扫描位置"""
+        buffer = self.buffer
+        index = self.pos + self.scan_offset
+        while True:
+            quote = buffer.find('"', index)
+            if quote == -1:
+                self.scan_offset = len(buffer) - self.pos
+                return None
+            # 前面有奇数个连续反斜杠的引号是转义字符（字符串开头的引号保证回溯不会越过本字符串）
+            backslashes = 0
+            while buffer[quote - 1 - backslashes] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                self.scan_offset = 1
+                return quote + 1
+            index = quote + 1
+
+    def _read_string(self, what: str) -> Optional[str]:
+        end = self._string_end()
+        if end is None:
+            return None
+        try:
+            value = json.loads(self.buffer[self.pos:end])
+        except json.JSONDecodeError as e:
+            raise StreamingParseError(f"{what}不是合法的JSON字符串: {e}") from e
+        self.pos = end
+        return value
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self.buffer += text
+        completed = []
+        while self.state != 'done':
+            self._skip_whitespace()
+            if self.pos >= len(self.buffer):
+                break
+            char = self.buffer[self.pos]
+            if self.state == 'start':
+                if self.buffer.startswith('`', self.pos):
+                    # 代码块标记行（```json），等待整行到达后跳过
+                    line_end = self.buffer.find('\n', self.pos)
+                    if line_end == -1:
+                        break
+                    self.pos = line_end + 1
+                    continue
+                if char != '{':
+                    raise StreamingParseError("输出不是JSON对象")
+                self.pos += 1
+                self.state = 'key_or_end'
+            elif self.state in ('key_or_end', 'key'):
+                if char == '}' and self.state == 'key_or_end':
+                    self.pos += 1
+                    self.state = 'done'
+                    continue
+                if char != '"':
+                    raise StreamingParseError("键不是字符串")
+                key = self._read_string("键")
+                if key is None:
+                    break
+                self.pending_key = key
+                self.state = 'colon'
+            elif self.state == 'colon':
+                if char != ':':
+                    raise StreamingParseError(f"键 '{self.pending_key}' 后缺少冒号")
+                self.pos += 1
+                self.state = 'value'
+            elif self.state == 'value':
+                if char != '"':
+                    raise StreamingParseError(f"键 '{self.pending_key}' 的值不是字符串", self.pending_key)
+                value = self._read_string("值")
+                if value is None:
+                    break
+                completed.append((self.pending_key, value))
+                self.pending_key = None
+                self.state = 'separator'
+            elif self.state == 'separator':
+                if char not in ',}':
+                    raise StreamingParseError("值之后缺少逗号或右大括号")
+                self.pos += 1
+                self.state = 'key' if char == ',' else 'done'
+        # 已解析的部分不再需要，避免长输出反复拼接
+        if self.pos > 4096:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return completed
+
+class StreamingResponseReader:
+    """消费一次流式调用的 SSE 响应：拼接增量输出，逐键验证，输出明显出错时中止请求
+
+    作为传输层 post_stream 的逐行回调使用。中止时抛出的异常经传输层关闭连接，服务器随之停止生成：
+    - 键名不在请求中、值不是字符串，或核心键的占位符不一致：抛出 TranslationValidationError，
+      携带已通过检查的键，沿用部分接受与失败键缩小重试
+    - 尚未完成任何键时输出已无法解析（如不是JSON对象）：抛出 ValueError（与非流式的JSON解析失败归为同一类错误）
+    上下文键的占位符错误不中止，由完整输出的验证处理
+    """
+    def __init__(self, texts: Dict[str, any], core_keys: Optional[List[str]],
+                 check_value: Callable[[any, str], bool], timeout: float):
+        self.texts = texts
+        self.core_keys = set(core_keys) if core_keys is not None else set(texts)
+        self.check_value = check_value
+        self.deadline = time.perf_counter() + timeout
+        self.started = time.perf_counter()
+        self.parser = StreamingObjectParser()
+        self.content_parts: List[str] = []
+        self.accepted: Dict[str, str] = {}
+        self.received: Set[str] = set()
+        self.usage: Optional[Dict] = None
+        self.first_key_time: Optional[float] = None  # 首个键完成的耗时（秒）
+        self.abort_reason: Optional[str] = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self.content_parts)
+
+    def on_line(self, line: str):
+        if not line.startswith('data:'):
+            return
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        chunk = json.loads(data)
+        if chunk.get('usage'):
+            self.usage = chunk['usage']
+        for choice in chunk.get('choices') or []:
+            # 思考模式的推理内容（reasoning_content）不参与解析
+            text = (choice.get('delta') or {}).get('content')
+            if text:
+                self.content_parts.append(text)
+                self._consume(text)
+        # 流式读取的超时只约束相邻两次读取的间隔，这里补充整次调用的超时
+        if time.perf_counter() > self.deadline:
+            raise ApiTimeoutError("流式响应超过请求超时时间")
+
+    def _consume(self, text: str):
+        try:
+            completed = self.parser.feed(text)
+        except StreamingParseError as e:
+            if e.key is None and not self.received:
+                self.abort_reason = str(e)
+                raise ValueError(f"JSON解析失败: 流式输出中止（{e}）") from e
+            self._abort(str(e))
+        for key, value in completed:
+            if self.first_key_time is None:
+                self.first_key_time = time.perf_counter() - self.started
+            if key not in self.texts:
+                self._abort(f"多余键: {key}")
+            self.received.add(key)
+            if self.check_value(self.texts[key], value):
+                self.accepted[key] = value
+            elif key in self.core_keys:
+                self._abort(f"键 '{key}' 的占位符不一致")
+
+    def _abort(self, reason: str):
+        self.abort_reason = reason
+        failed_keys = [k for k in self.texts if k not in self.accepted]
+        raise TranslationValidationError(f"翻译验证失败: 流式输出中止（{reason}）", dict(self.accepted), failed_keys)
+
+    def unreceived(self) -> Dict[str, any]:
+        return {k: v for k, v in self.texts.items() if k not in self.received}
+
+class StreamStats:
+    """流式调用统计：首个键耗时与提前中止节省的输出"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.aborts = 0
+        self.first_key_times: List[float] = []
+        self.saved_tokens = 0.0  # 中止时尚未生成的估算输出token
+        self.saved_seconds = 0.0
+
+    def record(self, reader: StreamingResponseReader, saved_tokens: float = 0.0, saved_seconds: float = 0.0):
+        with self._lock:
+            self.calls += 1
+            if reader.first_key_time is not None:
+                self.first_key_times.append(reader.first_key_time)
+            if reader.abort_reason is not None:
+                self.aborts += 1
+                self.saved_tokens += saved_tokens
+                self.saved_seconds += saved_seconds
+
+    def first_key_percentile(self, percentile: float) -> float:
+        with self._lock:
+            ordered = sorted(self.first_key_times)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))]
+
+    def summary(self) -> str:
+        return (f"流式输出：{self.calls} 次调用，首个键耗时 p50 {self.first_key_percentile(50):.2f}s / "
+                f"p90 {self.first_key_percentile(90):.2f}s；提前中止 {self.aborts} 次，"
+                f"估算节省输出 {int(self.saved_tokens)} token、{self.saved_seconds:.1f}s")
+
+@dataclass
+class TransportResponse:
+    """传输层响应"""
+    status_code: int
+    headers: Dict[str, str]
+    text: str
+    elapsed: float  # 请求总耗时（秒）
+    connect_time: float  # 其中建立连接（TCP + TLS 握手）的耗时，复用连接时为0
+
+    @property
+    def server_time(self) -> float:
+        """扣除连接建立后的耗时（请求发送 + 服务器处理 + 响应传输）"""
+        return max(0.0, self.elapsed - self.connect_time)
+
+class TransportStats:
+    """传输层统计：区分连接建立耗时与服务器耗时"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_time = 0.0
+        self.total_time = 0.0
+        self.latencies: List[float] = []  # 每次请求的总耗时，用于计算延迟分位数
+
+    def record(self, response: TransportResponse):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(response.elapsed)
+            self.total_time += response.elapsed
+            self.connect_time += response.connect_time
+            if response.connect_time > 0:
+                self.new_connections += 1
+
+    def summary(self, transport_name: str) -> str:
+        share = (self.connect_time / self.total_time) * 100 if self.total_time > 0 else 0
+        server_avg = (self.total_time - self.connect_time) / self.requests if self.requests else 0
+        return (f"网络传输（{transport_name}）：{self.requests} 次请求，新建连接 {self.new_connections} 次，"
+                f"连接耗时 {self.connect_time:.2f}s（占API时间 {share:.1f}%），平均服务器耗时 {server_avg:.2f}s")
+
+# 当前线程在本次请求中建立连接的耗时（由计时连接类累加）
+_connect_timing = threading.local()
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.value = getattr(_connect_timing, 'value', 0.0) + time.perf_counter() - start
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.value = getattr(_connect_timing, 'value', 0.0) + time.perf_counter() - start
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """使用计时连接类的适配器，用于测量握手耗时"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+class RequestsTransport:
+    """基于 requests.Session 的 HTTP/1.1 传输：线程安全连接池 + keep-alive"""
+    name = "HTTP/1.1 keep-alive"
+
+    def __init__(self, pool_size: int = 64):
+        self.stats = TransportStats()
+        self.session = requests.Session()
+        adapter = _TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url: str, headers: Dict[str, str], body: bytes, timeout: float) -> TransportResponse:
+        _connect_timing.value = 0.0
+        start_time = time.time()
+        try:
+            response = self.session.post(url, headers=headers, data=body, timeout=timeout)
+        except requests.exceptions.Timeout as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=response.text,
+            elapsed=time.time() - start_time,
+            connect_time=getattr(_connect_timing, 'value', 0.0)
+        )
+        self.stats.record(result)
+        return result
+
+    def post_stream(self, url: str, headers: Dict[str, str], body: bytes, timeout: float,
+                    on_line: Callable[[str], None]) -> TransportResponse:
+        """流式POST：对 SSE 响应的每个非空行调用 on_line；on_line 抛出异常时关闭连接并向上传播
+
+        成功响应的 text 为空，内容由 on_line 消费；错误响应读取完整响应体
+        """
+        _connect_timing.value = 0.0
+        start_time = time.time()
+        try:
+            # 未读完的流式响应在退出时关闭连接而不是放回连接池，服务器随之停止生成
+            with self.session.post(url, headers=headers, data=body, timeout=timeout, stream=True) as response:
+                text = response.text if response.status_code >= 400 else ""
+                if response.status_code < 400:
+                    for line in response.iter_lines():
+                        if line:
+                            on_line(line.decode('utf-8'))
+        except requests.exceptions.Timeout as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=text,
+            elapsed=time.time() - start_time,
+            connect_time=getattr(_connect_timing, 'value', 0.0)
+        )
+        self.stats.record(result)
+        return result
+
+    def close(self):
+        self.session.close()
+
+class HttpxTransport:
+    """基于 httpx 的 HTTP/2 多路复用传输（可选依赖：pip install "httpx[http2]"）"""
+    name = "HTTP/2"
+
+    def __init__(self, pool_size: int = 64):
+        import httpx  # 可选依赖，仅在启用 HTTP/2 时导入
+        self._httpx = httpx
+        logging.getLogger('httpx').setLevel(logging.WARNING)  # 避免每个请求都写入主日志
+        self.stats = TransportStats()
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    def post(self, url: str, headers: Dict[str, str], body: bytes, timeout: float) -> TransportResponse:
+        started: Dict[str, float] = {}
+        timing = {'connect': 0.0}
+
+        def trace(event_name: str, info: dict):
+            # 仅统计 TCP 建连与 TLS 握手阶段
+            for phase in ('connection.connect_tcp', 'connection.start_tls'):
+                if event_name == f"{phase}.started":
+                    started[phase] = time.perf_counter()
+                elif event_name == f"{phase}.complete" and phase in started:
+                    timing['connect'] += time.perf_counter() - started.pop(phase)
+
+        start_time = time.time()
+        try:
+            response = self.client.post(url, headers=headers, content=body, timeout=timeout,
+                                        extensions={'trace': trace})
+        except self._httpx.TimeoutException as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except self._httpx.TransportError as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=response.text,
+            elapsed=time.time() - start_time,
+            connect_time=timing['connect']
+        )
+        self.stats.record(result)
+        return result
+
+    def post_stream(self, url: str, headers: Dict[str, str], body: bytes, timeout: float,
+                    on_line: Callable[[str], None]) -> TransportResponse:
+        """流式POST，语义同 RequestsTransport.post_stream（中止时关闭对应的HTTP/2流）"""
+        started: Dict[str, float] = {}
+        timing = {'connect': 0.0}
+
+        def trace(event_name: str, info: dict):
+            for phase in ('connection.connect_tcp', 'connection.start_tls'):
+                if event_name == f"{phase}.started":
+                    started[phase] = time.perf_counter()
+                elif event_name == f"{phase}.complete" and phase in started:
+                    timing['connect'] += time.perf_counter() - started.pop(phase)
+
+        start_time = time.time()
+        try:
+            with self.client.stream('POST', url, headers=headers, content=body, timeout=timeout,
+                                    extensions={'trace': trace}) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    text = response.text
+                else:
+                    text = ""
+                    for line in response.iter_lines():
+                        if line:
+                            on_line(line)
+        except self._httpx.TimeoutException as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except self._httpx.TransportError as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=text,
+            elapsed=time.time() - start_time,
+            connect_time=timing['connect']
+        )
+        self.stats.record(result)
+        return result
+
+    def close(self):
+        self.client.close()
+
+def create_transport(pool_size: int):
+    """根据环境变量创建传输层；HTTP/2 依赖缺失时回退到 HTTP/1.1"""
+    if os.getenv('TRANSLATION_HTTP2', 'false').lower() == 'true':
+        try:
+            return HttpxTransport(pool_size)
+        except ImportError as e:
+            log_progress(f"HTTP/2 传输不可用（{e}），回退到 HTTP/1.1 keep-alive", "warning")
+    return RequestsTransport(pool_size)
+
+class AsyncHttpxTransport:
+    """基于 httpx.AsyncClient 的异步传输，供异步引擎在单事件循环中复用连接"""
+
+    def __init__(self, pool_size: int = 64, http2: bool = False):
+        import httpx  # 可选依赖
+        self._httpx = httpx
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+        self.stats = TransportStats()
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        try:
+            self.client = httpx.AsyncClient(http2=http2, limits=limits)
+        except ImportError:
+            # 未安装 h2 时退回 HTTP/1.1
+            http2 = False
+            self.client = httpx.AsyncClient(limits=limits)
+        self.name = f"httpx 异步 {'HTTP/2' if http2 else 'HTTP/1.1'}"
+
+    async def post(self, url: str, headers: Dict[str, str], body: bytes, timeout: float) -> TransportResponse:
+        started: Dict[str, float] = {}
+        timing = {'connect': 0.0}
+
+        async def trace(event_name: str, info: dict):
+            for phase in ('connection.connect_tcp', 'connection.start_tls'):
+                if event_name == f"{phase}.started":
+                    started[phase] = time.perf_counter()
+                elif event_name == f"{phase}.complete" and phase in started:
+                    timing['connect'] += time.perf_counter() - started.pop(phase)
+
+        start_time = time.time()
+        try:
+            response = await self.client.post(url, headers=headers, content=body, timeout=timeout,
+                                              extensions={'trace': trace})
+        except self._httpx.TimeoutException as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except self._httpx.TransportError as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=response.text,
+            elapsed=time.time() - start_time,
+            connect_time=timing['connect']
+        )
+        self.stats.record(result)
+        return result
+
+    async def post_stream(self, url: str, headers: Dict[str, str], body: bytes, timeout: float,
+                          on_line: Callable[[str], None]) -> TransportResponse:
+        """post 的流式版本，语义同 RequestsTransport.post_stream"""
+        started: Dict[str, float] = {}
+        timing = {'connect': 0.0}
+
+        async def trace(event_name: str, info: dict):
+            for phase in ('connection.connect_tcp', 'connection.start_tls'):
+                if event_name == f"{phase}.started":
+                    started[phase] = time.perf_counter()
+                elif event_name == f"{phase}.complete" and phase in started:
+                    timing['connect'] += time.perf_counter() - started.pop(phase)
+
+        start_time = time.time()
+        try:
+            async with self.client.stream('POST', url, headers=headers, content=body, timeout=timeout,
+                                          extensions={'trace': trace}) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    text = response.text
+                else:
+                    text = ""
+                    async for line in response.aiter_lines():
+                        if line:
+                            on_line(line)
+        except self._httpx.TimeoutException as e:
+            raise ApiTimeoutError(f"请求超时: {e}") from e
+        except self._httpx.TransportError as e:
+            raise ApiConnectionError(f"连接失败: {e}") from e
+        result = TransportResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            text=text,
+            elapsed=time.time() - start_time,
+            connect_time=timing['connect']
+        )
+        self.stats.record(result)
+        return result
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class ThreadedAsyncTransport:
+    """未安装 httpx 时的回退方案：在线程池中调用同步传输"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.stats = transport.stats
+        self.name = f"{transport.name}（线程池回退）"
+
+    async def post(self, url: str, headers: Dict[str, str], body: bytes, timeout: float) -> TransportResponse:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.transport.post, url, headers, body, timeout)
+
+    async def post_stream(self, url: str, headers: Dict[str, str], body: bytes, timeout: float,
+                          on_line: Callable[[str], None]) -> TransportResponse:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.transport.post_stream, url, headers, body, timeout, on_line)
+
+    async def aclose(self):
+        pass
+
+def create_async_transport(pool_size: int, sync_transport):
+    """创建异步传输；未安装 httpx 时回退到线程池包装的同步传输"""
+    try:
+        return AsyncHttpxTransport(pool_size, http2=os.getenv('TRANSLATION_HTTP2', 'false').lower() == 'true')
+    except ImportError:
+        log_progress("未安装 httpx，异步引擎回退到线程池执行HTTP请求", "warning")
+        return ThreadedAsyncTransport(sync_transport)
+
+# DeepSeek 官方价格（美元/百万token），价格调整时同步更新
+TOKEN_PRICES = {
+    'deepseek-chat': {'cache_hit': 0.028, 'cache_miss': 0.28, 'output': 0.42},
+    'deepseek-reasoner': {'cache_hit': 0.028, 'cache_miss': 0.28, 'output': 0.42},
+}
+USAGE_FIELDS = ('prompt_tokens', 'completion_tokens', 'reasoning_tokens', 'prompt_cache_hit_tokens', 'prompt_cache_miss_tokens')
+USAGE_OUTCOMES = ('success', 'validation_retry', 'api_retry')
+
+class UsageLedger:
+    """API用量与费用统计
+
+    按命名空间、语言、模型和结果（success / validation_retry / api_retry）累计每次调用的token数与估算费用；
+    可设置token或费用预算，达到预算后 admit() 返回 False，不再发送新的请求（已发出的请求照常完成）。
+    """
+
+    def __init__(self, token_budget: int = 0, cost_budget: float = 0.0):
+        self.token_budget = max(0, token_budget)
+        self.cost_budget = max(0.0, cost_budget)
+        self.totals = self._new_bucket()
+        self.breakdown: Dict[str, Dict[str, Dict[str, float]]] = {
+            'namespace': {}, 'language': {}, 'model': {}, 'outcome': {}
+        }
+        self.skipped_requests = 0
+        self._exhausted = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_bucket() -> Dict[str, float]:
+        return {'calls': 0, **{name: 0 for name in USAGE_FIELDS}, 'cost': 0.0}
+
+    @staticmethod
+    def parse_usage(usage: Optional[Dict]) -> Dict[str, int]:
+        """从响应的 usage 中取出各项token数；推理token位于 completion_tokens_details 中"""
+        if not isinstance(usage, dict):
+            return {}
+        parsed = {name: usage[name] for name in USAGE_FIELDS if isinstance(usage.get(name), int)}
+        details = usage.get('completion_tokens_details')
+        if isinstance(details, dict) and isinstance(details.get('reasoning_tokens'), int):
+            parsed['reasoning_tokens'] = details['reasoning_tokens']
+        return parsed
+
+    @staticmethod
+    def estimate_cost(model: str, tokens: Dict[str, int]) -> float:
+        prices = TOKEN_PRICES.get(model, TOKEN_PRICES['deepseek-reasoner'])
+        cache_hit = tokens.get('prompt_cache_hit_tokens', 0)
+        cache_miss = tokens.get('prompt_cache_miss_tokens', max(0, tokens.get('prompt_tokens', 0) - cache_hit))
+        return (cache_hit * prices['cache_hit'] + cache_miss * prices['cache_miss']
+                + tokens.get('completion_tokens', 0) * prices['output']) / 1_000_000
+
+    def record(self, namespace: str, language: str, model: str, outcome: str, tokens: Dict[str, int]):
+        cost = self.estimate_cost(model, tokens)
+        with self._lock:
+            buckets = [self.totals]
+            for dimension, value in (('namespace', namespace), ('language', language), ('model', model), ('outcome', outcome)):
+                buckets.append(self.breakdown[dimension].setdefault(value, self._new_bucket()))
+            for bucket in buckets:
+                bucket['calls'] += 1
+                for name, value in tokens.items():
+                    bucket[name] += value
+                bucket['cost'] += cost
+
+    @property
+    def total_tokens(self) -> int:
+        return self.totals['prompt_tokens'] + self.totals['completion_tokens']
+
+    def admit(self) -> bool:
+        """是否允许发送新的请求；达到预算后返回 False 并计数"""
+        with self._lock:
+            if not self._exhausted:
+                if self.token_budget and self.total_tokens >= self.token_budget:
+                    reason = f"token {self.total_tokens}/{self.token_budget}"
+                elif self.cost_budget and self.totals['cost'] >= self.cost_budget:
+                    reason = f"费用 ${self.totals['cost']:.4f}/${self.cost_budget:.4f}"
+                else:
+                    return True
+                self._exhausted = True
+                log_progress(f"已达到用量预算（{reason}），停止发送新的请求", "warning")
+            self.skipped_requests += 1
+            return False
+
+    def report(self) -> Dict:
+        """机器可读的用量报告"""
+        def rounded(bucket: Dict[str, float]) -> Dict[str, float]:
+            return {**bucket, 'cost': round(bucket['cost'], 6)}
+
+        with self._lock:
+            retry_tokens = sum(self.breakdown['outcome'].get(outcome, {}).get(name, 0)
+                               for outcome in ('validation_retry', 'api_retry')
+                               for name in ('prompt_tokens', 'completion_tokens'))
+            return {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'prices_per_million_tokens': TOKEN_PRICES,
+                'budget': {
+                    'tokens': self.token_budget or None,
+                    'cost': self.cost_budget or None,
+                    'exhausted': self._exhausted,
+                    'skipped_requests': self.skipped_requests
+                },
+                'totals': {**rounded(self.totals), 'retry_tokens': retry_tokens},
+                **{f'by_{dimension}': {key: rounded(bucket) for key, bucket in sorted(buckets.items())}
+                   for dimension, buckets in self.breakdown.items()}
+            }
+
+    def save(self, file_path: str = USAGE_REPORT_FILE) -> bool:
+        try:
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, file_path)
+            return True
+        except Exception as e:
+            log_progress(f"保存用量报告失败：{e}", "warning")
+            return False
+
+    def summary(self) -> str:
+        totals = self.totals
+        prompt_tokens = totals['prompt_tokens']
+        hit_rate = totals['prompt_cache_hit_tokens'] / prompt_tokens if prompt_tokens else 0.0
+        total = self.total_tokens
+        retry = sum(bucket['prompt_tokens'] + bucket['completion_tokens']
+                    for outcome, bucket in self.breakdown['outcome'].items() if outcome not in ('success', 'hedge'))
+        text = (f"用量：{totals['calls']} 次有效响应，输入 {prompt_tokens} token（上下文缓存命中 {hit_rate:.1%}），"
+                f"输出 {totals['completion_tokens']} token（推理 {totals['reasoning_tokens']}），"
+                f"重试消耗 {retry} token（{retry / total if total else 0:.1%}），估算费用 ${totals['cost']:.4f}")
+        if self.skipped_requests:
+            text += f"；因达到预算跳过 {self.skipped_requests} 个请求"
+        return text
+
+class ResultStream:
+    """按 (命名空间, 语言) 跟踪尚未完成的请求数
+
+    某个组合的所有批次（含多语言分组请求中的该语言）完成后，立即将其结果交给回调写回文件并从内存中移除，
+    已完成的语言无需等待仍在重试的慢请求，内存占用只与进行中的组合数有关。
+    """
+
+    def __init__(self, requests: List, on_pair_complete: Optional[Callable[[str, str, Dict[str, str]], None]] = None):
+        self.pending: Counter = Counter()
+        for request in requests:
+            namespace = getattr(request, 'namespace', 'default')
+            for lang_code, _ in request.languages:
+                self.pending[(namespace, lang_code)] += 1
+        self.on_pair_complete = on_pair_complete
+        self.namespaces_completed: Set[str] = set()
+        self.pairs_streamed = 0
+        self.translations_streamed = 0
+
+    def request_done(self, results_by_namespace_and_language: Dict, request):
+        """请求完成（无论成功与否）后调用；组合的最后一个请求完成时触发回调"""
+        if self.on_pair_complete is None:
+            return
+        namespace = getattr(request, 'namespace', 'default')
+        for lang_code, _ in request.languages:
+            pair = (namespace, lang_code)
+            self.pending[pair] -= 1
+            if self.pending[pair] > 0:
+                continue
+            del self.pending[pair]
+            namespace_results = results_by_namespace_and_language.get(namespace, {})
+            translated = namespace_results.pop(lang_code, {})
+            if namespace in results_by_namespace_and_language and not namespace_results:
+                del results_by_namespace_and_language[namespace]
+            if translated:
+                self.namespaces_completed.add(namespace)
+            self.pairs_streamed += 1
+            self.translations_streamed += len(translated)
+            try:
+                self.on_pair_complete(namespace, lang_code, translated)
+            except Exception as e:
+                log_progress(f"  [{namespace}] 写回 {lang_code} 失败: {str(e)}", "error")
+
+# 不影响是否需要翻译的标记：Minecraft 格式化占位符（%s、%1$s、%d、%%）与 § 格式代码
+UNTRANSLATABLE_MARKUP_PATTERN = re.compile(r'%(?:\d+\$)?[sd]|%%|§[0-9a-fk-or]', re.IGNORECASE)
+# 任意语言的字母（含中日韩文字）；不含字母的文本无需翻译
+LETTER_PATTERN = re.compile(r'[^\W\d_]')
+
+def is_untranslatable(value: any) -> bool:
+    """空字符串、纯标点/符号/数字、只含占位符与格式代码的文本无需翻译，译文即源文本（列表值始终交给模型）"""
+    if isinstance(value, list):
+        return False
+    return not LETTER_PATTERN.search(UNTRANSLATABLE_MARKUP_PATTERN.sub('', str(value)))
+
+class SourceDeduplicator:
+    """跨命名空间与语言的源文本去重
+
+    规划阶段按 (规范化源文本, 目标语言) 合并各任务的核心键：每个组合只有第一次出现的键发送到API，
+    其余键记为它的别名；无需翻译的文本不发送，译文直接使用源文本。
+    执行阶段包装逐组合写回回调：组合完成后补齐别名与跳过的键再写回，所依赖的组合尚未完成时暂缓写回；
+    所有键都被合并或跳过的组合没有请求，在依赖完成后直接写回。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # 以下均以 (命名空间, 语言) 为键
+        self._aliases: Dict[Tuple[str, str], Dict[str, Tuple[str, str]]] = {}  # 别名键 -> (所属命名空间, 所属键)
+        self._fixed: Dict[Tuple[str, str], Dict[str, str]] = {}  # 无需翻译的键 -> 源文本
+        self._owner_keys: Dict[Tuple[str, str], Set[str]] = {}  # 发送到API的首次出现的键
+        self._referenced: Dict[Tuple[str, str], Set[str]] = {}  # 被别名引用的首次出现的键
+        self._pending: Set[Tuple[str, str]] = set()  # 仍有请求在执行的组合
+        self._done: Dict[Tuple[str, str], Dict[str, str]] = {}  # 已完成组合中被引用的键的译文
+        self._waiting: Dict[Tuple[str, str], Dict[str, str]] = {}  # 等待写回的组合及其结果
+        self._on_pair_complete: Optional[Callable[[str, str, Dict[str, str]], None]] = None
+        self.duplicate_keys = 0
+        self.untranslatable_keys = 0
+        self.saved_tokens = 0.0
+
+    @staticmethod
+    def _core_keys(texts: Dict[str, any]) -> List[str]:
+        core_keys = texts.get('__core_keys__')
+        if core_keys is None:
+            return [k for k in texts if k != '__core_keys__']
+        return [k for k in core_keys if k in texts]
+
+    def deduplicate(self, tasks: List[Dict], texts_field: str,
+                    output_tokens: Callable[[Dict[str, any], str], float]) -> List[Dict]:
+        """返回去重后用于创建请求的任务列表（原任务不修改，仍用于写回）
+
+        Args:
+            tasks: 翻译任务列表，texts_field 为待翻译文本（可含 __core_keys__ 标记）
+            output_tokens: 估算一批文本翻译为指定语言的输出token数，用于统计节省量
+        """
+        self.reset()
+        if not self.enabled:
+            return tasks
+
+        owners: Dict[Tuple[str, str], Tuple[str, str]] = {}  # (规范化源文本, 语言) -> (命名空间, 键)
+        planned = []
+        for task in tasks:
+            namespace, lang_code = task['namespace'], task['lang_code']
+            pair = (namespace, lang_code)
+            texts = task[texts_field]
+            removed: Dict[str, any] = {}
+            for key in self._core_keys(texts):
+                value = texts[key]
+                if is_untranslatable(value):
+                    self._fixed.setdefault(pair, {})[key] = str(value)
+                    self.untranslatable_keys += 1
+                    removed[key] = value
+                    continue
+                owner = owners.setdefault((TranslationMemory.normalize_source(value), lang_code), (namespace, key))
+                # 同一组合的多个任务（差异 + 缺失键）可能包含同一个键，只发送一次
+                if owner == (namespace, key) and key not in self._owner_keys.get(pair, ()):
+                    self._owner_keys.setdefault(pair, set()).add(key)
+                    continue
+                self._aliases.setdefault(pair, {})[key] = owner
+                self._referenced.setdefault((owner[0], lang_code), set()).add(owner[1])
+                self.duplicate_keys += 1
+                removed[key] = value
+            if removed:
+                self.saved_tokens += output_tokens(removed, lang_code)
+            remaining = {k: v for k, v in texts.items() if k not in removed}
+            if '__core_keys__' in texts:
+                remaining['__core_keys__'] = [k for k in texts['__core_keys__'] if k not in removed]
+            if not self._core_keys(remaining):
+                self._waiting.setdefault(pair, {})
+                continue
+            if not removed:
+                planned.append(task)
+                self._pending.add(pair)
+                continue
+            reduced = dict(task)
+            reduced[texts_field] = remaining
+            if 'keys_to_translate' in task:
+                reduced['keys_to_translate'] = [k for k in task['keys_to_translate'] if k not in removed]
+            planned.append(reduced)
+            self._pending.add(pair)
+
+        # 同一组合可能有多个任务：只要有一个任务仍需请求，就等待该组合的请求完成
+        for pair in self._pending:
+            self._waiting.pop(pair, None)
+        if self.duplicate_keys or self.untranslatable_keys:
+            log_progress(f"源文本去重：{self.duplicate_keys} 个重复文本合并到首次出现的键，"
+                         f"{self.untranslatable_keys} 个无需翻译的文本直接使用源文本，"
+                         f"预计节省输出 ~{int(self.saved_tokens)} token")
+        return planned
+
+    def fan_out(self, on_pair_complete: Optional[Callable[[str, str, Dict[str, str]], None]]
+                ) -> Optional[Callable[[str, str, Dict[str, str]], None]]:
+        """包装逐组合写回回调：补齐别名与跳过的键，依赖的组合完成后才写回（执行结束后调用 flush）"""
+        if not self.enabled or on_pair_complete is None or not (self._aliases or self._fixed):
+            return on_pair_complete
+        self._on_pair_complete = on_pair_complete
+
+        def complete(namespace: str, lang_code: str, translated: Dict[str, str]):
+            pair = (namespace, lang_code)
+            with self._lock:
+                self._pending.discard(pair)
+                referenced = self._referenced.get(pair, ())
+                self._done[pair] = {k: translated[k] for k in referenced if k in translated}
+                self._waiting[pair] = translated
+                ready = self._take_ready()
+            self._emit(ready)
+
+        # 没有请求且不依赖其他组合的组合（例如只含无需翻译的文本）立即写回
+        with self._lock:
+            ready = self._take_ready()
+        self._emit(ready)
+        return complete
+
+    def flush(self):
+        """执行结束后写回仍在等待的组合（所依赖的请求异常中止时，缺失的别名留待下次运行补全）"""
+        with self._lock:
+            ready = [(pair, self._merge(pair, translated)) for pair, translated in self._waiting.items()]
+            self._waiting.clear()
+        self._emit(ready)
+        self._on_pair_complete = None
+
+    def _take_ready(self) -> List[Tuple[Tuple[str, str], Dict[str, str]]]:
+        ready = []
+        for pair in list(self._waiting):
+            lang_code = pair[1]
+            if any((owner_namespace, lang_code) in self._pending for owner_namespace, _ in self._aliases.get(pair, {}).values()):
+                continue
+            ready.append((pair, self._merge(pair, self._waiting.pop(pair))))
+        return ready
+
+    def _merge(self, pair: Tuple[str, str], translated: Dict[str, str]) -> Dict[str, str]:
+        merged = dict(translated)
+        merged.update(self._fixed.get(pair, {}))
+        for key, (owner_namespace, owner_key) in self._aliases.get(pair, {}).items():
+            owner_result = self._done.get((owner_namespace, pair[1]), {})
+            if owner_key in owner_result:
+                merged[key] = owner_result[owner_key]
+        return merged
+
+    def _emit(self, ready: List[Tuple[Tuple[str, str], Dict[str, str]]]):
+        if self._on_pair_complete is None:
+            return
+        for (namespace, lang_code), translated in ready:
+            try:
+                self._on_pair_complete(namespace, lang_code, translated)
+            except Exception as e:
+                log_progress(f"  [{namespace}] 写回 {lang_code} 失败: {str(e)}", "error")
+
+    def summary(self) -> str:
+        return (f"源文本去重：合并 {self.duplicate_keys} 个重复文本，跳过 {self.untranslatable_keys} 个无需翻译的文本，"
+                f"节省输出 ~{int(self.saved_tokens)} token（估算）")
+
+TRANSLATION_ENGINES = ('thread', 'async')
+
+# 请求调度：lpt 按估算耗时从长到短提交（最长处理时间优先），避免耗时最长的批次最后才开始而拖长总耗时；
+# plan 按规划顺序提交（仅按共享前缀排列）
+SCHEDULE_POLICIES = ('lpt', 'plan')
+
+# 提示词布局：prefix 将不随请求变化的内容放在最前，使所有请求共享相同的前缀以命中 DeepSeek 上下文缓存；
+# template 按模板原样替换变量
+PROMPT_LAYOUTS = ('prefix', 'template')
+PREFIX_NEUTRAL_LANGUAGE = "目标语言"
+PROMPT_LANGUAGE_SECTION = """## 目标语言
+
+请将上述待翻译内容翻译成{target_language}。以上要求中的“{neutral}”均指{target_language}。"""
+DEFAULT_CONTENT_SECTION = "## 待翻译内容\n\n```json\n{{content_to_translate}}\n```"
+
+def split_prompt_content_section(template: str) -> Tuple[str, str]:
+    """将用户提示词模板拆分为（规则部分, 待翻译内容小节）
+
+    待翻译内容小节从 {{content_to_translate}} 之前最近的二级标题开始，到之后的下一个二级标题为止；
+    模板中没有该变量时使用默认小节
+    """
+    placeholder = "{{content_to_translate}}"
+    if placeholder not in template:
+        return template.strip(), DEFAULT_CONTENT_SECTION
+    before, after = template.split(placeholder, 1)
+    section_start = before.rfind("\n## ")
+    if section_start == -1:
+        section_start = before.rfind("\n")
+    section_start += 1
+    section_end = after.find("\n## ")
+    if section_end == -1:
+        section_end = len(after)
+    rules = (before[:section_start].rstrip() + "\n\n" + after[section_end:].strip()).strip()
+    section = (before[section_start:] + placeholder + after[:section_end]).strip()
+    return rules, section
+
+@dataclass(frozen=True)
+class AttemptConfig:
+    """单次API调用的执行参数
+
+    不可变：重试状态机按失败次数派生新的配置，并随 'call' 步骤显式交给驱动方，
+    并发请求之间不共享可变的模型/温度状态，某个请求切换模型不会影响其他请求
+    """
+    model: str
+    temperature: float = 1.3
+    timeout: float = 60.0
+    max_tokens: Optional[int] = None  # None 表示不限制输出长度（使用API默认值）
+
+    @staticmethod
+    def model_for(non_thinking_mode: bool) -> str:
+        return "deepseek-chat" if non_thinking_mode else "deepseek-reasoner"
+
+# 验证失败后的温度序列：前5次依次使用，第6次起切换思考模式并重新循环
+VALIDATION_TEMPERATURES = (1.3, 1.3, 1.2, 1.0, 0.7)
 
 class DeepSeekTranslator:
-    def __init__(self, api_key: str, non_thinking_mode: bool = False):
+    def __init__(self, api_key: str, non_thinking_mode: bool = False, transport=None, engine: Optional[str] = None):
         self.api_key = api_key
         self.non_thinking_mode = non_thinking_mode
+        # 每次调用的默认执行参数；重试时由此派生新的配置，运行期间不修改
+        self.base_config = AttemptConfig(
+            model=AttemptConfig.model_for(non_thinking_mode),
+            timeout=float(os.getenv('TRANSLATION_REQUEST_TIMEOUT', '60')),
+            max_tokens=int(os.getenv('TRANSLATION_MAX_OUTPUT_TOKENS', '0')) or None
+        )
+        # 并发引擎：thread（线程池）或 async（asyncio 单事件循环）
+        self.engine = (engine or os.getenv('TRANSLATION_ENGINE', 'thread')).lower()
+        if self.engine not in TRANSLATION_ENGINES:
+            log_progress(f"未知的并发引擎 {self.engine}，使用 thread", "warning")
+            self.engine = 'thread'
         # 调试模式：在每次请求前记录详细日志（与错误日志格式一致）
         self.debug_mode = os.getenv('TRANSLATION_DEBUG', 'false').lower() == 'true'
         self.headers = {
@@ -211,23 +2440,147 @@ class DeepSeekTranslator:
         self._init_error_logging()
         self.system_prompt = self._load_prompt_template(SYSTEM_PROMPT_FILE)
         self.user_prompt = self._load_prompt_template(USER_PROMPT_FILE)
+        self.prompt_layout = os.getenv('TRANSLATION_PROMPT_LAYOUT', 'prefix').lower()
+        if self.prompt_layout not in PROMPT_LAYOUTS:
+            log_progress(f"未知的提示词布局 {self.prompt_layout}，使用 prefix", "warning")
+            self.prompt_layout = 'prefix'
+        self._init_prompt_prefix()
+        # 提示词模板哈希：模板或布局变化后翻译记忆自动失效
+        self.prompt_hash = hashlib.sha256(
+            f"{self.system_prompt}\0{self.user_prompt}\0{self.prompt_layout}".encode('utf-8')
+        ).hexdigest()[:16]
+        # 翻译记忆：优先复用已验证的译文，只将未命中的文本发送到API
+        self.translation_memory = TranslationMemory(
+            max_entries=int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '50000')),
+            enabled=os.getenv('TRANSLATION_MEMORY', 'true').lower() == 'true'
+        )
+        # 检查点日志：已完成的请求立即落盘，中断后重新运行时跳过（记录同时写入翻译记忆）
+        self.checkpoint_journal = CheckpointJournal(
+            enabled=os.getenv('TRANSLATION_CHECKPOINT', 'true').lower() == 'true'
+        )
+        self.checkpoint_journal.seed_memory(self.translation_memory)
+        # 自适应并发限制：所有工作线程在每次API调用前申请槽位
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial_window=int(os.getenv('TRANSLATION_INITIAL_CONCURRENCY', '8')),
+            max_window=int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '64')),
+            latency_target=float(os.getenv('TRANSLATION_LATENCY_TARGET', '45'))
+        )
+        # 批次规划：按估算token与目标延迟打包批次，并学习各语言的膨胀系数
+        self.batch_planner = BatchPlanner(
+            estimator=create_token_estimator(os.getenv('TRANSLATION_TOKENIZER', 'heuristic').lower()),
+            target_latency=float(os.getenv('TRANSLATION_BATCH_TARGET_LATENCY', '40')),
+            max_tokens=int(os.getenv('TRANSLATION_BATCH_MAX_TOKENS', '4000')),
+            max_keys=int(os.getenv('TRANSLATION_BATCH_MAX_KEYS', '80')),
+            persist=os.getenv('TRANSLATION_BATCH_LEARNING', 'true').lower() == 'true'
+        )
+        # 源文本去重：相同源文本在每种语言中只翻译一次，无需翻译的文本直接使用源文本
+        self.source_dedup = SourceDeduplicator(enabled=os.getenv('TRANSLATION_DEDUP', 'true').lower() == 'true')
+        # 多语言分组：同组语言共用一次API调用，未通过验证的语言回退为单语言请求
+        self.language_groups = parse_language_groups(os.getenv('TRANSLATION_LANGUAGE_GROUPS', 'false'))
+        # 传输层：连接池大小与并发窗口上限一致，所有工作线程共享
+        self.transport = transport or create_transport(self.concurrency_limiter.max_window)
+        self.async_transport = None  # 异步引擎运行时创建
+        # 用量统计：按命名空间/语言/模型/结果累计token与费用，可设置预算上限
+        self.usage_ledger = UsageLedger(
+            token_budget=int(os.getenv('TRANSLATION_TOKEN_BUDGET', '0')),
+            cost_budget=float(os.getenv('TRANSLATION_COST_BUDGET', '0'))
+        )
+        # 重试策略与熔断器：所有请求共享，熔断打开时全部暂停
+        self.retry_policy = RetryPolicy(budgets=parse_retry_budgets(os.getenv('TRANSLATION_RETRY_BUDGETS', '')))
+        self.circuit_breaker = CircuitBreaker(
+            threshold=int(os.getenv('TRANSLATION_CIRCUIT_THRESHOLD', '8')),
+            cooldown=float(os.getenv('TRANSLATION_CIRCUIT_COOLDOWN', '30')),
+            enabled=os.getenv('TRANSLATION_CIRCUIT_BREAKER', 'true').lower() == 'true'
+        )
 
-
+        # 对冲请求：慢调用超过延迟分位数后发出重复调用
+        self.hedger = RequestHedger(
+            enabled=os.getenv('TRANSLATION_HEDGE', 'false').lower() == 'true',
+            percentile=float(os.getenv('TRANSLATION_HEDGE_PERCENTILE', '95')),
+            hedge_model=os.getenv('TRANSLATION_HEDGE_MODEL', '')
+        )
+        self._hedge_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # 流式输出：单语言调用逐键解析与验证，输出明显出错时提前中止
+        self.stream_output = os.getenv('TRANSLATION_STREAM', 'false').lower() == 'true'
+        self.stream_stats = StreamStats()
+
+        # 请求调度：提交顺序决定请求获得并发槽位的先后
+        self.schedule = os.getenv('TRANSLATION_SCHEDULE', 'lpt').lower()
+        if self.schedule not in SCHEDULE_POLICIES:
+            log_progress(f"未知的调度策略 {self.schedule}，使用 lpt", "warning")
+            self.schedule = 'lpt'
+        self._scheduled: List['DeepSeekTranslator.TranslationRequest'] = []  # 最近一次执行的提交顺序
+        # id(请求) -> (开始, 结束, API调用次数)；request_id 只在单个命名空间/任务内唯一
+        self._request_timings: Dict[int, Tuple[float, float, int]] = {}
+
+        # 分段计时：运行结束时输出最慢的请求数
+        self.trace_top = int(os.getenv('TRANSLATION_TRACE_TOP', '10'))
+        # 运行统计：API调用次数、各类失败次数与完成的键数（用于日志汇总与基准测试）
+        self.run_stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _record_stat(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.run_stats[name] += amount
+
+    def finish_run(self):
+        """运行结束：持久化缓存并输出统计信息"""
+        if self.translation_memory.enabled:
+            self.translation_memory.save()
+            log_progress(self.translation_memory.summary())
+        log_progress(self.concurrency_limiter.summary())
+        log_progress(self.retry_policy.summary(self.circuit_breaker))
+        if self.hedger.enabled:
+            log_progress(self.hedger.summary(self.usage_ledger))
+        if self.stream_stats.calls:
+            log_progress(self.stream_stats.summary())
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+            self._hedge_pool = None
+        self._log_schedule_summary()
+        self.batch_planner.save()
+        log_progress(self.batch_planner.summary())
+        stats = self.run_stats
+        log_progress(f"运行统计：完成 {stats['requests_completed']} 个请求、{stats['keys_translated']} 个键，"
+                     f"API调用 {stats['api_calls']} 次（API失败 {stats['api_failures']} 次，验证失败 {stats['validation_failures']} 次）")
+        log_progress(self.usage_ledger.summary())
+        if self.usage_ledger.save(USAGE_REPORT_FILE):
+            log_progress(f"用量报告已保存到 {USAGE_REPORT_FILE}")
+        if self.checkpoint_journal.enabled:
+            self.checkpoint_journal.close()
+            log_progress(self.checkpoint_journal.summary())
+        if self.source_dedup.duplicate_keys or self.source_dedup.untranslatable_keys:
+            log_progress(self.source_dedup.summary())
+        if stats['group_calls']:
+            log_progress(f"多语言分组：{stats['group_calls']} 次分组调用，{stats['group_fallbacks']} 个语言回退为单语言请求")
+        log_progress(self.transport.stats.summary(self.transport.name))
+        log_progress(EVENT_LOG.summary())
+        self._log_trace_summary()
+        if self.async_transport is not None and self.async_transport.stats is not self.transport.stats:
+            log_progress(self.async_transport.stats.summary(self.async_transport.name))
+        self.transport.close()
+
+
+    def _log_trace_summary(self):
+        """输出各阶段累计耗时与最慢的请求，并写出追踪文件"""
+        if not TRACER.enabled:
+            return
+        totals = TRACER.phase_totals()
+        if totals:
+            log_progress("请求阶段累计耗时：" + "，".join(f"{name} {seconds:.2f}s" for name, seconds in totals.most_common()))
+        slowest = TRACER.slowest_requests(self.trace_top)
+        if slowest:
+            log_progress(f"最慢的 {len(slowest)} 个请求：")
+            for name, duration, phases in slowest:
+                breakdown = "，".join(f"{phase} {seconds:.2f}s" for phase, seconds in sorted(phases.items(), key=lambda item: -item[1])[:4])
+                log_progress(f"  {duration:.2f}s  {name}（{breakdown}）")
+        if TRACER.save():
+            log_progress(f"追踪文件已保存到 {TRACE_FILE}（可在 chrome://tracing 或 ui.perfetto.dev 中打开）")
+        TRACER.reset()
 
     def _init_error_logging(self):
-        """初始化错误日志系统"""
-        log_dir = os.path.join(os.path.dirname(__file__), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-
-        # 创建新的错误汇总日志文件
-        summary_file = os.path.join(log_dir, "error_summary.log")
-        session_start = datetime.now().isoformat()
-
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write(f"翻译错误汇总日志\n")
-            f.write(f"会话开始时间: {session_start}\n")
-            f.write(f"模式: {'非思考模式' if self.non_thinking_mode else '思考模式'}\n")
-            f.write("=" * 80 + "\n\n")
+        """初始化错误日志系统（由后台线程据此创建新的错误汇总日志文件）"""
+        log_event('session_start', mode='非思考模式' if self.non_thinking_mode else '思考模式', engine=self.engine)
 
     def _load_prompt_template(self, file_path: str) -> str:
         """加载提示词模板文件，跳过标题行"""
@@ -251,6 +2604,20 @@ class DeepSeekTranslator:
             log_progress(f"警告：加载提示词模板 {file_path} 时出错: {e}", "warning")
             return ""
 
+    def _init_prompt_prefix(self):
+        """预先生成前缀缓存布局中所有请求共用的系统提示词与用户提示词规则部分（目标语言统一写作“目标语言”）"""
+        self.system_prompt_prefix = None
+        self.user_prompt_prefix = None
+        self.content_section = None
+        if self.prompt_layout != 'prefix' or not self.user_prompt:
+            return
+        if self.system_prompt:
+            self.system_prompt_prefix = self._format_prompt(self.system_prompt, target_language=PREFIX_NEUTRAL_LANGUAGE)
+        else:
+            self.system_prompt_prefix = "你是一个专业的游戏本地化翻译专家，擅长Minecraft相关内容的翻译。"
+        rules, self.content_section = split_prompt_content_section(self.user_prompt)
+        self.user_prompt_prefix = self._format_prompt(rules, target_language=PREFIX_NEUTRAL_LANGUAGE)
+
     def _format_prompt(self, template: str, **kwargs) -> str:
         """格式化提示词模板，替换变量"""
         try:
@@ -312,17 +2679,7 @@ class DeepSeekTranslator:
                 continue
 
             # 获取原始值进行占位符检查
-            original_value = original[key]
-
-            # 如果原始值是列表，使用第一个元素进行占位符验证
-            # 因为列表中的所有元素应该具有相同的占位符模式
-            if isinstance(original_value, list):
-                if original_value:  # 确保列表不为空
-                    reference_value = str(original_value[0])
-                else:
-                    reference_value = ""
-            else:
-                reference_value = str(original_value)
+            reference_value = self._reference_text(original[key])
 
             # 检查占位符一致性（允许空值）
             if not self.validate_placeholder_consistency(reference_value, translated_value):
@@ -330,101 +2687,67 @@ class DeepSeekTranslator:
 
         return errors
 
+    @staticmethod
+    def _reference_text(original_value: any) -> str:
+        """获取用于占位符检查的原始文本
+
+        如果原始值是列表，使用第一个元素进行占位符验证，
+        因为列表中的所有元素应该具有相同的占位符模式
+        """
+        if isinstance(original_value, list):
+            return str(original_value[0]) if original_value else ""
+        return str(original_value)
+
+    def partition_translation_result(self, original: Dict[str, any], translated: Dict[str, any]) -> Tuple[Dict[str, str], List[str]]:
+        """按键拆分翻译结果，用于部分接受
+
+        Returns:
+            (通过类型与占位符检查的 {key: translation}, 未通过或缺失的键列表)；多余键被忽略
+        """
+        accepted: Dict[str, str] = {}
+        failed_keys: List[str] = []
+        for key, original_value in original.items():
+            translated_value = translated.get(key)
+            if (isinstance(translated_value, str) and
+                    self.validate_placeholder_consistency(self._reference_text(original_value), translated_value)):
+                accepted[key] = translated_value
+            else:
+                failed_keys.append(key)
+        return accepted, failed_keys
+
     def log_translation_failure(self, attempt: int, system_prompt: str, user_prompt: str,
                               api_response: str, error: str, texts: Dict[str, str],
                               namespace: str = "unknown", target_lang_name: str = "unknown",
                               model: str = "unknown", temperature: float = 1.3,
                               log_to_main: bool = True) -> None:
-        """记录翻译失败的详细信息到日志文件"""
-        log_dir = os.path.join(os.path.dirname(__file__), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # 包含毫秒
-        log_file = os.path.join(log_dir, f"translation_failure_{timestamp}_attempt_{attempt}.log")
-
-        # 详细错误日志
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write(f"翻译失败日志 - 尝试次数: {attempt}\n")
-            f.write(f"时间: {datetime.now().isoformat()}\n")
-            f.write(f"命名空间: {namespace}\n")
-            f.write(f"目标语言: {target_lang_name}\n")
-            f.write(f"模型: {model}\n")
-            f.write(f"温度: {temperature}\n")
-            f.write(f"文本数量: {len(texts)}\n")
-            f.write("=" * 80 + "\n\n")
-
-            f.write(f"错误信息:\n{error}\n")
-            f.write("\n" + "=" * 80 + "\n\n")
-
-            f.write("原始文本:\n")
-            f.write(json.dumps(texts, ensure_ascii=False, indent=2))
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("系统提示词:\n")
-            f.write(system_prompt)
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("用户提示词:\n")
-            f.write(user_prompt)
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("API响应:\n")
-            f.write(api_response)
-            f.write("\n\n" + "=" * 80 + "\n")
-
-        # 错误汇总日志
-        summary_file = os.path.join(log_dir, "error_summary.log")
-        with open(summary_file, 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.now().isoformat()}] 尝试 {attempt} 失败: {error[:100]}{'...' if len(error) > 100 else ''}\n")
-            f.write(f"  命名空间: {namespace}\n")
-            f.write(f"  目标语言: {target_lang_name}\n")
-            f.write(f"  文件: {os.path.basename(log_file)}\n")
-            f.write(f"  文本数量: {len(texts)}\n")
-            f.write(f"  模型: {model}\n")
-            f.write(f"  温度: {temperature}\n\n")
+        """记录翻译失败事件；提示词、原始文本与API响应作为压缩正文块去重保存"""
+        log_event('attempt_failed', attempt=attempt, namespace=namespace, language=target_lang_name,
+                  model=model, temperature=temperature, texts=len(texts), error=error,
+                  blobs=self._prompt_blobs(system_prompt, user_prompt, texts, api_response))
 
         # 只在需要时记录主日志
         if log_to_main:
             error_summary = error[:50] + ('...' if len(error) > 50 else '')
             log_progress(f"    [尝试{attempt}/5] [{namespace}] {len(texts)}个文本 -> {target_lang_name} -> 失败: {error_summary}", "warning")
-            flush_logs()  # 确保错误日志被及时写入
 
     def log_translation_attempt(self, attempt: int, system_prompt: str, user_prompt: str,
                                 texts: Dict[str, str], namespace: str = "unknown",
                                 target_lang_name: str = "unknown", model: str = "unknown",
                                 temperature: float = 1.3) -> None:
-        """在调试模式下记录每次请求的详细信息，格式与失败日志一致"""
-        log_dir = os.path.join(os.path.dirname(__file__), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        log_file = os.path.join(log_dir, f"translation_attempt_{timestamp}_attempt_{attempt}.log")
-
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write(f"翻译请求日志 - 尝试次数: {attempt}\n")
-            f.write(f"时间: {datetime.now().isoformat()}\n")
-            f.write(f"命名空间: {namespace}\n")
-            f.write(f"目标语言: {target_lang_name}\n")
-            f.write(f"模型: {model}\n")
-            f.write(f"温度: {temperature}\n")
-            f.write(f"文本数量: {len(texts)}\n")
-            f.write("=" * 80 + "\n\n")
-
-            f.write("原始文本:\n")
-            f.write(json.dumps(texts, ensure_ascii=False, indent=2))
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("系统提示词:\n")
-            f.write(system_prompt)
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("用户提示词:\n")
-            f.write(user_prompt)
-            f.write("\n\n" + "=" * 80 + "\n\n")
-
-            f.write("API响应:\n")
-            f.write("(调试模式) 未请求或未记录响应\n")
-            f.write("\n\n" + "=" * 80 + "\n")
+        """在调试模式下记录每次请求的事件，正文保存方式与失败事件一致"""
+        log_event('attempt', attempt=attempt, namespace=namespace, language=target_lang_name,
+                  model=model, temperature=temperature, texts=len(texts),
+                  blobs=self._prompt_blobs(system_prompt, user_prompt, texts, None))
+
+    @staticmethod
+    def _prompt_blobs(system_prompt: str, user_prompt: str, texts: Dict[str, str], api_response: Optional[str]) -> Dict[str, Optional[str]]:
+        """登记请求与响应正文，返回 {名称: 内容哈希}（系统提示词等重复内容只保存一次）"""
+        return {
+            'system_prompt': EVENT_LOG.blob(system_prompt),
+            'user_prompt': EVENT_LOG.blob(user_prompt),
+            'texts': EVENT_LOG.blob(json.dumps(texts, ensure_ascii=False, indent=2)),
+            'response': EVENT_LOG.blob(api_response)
+        }
 
     def prepare_texts_for_translation(self, texts: Dict[str, any]) -> Dict[str, str]:
         """准备合并后的文本进行翻译，处理列表值
@@ -447,39 +2770,47 @@ class DeepSeekTranslator:
 
         return prepared_texts
 
-    def translate_batch(self, texts: Dict[str, str], target_lang: str, target_lang_name: str, namespace: str = "unknown", attempt: int = 1, temperature: float = 1.3) -> Dict[str, str]:
-        """
-        翻译一批文本，单次执行（重试机制由上层函数处理）
-        """
-        if not texts:
-            return {}
-
-        # 精准过滤标记键：仅排除 '__core_keys__'，其他键正常参与翻译
-        texts_to_translate = {k: v for k, v in texts.items() if k != '__core_keys__'}
+    def _build_translation_payload(self, texts_to_translate: Dict[str, any], target_lang_name: str,
+                                   config: AttemptConfig, group_languages: Optional[List[Tuple[str, str]]] = None,
+                                   stream: bool = False) -> Tuple[str, str, Dict, str]:
+        """组装提示词与请求体
 
-        if not texts_to_translate:
-            return {}
+        Args:
+            config: 本次调用的模型、温度与输出长度
+            group_languages: 多语言分组请求的 [(lang_code, lang_name), ...]；提示词末尾追加按语言代码输出的说明
+            stream: 是否请求 SSE 流式输出（最后一个分块附带 usage）
 
+        Returns:
+            (system_prompt, user_prompt, payload, model)
+        """
         source_text = json.dumps(texts_to_translate, ensure_ascii=False, indent=2)
 
-        try:
-                # 使用提示词模板或回退到默认提示词
-                if self.system_prompt:
-                    system_prompt = self._format_prompt(
-                        self.system_prompt,
-                        target_language=target_lang_name
-                    )
-                else:
-                    system_prompt = "你是一个专业的游戏本地化翻译专家，擅长Minecraft相关内容的翻译。"
+        if self.user_prompt_prefix is not None:
+            # 前缀缓存布局：共享前缀 → 待翻译内容 → 目标语言
+            system_prompt = self.system_prompt_prefix
+            user_prompt = "\n\n".join([
+                self.user_prompt_prefix,
+                self._format_prompt(self.content_section, content_to_translate=source_text),
+                PROMPT_LANGUAGE_SECTION.format(target_language=target_lang_name, neutral=PREFIX_NEUTRAL_LANGUAGE)
+            ])
+        else:
+            # 使用提示词模板或回退到默认提示词
+            if self.system_prompt:
+                system_prompt = self._format_prompt(
+                    self.system_prompt,
+                    target_language=target_lang_name
+                )
+            else:
+                system_prompt = "你是一个专业的游戏本地化翻译专家，擅长Minecraft相关内容的翻译。"
 
-                if self.user_prompt:
-                    user_prompt = self._format_prompt(
-                        self.user_prompt,
-                        target_language=target_lang_name,
-                        content_to_translate=source_text
-                    )
-                else:
-                    user_prompt = f"""请将以下JSON格式的游戏本地化文本翻译为{target_lang_name}。
+            if self.user_prompt:
+                user_prompt = self._format_prompt(
+                    self.user_prompt,
+                    target_language=target_lang_name,
+                    content_to_translate=source_text
+                )
+            else:
+                user_prompt = f"""请将以下JSON格式的游戏本地化文本翻译为{target_lang_name}。
 
 要求：
 1. 保持JSON格式不变，只翻译值部分
@@ -494,114 +2825,449 @@ class DeepSeekTranslator:
 
 请直接返回翻译后的JSON，不要添加任何解释文字。"""
 
-                # 调试模式：记录请求详情（与失败日志格式一致）
-                if self.debug_mode:
-                    self.log_translation_attempt(
-                        attempt=attempt,
-                        system_prompt=system_prompt,
-                        user_prompt=user_prompt,
-                        texts=texts_to_translate,
-                        namespace=namespace,
-                        target_lang_name=target_lang_name,
-                        model=("deepseek-chat" if self.non_thinking_mode else "deepseek-reasoner"),
-                        temperature=temperature
-                    )
+        if group_languages:
+            user_prompt += "\n\n" + GROUP_OUTPUT_INSTRUCTION.format(
+                count=len(group_languages),
+                languages="、".join(f"{code}（{name}）" for code, name in group_languages)
+            )
 
-                # 根据模式选择模型
-                model = "deepseek-chat" if self.non_thinking_mode else "deepseek-reasoner"
-
-                payload = {
-                    "model": model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "temperature": temperature,
-                    "stream": False
+        model = config.model
+        payload = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": user_prompt
                 }
+            ],
+            "temperature": config.temperature,
+            "stream": stream
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        if config.max_tokens:
+            payload["max_tokens"] = config.max_tokens
+        return system_prompt, user_prompt, payload, model
 
-                # 调用API
-                start_time = time.time()
-                response = requests.post(DEEPSEEK_API_URL, headers=self.headers, json=payload, timeout=60)
-                api_time = time.time() - start_time
+    def _extract_message_content(self, response: TransportResponse) -> Tuple[str, Optional[Dict]]:
+        """检查响应状态并提取模型输出内容
 
-                response.raise_for_status()
+        Returns:
+            (模型输出内容, 响应中的 usage)
+        """
+        if response.status_code >= 400:
+            raise ApiHttpError(response.status_code, response.headers, response.text)
 
-                # 处理响应文本，过滤空行
-                response_text = response.text.strip()
-                if not response_text:
-                    raise ValueError("API返回空响应")
+        # 处理响应文本，过滤空行
+        response_text = response.text.strip()
+        if not response_text:
+            raise ValueError("API返回空响应")
 
-                # 过滤空行和只包含空白字符的行
-                filtered_lines = []
-                for line in response_text.split('\n'):
-                    line = line.strip()
-                    if line:  # 只保留非空行
-                        filtered_lines.append(line)
+        # 过滤空行和只包含空白字符的行
+        filtered_lines = []
+        for line in response_text.split('\n'):
+            line = line.strip()
+            if line:  # 只保留非空行
+                filtered_lines.append(line)
 
-                if not filtered_lines:
-                    raise ValueError("API响应过滤后为空")
+        if not filtered_lines:
+            raise ValueError("API响应过滤后为空")
 
-                # 重新组合过滤后的响应
-                filtered_response = '\n'.join(filtered_lines)
+        # 重新组合过滤后的响应
+        filtered_response = '\n'.join(filtered_lines)
 
-                # 解析JSON
-                try:
-                    result = json.loads(filtered_response)
-                except json.JSONDecodeError as e:
-                    # 如果过滤后仍然解析失败，尝试原始响应
-                    log_progress(f"      过滤后JSON解析失败，尝试原始响应: {e}", "warning")
-                    result = response.json()
-
-                translated_content = result["choices"][0]["message"]["content"].strip()
-
-                # 清理响应内容
-                original_content = translated_content
-                if translated_content.startswith("```json"):
-                    translated_content = translated_content[7:]
-                if translated_content.startswith("```"):
-                    translated_content = translated_content[3:]
-                if translated_content.endswith("```"):
-                    translated_content = translated_content[:-3]
-                translated_content = translated_content.strip()
-
-                # 解析JSON
-                try:
-                    translated_dict = json.loads(translated_content)
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"JSON解析失败: {e}")
+        # 解析JSON
+        try:
+            result = json.loads(filtered_response)
+        except json.JSONDecodeError as e:
+            # 如果过滤后仍然解析失败，尝试原始响应
+            log_progress(f"      过滤后JSON解析失败，尝试原始响应: {e}", "warning")
+            result = json.loads(response.text)
+
+        return result["choices"][0]["message"]["content"].strip(), result.get("usage")
+
+    def _record_usage(self, usage: Optional[Dict], namespace: str, language: str, model: str,
+                      error: Optional[Exception] = None):
+        """记录一次有效响应的用量；输出未通过验证记为 validation_retry，无法解析等其他失败记为 api_retry，
+        对冲调用无论结果如何都记为 hedge"""
+        tokens = UsageLedger.parse_usage(usage)
+        if not tokens:
+            return
+        for name, value in tokens.items():
+            self._record_stat(name, value)
+        if _hedge_call.get():
+            outcome = 'hedge'
+        elif error is None:
+            outcome = 'success'
+        else:
+            outcome = 'validation_retry' if classify_api_error(error) == 'validation' else 'api_retry'
+        self.usage_ledger.record(namespace, language, model, outcome, tokens)
+
+    @staticmethod
+    def _parse_json_output(translated_content: str) -> any:
+        """清理模型输出的代码块标记并解析JSON"""
+        with TRACER.span('fence_strip'):
+            if translated_content.startswith("```json"):
+                translated_content = translated_content[7:]
+            if translated_content.startswith("```"):
+                translated_content = translated_content[3:]
+            if translated_content.endswith("```"):
+                translated_content = translated_content[:-3]
+            translated_content = translated_content.strip()
+
+        try:
+            with TRACER.span('output_parse'):
+                return json.loads(translated_content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON解析失败: {e}")
+
+    def _decode_translation(self, translated_content: str, texts_to_translate: Dict[str, any]) -> Dict[str, str]:
+        """清理模型输出的代码块标记，解析JSON并验证翻译结果"""
+        translated_dict = self._parse_json_output(translated_content)
+
+        if not isinstance(translated_dict, dict):
+            raise TranslationValidationError(f"翻译验证失败: 输出不是JSON对象: {type(translated_dict)}",
+                                             {}, list(texts_to_translate.keys()))
+
+        # 验证翻译结果；失败时携带已通过验证的键，供上层部分接受
+        with TRACER.span('validate'):
+            validation_errors = self.validate_translation_result(texts_to_translate, translated_dict)
+        if validation_errors:
+            accepted, failed_keys = self.partition_translation_result(texts_to_translate, translated_dict)
+            raise TranslationValidationError(f"翻译验证失败: {'; '.join(validation_errors)}", accepted, failed_keys)
+
+        # 验证成功，返回结果
+        return translated_dict
+
+    def _decode_group_translation(self, translated_content: str, texts_to_translate: Dict[str, any],
+                                  languages: List[Tuple[str, str]]) -> Dict[str, Dict[str, any]]:
+        """解析多语言分组输出 {lang_code: {key: value}}；逐语言验证由上层状态机完成，缺失或格式错误的语言不包含在结果中"""
+        grouped = self._parse_json_output(translated_content)
+        if not isinstance(grouped, dict):
+            raise TranslationValidationError(f"翻译验证失败: 输出不是JSON对象: {type(grouped)}",
+                                             {}, list(texts_to_translate.keys()))
+        return {code: grouped[code] for code, _ in languages if isinstance(grouped.get(code), dict)}
+
+    def translate_batch(self, texts: Dict[str, str], target_lang: str, target_lang_name: str, namespace: str = "unknown", attempt: int = 1, config: Optional[AttemptConfig] = None) -> Dict[str, str]:
+        """
+        翻译一批文本，单次执行（重试机制由上层函数处理）
+        """
+        if not texts:
+            return {}
+
+        # 精准过滤标记键：仅排除 '__core_keys__'，其他键正常参与翻译
+        texts_to_translate = {k: v for k, v in texts.items() if k != '__core_keys__'}
+
+        if not texts_to_translate:
+            return {}
 
-                # 验证翻译结果
-                validation_errors = self.validate_translation_result(texts_to_translate, translated_dict)
-                if validation_errors:
-                    raise ValueError(f"翻译验证失败: {'; '.join(validation_errors)}")
+        system_prompt = user_prompt = translated_content = usage = reader = None
+        config = config or self.base_config
+        model = config.model
+        try:
+            with TRACER.span('prompt_assembly'):
+                system_prompt, user_prompt, payload, model = self._build_translation_payload(
+                    texts_to_translate, target_lang_name, config, stream=self.stream_output)
+
+            # 调试模式：记录请求详情（与失败日志格式一致）
+            if self.debug_mode:
+                self.log_translation_attempt(
+                    attempt=attempt,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    texts=texts_to_translate,
+                    namespace=namespace,
+                    target_lang_name=target_lang_name,
+                    model=model,
+                    temperature=config.temperature
+                )
 
-                # 验证成功，返回结果
-                return translated_dict
+            # 调用API（通过共享连接池）
+            if self.stream_output:
+                reader = self._create_stream_reader(texts, texts_to_translate, config)
+                response = self._post_stream(payload, config.timeout, reader.on_line)
+                self._log_api_timing(response, namespace, target_lang_name)
+                translated_content, usage = self._finish_stream(response, reader)
+            else:
+                response = self._post(payload, config.timeout)
+                self._log_api_timing(response, namespace, target_lang_name)
+
+                with TRACER.span('response_parse'):
+                    translated_content, usage = self._extract_message_content(response)
+            result = self._decode_translation(translated_content, texts_to_translate)
+            self.batch_planner.observe(target_lang, model, texts_to_translate, result, response.elapsed)
+            self.hedger.observe(model, response.elapsed)
+            self._record_usage(usage, namespace, target_lang, model)
+            return result
 
         except Exception as e:
-            # 记录失败详情到文件（不记录主日志，由上层函数统一管理主日志）
-            self.log_translation_failure(
-                attempt=attempt,  # 使用传入的实际尝试次数
-                system_prompt=system_prompt if 'system_prompt' in locals() else "未生成",
-                user_prompt=user_prompt if 'user_prompt' in locals() else "未生成",
-                api_response=translated_content if 'translated_content' in locals() else "无响应",
-                error=str(e),
-                texts=texts,
-                namespace=namespace,
-                target_lang_name=target_lang_name,
-                model=model,
-                temperature=temperature,
-                log_to_main=False  # 不记录主日志，由execute_translation_request统一管理
-            )
+            if reader is not None and reader.abort_reason is not None:
+                translated_content = reader.content
+                usage = self._aborted_stream_usage(reader, system_prompt, user_prompt, target_lang, model)
+            self._record_usage(usage, namespace, target_lang, model, e)
+            self._log_batch_failure(e, attempt, system_prompt, user_prompt, translated_content, texts,
+                                    namespace, target_lang_name, model, config.temperature)
             # 抛出异常让上层处理重试
-            raise e
+            raise
+
+    async def translate_batch_async(self, texts: Dict[str, str], target_lang: str, target_lang_name: str, namespace: str = "unknown", attempt: int = 1, config: Optional[AttemptConfig] = None) -> Dict[str, str]:
+        """
+        translate_batch 的协程版本，供异步引擎使用（提示词、解析与验证逻辑完全相同）
+        """
+        if not texts:
+            return {}
+
+        texts_to_translate = {k: v for k, v in texts.items() if k != '__core_keys__'}
+
+        if not texts_to_translate:
+            return {}
+
+        system_prompt = user_prompt = translated_content = usage = reader = None
+        config = config or self.base_config
+        model = config.model
+        try:
+            with TRACER.span('prompt_assembly'):
+                system_prompt, user_prompt, payload, model = self._build_translation_payload(
+                    texts_to_translate, target_lang_name, config, stream=self.stream_output)
+
+            if self.debug_mode:
+                self.log_translation_attempt(
+                    attempt=attempt,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    texts=texts_to_translate,
+                    namespace=namespace,
+                    target_lang_name=target_lang_name,
+                    model=model,
+                    temperature=config.temperature
+                )
+
+            if self.stream_output:
+                reader = self._create_stream_reader(texts, texts_to_translate, config)
+                response = await self._post_stream_async(payload, config.timeout, reader.on_line)
+                self._log_api_timing(response, namespace, target_lang_name)
+                translated_content, usage = self._finish_stream(response, reader)
+            else:
+                response = await self._post_async(payload, config.timeout)
+                self._log_api_timing(response, namespace, target_lang_name)
+
+                with TRACER.span('response_parse'):
+                    translated_content, usage = self._extract_message_content(response)
+            result = self._decode_translation(translated_content, texts_to_translate)
+            self.batch_planner.observe(target_lang, model, texts_to_translate, result, response.elapsed)
+            self.hedger.observe(model, response.elapsed)
+            self._record_usage(usage, namespace, target_lang, model)
+            return result
+
+        except Exception as e:
+            if reader is not None and reader.abort_reason is not None:
+                translated_content = reader.content
+                usage = self._aborted_stream_usage(reader, system_prompt, user_prompt, target_lang, model)
+            self._record_usage(usage, namespace, target_lang, model, e)
+            self._log_batch_failure(e, attempt, system_prompt, user_prompt, translated_content, texts,
+                                    namespace, target_lang_name, model, config.temperature)
+            raise
+
+    @staticmethod
+    def _group_display_name(languages: List[Tuple[str, str]]) -> str:
+        return "、".join(name for _, name in languages)
+
+    def translate_batch_group(self, texts: Dict[str, str], languages: List[Tuple[str, str]], namespace: str = "unknown",
+                              attempt: int = 1, config: Optional[AttemptConfig] = None) -> Dict[str, Dict[str, any]]:
+        """
+        将一批文本在一次API调用中同时翻译为多种语言，返回 {lang_code: {key: value}}（未做逐语言验证）
+        """
+        texts_to_translate = {k: v for k, v in texts.items() if k != '__core_keys__'}
+        if not texts_to_translate:
+            return {}
+
+        group_name = self._group_display_name(languages)
+        system_prompt = user_prompt = translated_content = usage = None
+        config = config or self.base_config
+        model = config.model
+        try:
+            with TRACER.span('prompt_assembly'):
+                system_prompt, user_prompt, payload, model = self._build_translation_payload(
+                    texts_to_translate, group_name, config, group_languages=languages)
+
+            if self.debug_mode:
+                self.log_translation_attempt(
+                    attempt=attempt,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    texts=texts_to_translate,
+                    namespace=namespace,
+                    target_lang_name=group_name,
+                    model=model,
+                    temperature=config.temperature
+                )
+
+            response = self._post(payload, config.timeout)
+            self._log_api_timing(response, namespace, group_name)
+
+            with TRACER.span('response_parse'):
+                translated_content, usage = self._extract_message_content(response)
+            result = self._decode_group_translation(translated_content, texts_to_translate, languages)
+            self.batch_planner.observe_group(model, texts_to_translate, result, response.elapsed)
+            self.hedger.observe(model, response.elapsed)
+            self._record_usage(usage, namespace, "+".join(code for code, _ in languages), model)
+            return result
+
+        except Exception as e:
+            self._record_usage(usage, namespace, "+".join(code for code, _ in languages), model, e)
+            self._log_batch_failure(e, attempt, system_prompt, user_prompt, translated_content, texts,
+                                    namespace, group_name, model, config.temperature)
+            raise
+
+    async def translate_batch_group_async(self, texts: Dict[str, str], languages: List[Tuple[str, str]], namespace: str = "unknown",
+                                          attempt: int = 1, config: Optional[AttemptConfig] = None) -> Dict[str, Dict[str, any]]:
+        """
+        translate_batch_group 的协程版本，供异步引擎使用
+        """
+        texts_to_translate = {k: v for k, v in texts.items() if k != '__core_keys__'}
+        if not texts_to_translate:
+            return {}
+
+        group_name = self._group_display_name(languages)
+        system_prompt = user_prompt = translated_content = usage = None
+        config = config or self.base_config
+        model = config.model
+        try:
+            with TRACER.span('prompt_assembly'):
+                system_prompt, user_prompt, payload, model = self._build_translation_payload(
+                    texts_to_translate, group_name, config, group_languages=languages)
+
+            if self.debug_mode:
+                self.log_translation_attempt(
+                    attempt=attempt,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    texts=texts_to_translate,
+                    namespace=namespace,
+                    target_lang_name=group_name,
+                    model=model,
+                    temperature=config.temperature
+                )
+
+            response = await self._post_async(payload, config.timeout)
+            self._log_api_timing(response, namespace, group_name)
+
+            with TRACER.span('response_parse'):
+                translated_content, usage = self._extract_message_content(response)
+            result = self._decode_group_translation(translated_content, texts_to_translate, languages)
+            self.batch_planner.observe_group(model, texts_to_translate, result, response.elapsed)
+            self.hedger.observe(model, response.elapsed)
+            self._record_usage(usage, namespace, "+".join(code for code, _ in languages), model)
+            return result
+
+        except Exception as e:
+            self._record_usage(usage, namespace, "+".join(code for code, _ in languages), model, e)
+            self._log_batch_failure(e, attempt, system_prompt, user_prompt, translated_content, texts,
+                                    namespace, group_name, model, config.temperature)
+            raise
+
+    @staticmethod
+    def _encode_payload(payload: Dict) -> bytes:
+        with TRACER.span('json_dump'):
+            return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    def _post(self, payload: Dict, timeout: float = 60.0) -> TransportResponse:
+        """序列化请求体并通过共享连接池发送（线程引擎）"""
+        body = self._encode_payload(payload)
+        start, response = time.perf_counter(), None
+        try:
+            response = self.transport.post(DEEPSEEK_API_URL, self.headers, body, timeout=timeout)
+            return response
+        finally:
+            TRACER.add_network(start, response)
+
+    async def _post_async(self, payload: Dict, timeout: float = 60.0) -> TransportResponse:
+        """_post 的协程版本（异步引擎）"""
+        body = self._encode_payload(payload)
+        start, response = time.perf_counter(), None
+        try:
+            response = await self.async_transport.post(DEEPSEEK_API_URL, self.headers, body, timeout=timeout)
+            return response
+        finally:
+            TRACER.add_network(start, response)
+
+    def _post_stream(self, payload: Dict, timeout: float, on_line: Callable[[str], None]) -> TransportResponse:
+        """_post 的流式版本：SSE 响应逐行交给 on_line"""
+        body = self._encode_payload(payload)
+        start, response = time.perf_counter(), None
+        try:
+            response = self.transport.post_stream(DEEPSEEK_API_URL, self.headers, body, timeout, on_line)
+            return response
+        finally:
+            TRACER.add_network(start, response)
+
+    async def _post_stream_async(self, payload: Dict, timeout: float, on_line: Callable[[str], None]) -> TransportResponse:
+        """_post_stream 的协程版本（异步引擎）"""
+        body = self._encode_payload(payload)
+        start, response = time.perf_counter(), None
+        try:
+            response = await self.async_transport.post_stream(DEEPSEEK_API_URL, self.headers, body, timeout, on_line)
+            return response
+        finally:
+            TRACER.add_network(start, response)
+
+    def _create_stream_reader(self, texts: Dict[str, any], texts_to_translate: Dict[str, any],
+                              config: AttemptConfig) -> StreamingResponseReader:
+        return StreamingResponseReader(
+            texts_to_translate, texts.get('__core_keys__'),
+            lambda original, value: self.validate_placeholder_consistency(self._reference_text(original), value),
+            config.timeout)
+
+    def _finish_stream(self, response: TransportResponse, reader: StreamingResponseReader) -> Tuple[str, Optional[Dict]]:
+        """流式调用正常结束：检查状态并返回拼接后的输出与 usage（完整输出仍按非流式路径解析与验证）"""
+        if response.status_code >= 400:
+            raise ApiHttpError(response.status_code, response.headers, response.text)
+        self.stream_stats.record(reader)
+        content = reader.content.strip()
+        if not content:
+            raise ValueError("API返回空响应")
+        if self.debug_mode and reader.first_key_time is not None:
+            log_progress(f"      首个键耗时 {reader.first_key_time:.2f}s")
+        return content, reader.usage
+
+    def _aborted_stream_usage(self, reader: StreamingResponseReader, system_prompt: Optional[str],
+                              user_prompt: Optional[str], target_lang: str, model: str) -> Dict[str, int]:
+        """流式调用提前中止：记录节省的估算输出；中止的调用没有 usage，按已生成的内容估算计入用量（提示词按未命中缓存计）"""
+        remaining = self.batch_planner.output_tokens(reader.unreceived(), target_lang)
+        self.stream_stats.record(reader, remaining, remaining * self.batch_planner.model_seconds_per_token(model))
+        if reader.usage:
+            return reader.usage
+        estimate = self.batch_planner.estimate
+        prompt_tokens = estimate(system_prompt or "") + estimate(user_prompt or "")
+        return {'prompt_tokens': prompt_tokens, 'prompt_cache_miss_tokens': prompt_tokens,
+                'completion_tokens': estimate(reader.content)}
+
+    def _log_api_timing(self, response: TransportResponse, namespace: str, target_lang_name: str):
+        """调试模式下记录单次API耗时（连接建立与服务器耗时分开统计）"""
+        if self.debug_mode:
+            log_progress(f"      [{namespace}] -> {target_lang_name} API耗时 {response.elapsed:.2f}s（连接 {response.connect_time:.2f}s，服务器 {response.server_time:.2f}s）")
+
+    def _log_batch_failure(self, error: Exception, attempt: int, system_prompt: Optional[str], user_prompt: Optional[str],
+                           translated_content: Optional[str], texts: Dict[str, str], namespace: str,
+                           target_lang_name: str, model: str, temperature: float):
+        """记录失败事件（不记录主日志，由上层函数统一管理主日志）"""
+        self.log_translation_failure(
+            attempt=attempt,  # 使用传入的实际尝试次数
+            system_prompt=system_prompt if system_prompt is not None else "未生成",
+            user_prompt=user_prompt if user_prompt is not None else "未生成",
+            api_response=translated_content if translated_content is not None else "无响应",
+            error=str(error),
+            texts=texts,
+            namespace=namespace,
+            target_lang_name=target_lang_name,
+            model=model,
+            temperature=temperature,
+            log_to_main=False  # 不记录主日志，由execute_translation_request统一管理
+        )
 
     # 新的多线程架构：请求预处理 + 统一并发执行
 
@@ -616,16 +3282,39 @@ class DeepSeekTranslator:
         batch_id: int = 1
         total_batches: int = 1
         batch_size: int = 40
+        # 多语言分组请求中除 target_lang 外的其他语言 [(lang_code, lang_name), ...]
+        extra_languages: List[Tuple[str, str]] = field(default_factory=list)
+
+        @property
+        def languages(self) -> List[Tuple[str, str]]:
+            return [(self.target_lang, self.target_lang_name)] + self.extra_languages
+
+    def _group_target_languages(self, target_languages: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """按配置的语言分组合并目标语言；未启用分组、不在分组中或组内只有一种目标语言时保持单语言"""
+        if not self.language_groups:
+            return [[language] for language in target_languages]
+        grouped: List[List[Tuple[str, str]]] = []
+        assigned: Set[str] = set()
+        for lang_code, lang_name in target_languages:
+            if lang_code in assigned:
+                continue
+            group = next((g for g in self.language_groups if lang_code in g), ())
+            members = [(code, name) for code, name in target_languages if code in group]
+            if len(members) < 2:
+                members = [(lang_code, lang_name)]
+            assigned.update(code for code, _ in members)
+            grouped.append(members)
+        return grouped
 
     def prepare_translation_requests(self, all_texts: Dict[str, str], target_languages: List[Tuple[str, str]],
-                                   batch_size: int = 40, silent: bool = False, namespace: str = None) -> List['DeepSeekTranslator.TranslationRequest']:
+                                   batch_size: Optional[int] = None, silent: bool = False, namespace: str = None) -> List['DeepSeekTranslator.TranslationRequest']:
         """
         预处理所有翻译请求，将文本按语言和批次分割
 
         Args:
             all_texts: 所有需要翻译的文本
-            target_languages: 目标语言列表 [(lang_code, lang_name), ...]
-            batch_size: 每个请求的批次大小
+            target_languages: 目标语言列表 [(lang_code, lang_name), ...]；启用多语言分组时同组语言合并为一个请求
+            batch_size: 每个请求的固定键数；为 None 时由批次规划器按token预算分批
             silent: 是否静默模式（不输出详细日志）
             namespace: 命名空间ID（用于日志显示）
 
@@ -634,14 +3323,29 @@ class DeepSeekTranslator:
         """
         requests = []
         request_id = 1
+        model = self.base_config.model
 
-        for target_lang, target_lang_name in target_languages:
+        for languages in self._group_target_languages(target_languages):
+            target_lang, target_lang_name = languages[0]
+            extra_languages = languages[1:]
+            lang_display = "/".join(code for code, _ in languages)
             total_texts = len(all_texts)
+            if batch_size is None:
+                items = list(all_texts.items())
+                ranges = self.batch_planner.plan(items, [code for code, _ in languages], model)
+                needs_split = len(ranges) > 1
+            else:
+                needs_split = total_texts > batch_size
 
-            # 如果需要分段（超过batch_size），使用强制上下文模式
-            if total_texts > batch_size:
+            # 如果需要分段，使用强制上下文模式
+            if needs_split:
                 # 分段翻译：强制添加上下文
-                batches = self.split_texts_with_context_guarantee(all_texts, batch_size, context_size=4)
+                if batch_size is None:
+                    batches = self._build_context_batches(items, ranges, context_size=4)
+                    log_progress(f"    将 {total_texts} 个文本按token预算分割为 {len(batches)} 个批次 ({lang_display}，每批次 "
+                                 f"{min(end - start for start, end in ranges)}-{max(end - start for start, end in ranges)} 个 + 上下文)")
+                else:
+                    batches = self.split_texts_with_context_guarantee(all_texts, batch_size, context_size=4)
                 total_batches = len(batches)
 
                 for batch_index, batch_texts in enumerate(batches, 1):
@@ -653,7 +3357,8 @@ class DeepSeekTranslator:
                         namespace=namespace or "unknown",
                         batch_id=batch_index,
                         total_batches=total_batches,
-                        batch_size=len(batch_texts)
+                        batch_size=len(batch_texts),
+                        extra_languages=list(extra_languages)
                     )
                     requests.append(request)
                     request_id += 1
@@ -667,14 +3372,15 @@ class DeepSeekTranslator:
                     namespace=namespace or "unknown",
                     batch_id=1,
                     total_batches=1,
-                    batch_size=len(all_texts)
+                    batch_size=len(all_texts),
+                    extra_languages=list(extra_languages)
                 )
                 requests.append(request)
                 request_id += 1
 
         if not silent:
             total_requests = len(requests)
-            total_texts_to_translate = sum(len(req.texts) for req in requests)
+            total_texts_to_translate = sum(len(req.texts) * len(req.languages) for req in requests)
             namespace_display = f" {namespace}" if namespace else ""
             # 获取目标语言名称（使用第一个请求的语言名称作为代表）
             target_lang_display = requests[0].target_lang_name if requests else "未知语言"
@@ -682,10 +3388,54 @@ class DeepSeekTranslator:
 
         return requests
 
-    def execute_translation_request(self, request: 'DeepSeekTranslator.TranslationRequest') -> Tuple[int, str, str, Dict[str, str]]:
+    def _request_steps(self, request: 'DeepSeekTranslator.TranslationRequest'):
         """
-        执行单个翻译请求，支持重试机制
-        区分API请求失败和模型输出验证失败，采用不同的重试策略
+        请求入口状态机：检查点日志中已完成的请求直接重放，否则进入单语言或分组重试状态机；
+        所有语言的核心键均已翻译时将结果追加到检查点日志
+
+        Returns:
+            与 _translation_steps / _group_translation_steps 相同
+        """
+        model = self.base_config.model
+        language_codes = [code for code, _ in request.languages]
+        core_order = self._core_key_order(request.texts)
+        start_time = time.time()
+        log_event('request_start', request_id=request.request_id, namespace=request.namespace,
+                  languages=language_codes, batch=request.batch_id, keys=len(core_order), model=model)
+        key = CheckpointJournal.fingerprint(request.texts, language_codes, self.prompt_hash, model)
+        replayed = self.checkpoint_journal.lookup(key)
+        if replayed is not None:
+            self._record_stat('checkpoint_replayed')
+            log_event('request_end', request_id=request.request_id, namespace=request.namespace,
+                      outcome='replayed', keys=sum(len(r) for r in replayed.values()), elapsed=time.time() - start_time)
+            result = replayed if request.extra_languages else replayed[request.target_lang]
+            return (request.request_id, request.target_lang, request.target_lang_name, result)
+
+        if request.extra_languages:
+            outcome = yield from self._group_translation_steps(request)
+        else:
+            outcome = yield from self._translation_steps(request)
+
+        result = outcome[3]
+        results_by_lang = result if request.extra_languages else {request.target_lang: result}
+        complete = all(lang_code in results_by_lang and all(k in results_by_lang[lang_code] for k in core_order)
+                       for lang_code in language_codes)
+        if complete:
+            core_texts = {k: request.texts[k] for k in core_order}
+            self.checkpoint_journal.append(key, core_texts, results_by_lang, self.prompt_hash, model)
+        log_event('request_end', request_id=request.request_id, namespace=request.namespace,
+                  outcome='complete' if complete else 'partial',
+                  keys=sum(len(r) for r in results_by_lang.values()), elapsed=time.time() - start_time)
+        return outcome
+
+    def _translation_steps(self, request: 'DeepSeekTranslator.TranslationRequest'):
+        """
+        单个翻译请求的重试状态机，线程引擎与异步引擎共用同一套重试语义
+        按错误类别（429/5xx/超时/连接/验证失败等）分别计数，退避时间与重试预算由 RetryPolicy 决定
+
+        产出 ('call', (texts, languages, config, attempt)) 时，驱动方执行一次翻译调用（languages 多于一种时为分组调用），
+        并通过 send() 传回 (结果, 实际返回结果的调用配置) 或通过 throw() 传回异常；对冲调用先返回时配置的模型可能与请求的不同，
+        翻译记忆按实际配置的模型写入。产出 ('sleep', seconds) 时，驱动方等待指定秒数。
 
         Args:
             request: 翻译请求对象
@@ -693,102 +3443,653 @@ class DeepSeekTranslator:
         Returns:
             (request_id, target_lang, target_lang_name, translation_result)
         """
-        max_individual_retries = 10  # 每种失败类型的最大重试次数
-        api_failure_count = 0  # API请求失败计数
+        failure_counts: Counter = Counter()  # 错误类别 -> 失败次数，各类别分别受重试预算约束
+        api_failure_count = 0  # API请求失败计数（仅用于日志记录）
         validation_failure_count = 0  # 模型输出验证失败计数
         total_attempts = 0  # 总尝试次数（仅用于日志记录）
 
-        # 温度调整策略
-        def get_temperature_and_mode(validation_attempt: int):
-            if validation_attempt <= 5:
-                # 前5次：调整温度
-                temperatures = [1.3, 1.3, 1.2, 1.0, 0.7]
-                return temperatures[validation_attempt - 1], self.non_thinking_mode
-            else:
-                # 第6次开始：切换思考模式，重新开始温度循环
-                cycle_pos = (validation_attempt - 6) % 5
-                temperatures = [1.3, 1.3, 1.2, 1.0, 0.7]
-                return temperatures[cycle_pos], not self.non_thinking_mode
-
         batch_info = f"批次{request.batch_id}/{request.total_batches} " if request.total_batches > 1 else ""
 
-        while api_failure_count < max_individual_retries and validation_failure_count < max_individual_retries:
+        # 翻译记忆：命中的核心键直接复用，仅将未命中的文本发送到API
+        texts = request.texts
+        base_model = self.base_config.model
+        core_keys = request.texts.get('__core_keys__')
+        needed_texts = {k: v for k, v in request.texts.items()
+                        if k != '__core_keys__' and (core_keys is None or k in core_keys)}
+        cached = self.translation_memory.lookup(needed_texts, request.target_lang, self.prompt_hash, base_model)
+        if cached:
+            if len(cached) == len(needed_texts):
+                log_progress(f"    [翻译记忆] [{request.namespace}] {batch_info}{len(needed_texts)}个文本 -> {request.target_lang_name} -> 全部命中，跳过API请求")
+                return (request.request_id, request.target_lang, request.target_lang_name, cached)
+            missing_keys = [k for k in needed_texts if k not in cached]
+            texts = {k: v for k, v in request.texts.items() if k != '__core_keys__' and k not in cached}
+            if core_keys is not None:
+                texts['__core_keys__'] = missing_keys
+            log_progress(f"    [翻译记忆] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> 命中 {len(cached)}/{len(needed_texts)}，{len(missing_keys)} 个文本发送到API")
+
+        # 已确定的核心键译文（缓存命中 + 部分接受的结果）
+        committed: Dict[str, str] = dict(cached)
+        # 失败键重试时始终从本批次的原始核心键中选取上下文，多次缩小后上下文保持不变
+        base_texts = texts
+        base_core_order = self._core_key_order(texts)
+
+        while True:
+            # 达到用量预算后不再发送新的请求（含重试），返回已确定的结果
+            if not self.usage_ledger.admit():
+                return (request.request_id, request.target_lang, request.target_lang_name, committed)
             total_attempts += 1
 
+            # 根据验证失败次数确定本次调用的温度与模式（只作用于本请求）
+            config = self._attempt_config(validation_failure_count)
             try:
-                # 根据验证失败次数调整参数
-                if validation_failure_count > 0:
-                    temperature, thinking_mode = get_temperature_and_mode(validation_failure_count)
-                    # 临时切换模式和温度
-                    original_mode = self.non_thinking_mode
-                    self.non_thinking_mode = thinking_mode
-                else:
-                    temperature = 1.3
-                    original_mode = self.non_thinking_mode
-
                 # 执行翻译
-                result = self.translate_batch(request.texts, request.target_lang, request.target_lang_name,
-                                            request.namespace, total_attempts, temperature)
-
-                # 恢复原始模式
-                if validation_failure_count > 0:
-                    self.non_thinking_mode = original_mode
+                result, config = yield ('call', (texts, [(request.target_lang, request.target_lang_name)], config, total_attempts))
 
                 # 检查翻译结果是否为空
                 if not result:
                     validation_failure_count += 1
-                    if validation_failure_count < max_individual_retries:
-                        log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}/{max_individual_retries}|验证失败{validation_failure_count}/{max_individual_retries}] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> 翻译结果为空，重试中... (等待1秒)", "warning")
-                        time.sleep(1)  # 验证失败等待1秒
+                    failure_counts['validation'] += 1
+                    if self.retry_policy.should_retry('validation', failure_counts['validation']):
+                        wait_time = self.retry_policy.next_delay('validation', failure_counts['validation'])
+                        log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}/{self.retry_policy.budget('validation')}] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> 翻译结果为空，重试中... (等待{wait_time:.1f}秒)", "warning")
+                        yield ('sleep', wait_time)
                         continue
                     else:
-                        log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}/{max_individual_retries}|验证失败{validation_failure_count}/{max_individual_retries}] [{request.namespace}] {batch_info}{len(request.texts)}个文本 -> {request.target_lang_name} -> 失败: 翻译结果为空 (达到验证失败上限)", "error")
-                        return (request.request_id, request.target_lang, request.target_lang_name, {})
+                        log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}/{self.retry_policy.budget('validation')}] [{request.namespace}] {batch_info}{len(texts)}个文本 -> {request.target_lang_name} -> 失败: 翻译结果为空 (达到验证失败上限)", "error")
+                        return (request.request_id, request.target_lang, request.target_lang_name, committed)
 
-                # 成功
+                # 成功：写入翻译记忆，并与已确定的结果合并
+                self.translation_memory.store(texts, result, request.target_lang, self.prompt_hash, config.model)
+                if committed:
+                    result = {**result, **committed}
                 attempt_info = f"（API失败{api_failure_count}次，验证失败{validation_failure_count}次）" if total_attempts > 1 else ""
-                log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}] [{request.namespace}] {batch_info}{len(request.texts)}个文本 -> {request.target_lang_name} -> 成功{attempt_info}")
+                log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}] [{request.namespace}] {batch_info}{len(texts)}个文本 -> {request.target_lang_name} -> 成功{attempt_info}")
                 return (request.request_id, request.target_lang, request.target_lang_name, result)
 
             except Exception as e:
                 error_str = str(e)
 
-                # 判断错误类型
-                if "翻译验证失败" in error_str:
-                    # 模型输出验证失败
-                    validation_failure_count += 1
-                    failure_type = "验证失败"
-                    wait_time = 1  # 验证失败等待1秒
+                # 判断错误类型
+                error_class = classify_api_error(e)
+                failure_counts[error_class] += 1
+                if error_class == 'validation':
+                    # 模型输出验证失败
+                    validation_failure_count += 1
+                    failure_type = "验证失败"
+                else:
+                    # API请求失败（限流、服务器错误、网络超时、连接错误等）
+                    api_failure_count += 1
+                    failure_type = "API失败"
+
+                if isinstance(e, TranslationValidationError):
+                    log_event('validation_error', request_id=request.request_id, namespace=request.namespace,
+                              language=request.target_lang, attempt=total_attempts,
+                              accepted=len(e.accepted), failed_keys=e.failed_keys[:20])
+
+                # 部分接受：通过验证的核心键立即提交，只重试失败的核心键（附带少量相邻上下文）
+                if isinstance(e, TranslationValidationError) and e.accepted:
+                    self.translation_memory.store(texts, e.accepted, request.target_lang, self.prompt_hash, config.model)
+                    core_order = self._core_key_order(texts)
+                    newly_accepted = [k for k in core_order if k in e.accepted]
+                    if newly_accepted:
+                        committed.update({k: e.accepted[k] for k in newly_accepted})
+                        remaining_keys = [k for k in core_order if k not in e.accepted]
+                        if not remaining_keys:
+                            log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> 成功（仅上下文键未通过验证）")
+                            return (request.request_id, request.target_lang, request.target_lang_name, committed)
+                        texts = self._narrow_to_failed_keys(base_texts, base_core_order, remaining_keys)
+                        log_progress(f"    [部分接受] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> 已接受 {len(newly_accepted)} 个键，{len(remaining_keys)} 个失败键（含上下文共 {len(texts) - 1} 个文本）重新请求")
+
+                failures = failure_counts[error_class]
+                budget_info = f"{error_class} {failures}/{self.retry_policy.budget(error_class)}"
+                if error_class != 'validation':
+                    budget_info += f"，API失败合计 {api_failure_count}/{self.retry_policy.api_budget}"
+                error_summary = error_str[:50] + ('...' if len(error_str) > 50 else '')
+                if self.retry_policy.should_retry(error_class, failures, api_failure_count):
+                    # 记录失败并提示重试
+                    wait_time = self.retry_policy.next_delay(error_class, failures, e)
+                    log_event('retry', f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> {failure_type}（{budget_info}）: {error_summary}，{wait_time:.1f}秒后重试...", "warning",
+                              request_id=request.request_id, namespace=request.namespace, language=request.target_lang,
+                              attempt=total_attempts, failure=failure_type, error_class=error_class, wait=wait_time)
+                    yield ('sleep', wait_time)
+                    continue
+                else:
+                    # 最后一次失败，记录最终失败状态
+                    log_event('request_failed', f"    [总尝试{total_attempts}|API失败{api_failure_count}|验证失败{validation_failure_count}] [{request.namespace}] {batch_info}{len(texts)}个文本 -> {request.target_lang_name} -> 最终失败（{budget_info}）: {error_summary} (达到重试上限)", "error",
+                              request_id=request.request_id, namespace=request.namespace, language=request.target_lang,
+                              attempt=total_attempts, failure=failure_type, error_class=error_class)
+                    return (request.request_id, request.target_lang, request.target_lang_name, committed)
+
+    def _group_translation_steps(self, request: 'DeepSeekTranslator.TranslationRequest'):
+        """
+        多语言分组请求的状态机：一次API调用同时翻译为组内所有语言，再逐语言验证；
+        未通过验证的语言（或分组调用最终失败时的全部语言）回退为单语言请求，沿用 _translation_steps 的完整重试策略
+
+        Returns:
+            (request_id, target_lang, target_lang_name, {lang_code: translation_result, ...})
+        """
+        max_group_api_retries = 3  # 分组调用只重试过载类错误，其余失败直接回退
+        batch_info = f"批次{request.batch_id}/{request.total_batches} " if request.total_batches > 1 else ""
+        base_model = self.base_config.model
+        texts_to_translate = {k: v for k, v in request.texts.items() if k != '__core_keys__'}
+        core_order = self._core_key_order(request.texts)
+        needed_texts = {k: texts_to_translate[k] for k in core_order}
+
+        results: Dict[str, Dict[str, str]] = {}
+        pending: List[Tuple[str, str]] = []
+        for lang_code, lang_name in request.languages:
+            cached = self.translation_memory.lookup(needed_texts, lang_code, self.prompt_hash, base_model)
+            if cached and len(cached) == len(needed_texts):
+                results[lang_code] = cached
+            else:
+                pending.append((lang_code, lang_name))
+
+        fallback: List[Tuple[str, str]] = pending
+        if len(pending) > 1:
+            group_display = "/".join(code for code, _ in pending)
+            grouped = None
+            group_model = base_model
+            api_failure_count = 0
+            attempt = 0
+            while grouped is None:
+                if not self.usage_ledger.admit():
+                    break
+                attempt += 1
+                try:
+                    grouped, group_config = yield ('call', (request.texts, pending, self.base_config, attempt))
+                    group_model = group_config.model
+                except Exception as e:
+                    error_class = classify_api_error(e)
+                    error_str = str(e)
+                    error_summary = error_str[:50] + ('...' if len(error_str) > 50 else '')
+                    api_failure_count += 1
+                    if (error_class in OVERLOAD_ERROR_CLASSES and api_failure_count < max_group_api_retries
+                            and self.retry_policy.should_retry(error_class, api_failure_count)):
+                        wait_time = self.retry_policy.next_delay(error_class, api_failure_count, e)
+                        log_event('retry', f"    [分组|API失败{api_failure_count}/{max_group_api_retries}] [{request.namespace}] {batch_info}-> {group_display} -> {error_summary}，{wait_time:.1f}秒后重试...", "warning",
+                                  request_id=request.request_id, namespace=request.namespace, language="+".join(code for code, _ in pending),
+                                  attempt=api_failure_count, failure="API失败", error_class=error_class, wait=wait_time)
+                        yield ('sleep', wait_time)
+                        continue
+                    log_progress(f"    [分组] [{request.namespace}] {batch_info}-> {group_display} -> 分组调用失败: {error_summary}，全部回退为单语言请求", "warning")
+                    break
+            if attempt:
+                self._record_stat('group_calls')
+
+            fallback = []
+            if grouped is None:
+                fallback = pending
+            else:
+                for lang_code, lang_name in pending:
+                    lang_result = grouped.get(lang_code)
+                    if lang_result is None:
+                        fallback.append((lang_code, lang_name))
+                        continue
+                    with TRACER.span('validate', language=lang_code):
+                        validation_errors = self.validate_translation_result(texts_to_translate, lang_result)
+                    if not validation_errors:
+                        self.translation_memory.store(texts_to_translate, lang_result, lang_code, self.prompt_hash, group_model)
+                        results[lang_code] = lang_result
+                        continue
+                    # 通过验证的键写入翻译记忆，回退请求据此只发送未通过的键；仅上下文键未通过时视为成功
+                    accepted, _ = self.partition_translation_result(texts_to_translate, lang_result)
+                    self.translation_memory.store(texts_to_translate, accepted, lang_code, self.prompt_hash, group_model)
+                    if all(k in accepted for k in core_order):
+                        results[lang_code] = {k: accepted[k] for k in core_order}
+                    else:
+                        fallback.append((lang_code, lang_name))
+                passed = [code for code, _ in pending if code in results]
+                log_progress(f"    [分组] [{request.namespace}] {batch_info}{len(texts_to_translate)}个文本 -> {group_display} -> "
+                             f"{len(passed)} 种语言通过验证" + (f"，{'/'.join(code for code, _ in fallback)} 回退为单语言请求" if fallback else ""))
+            self._record_stat('group_fallbacks', len(fallback))
+
+        for lang_code, lang_name in fallback:
+            single_request = replace(request, target_lang=lang_code, target_lang_name=lang_name, extra_languages=[])
+            _, _, _, lang_result = yield from self._translation_steps(single_request)
+            results[lang_code] = lang_result
+
+        return (request.request_id, request.target_lang, request.target_lang_name, results)
+
+    def _attempt_config(self, validation_failures: int) -> AttemptConfig:
+        """按已发生的验证失败次数派生下一次调用的执行参数
+
+        前5次验证失败依次调整温度；第6次起切换到另一种思考模式，并重新开始温度循环
+        """
+        if validation_failures == 0:
+            return self.base_config
+        if validation_failures <= len(VALIDATION_TEMPERATURES):
+            return replace(self.base_config, temperature=VALIDATION_TEMPERATURES[validation_failures - 1])
+        cycle_pos = (validation_failures - len(VALIDATION_TEMPERATURES) - 1) % len(VALIDATION_TEMPERATURES)
+        return replace(self.base_config, model=AttemptConfig.model_for(not self.non_thinking_mode),
+                       temperature=VALIDATION_TEMPERATURES[cycle_pos])
+
+    @staticmethod
+    def _core_key_order(texts: Dict[str, any]) -> List[str]:
+        """按批次中的原始顺序返回需要写回的核心键"""
+        keys = [k for k in texts if k != '__core_keys__']
+        core_keys = texts.get('__core_keys__')
+        if core_keys is None:
+            return keys
+        core_set = set(core_keys)
+        return [k for k in keys if k in core_set]
+
+    @staticmethod
+    def _narrow_to_failed_keys(texts: Dict[str, any], core_order: List[str], failed_keys: List[str],
+                               context_size: int = 2) -> Dict[str, any]:
+        """构造只包含失败键的重试批次，并从同一批核心键中为每个失败键补充前后各 context_size 个上下文"""
+        failed = set(failed_keys)
+        selected: Set[str] = set()
+        for index, key in enumerate(core_order):
+            if key in failed:
+                selected.update(core_order[max(0, index - context_size):index + context_size + 1])
+        narrowed: Dict[str, any] = {k: texts[k] for k in core_order if k in selected}
+        narrowed['__core_keys__'] = [k for k in core_order if k in failed]
+        return narrowed
+
+    def _release_slot(self, slot_time: float, error: Optional[Exception]):
+        """释放并发槽位；验证失败说明API已正常响应，不视为过载"""
+        self._record_stat('api_calls')
+        self.retry_policy.record_attempt(time.time() - slot_time)
+        if error is None:
+            self.concurrency_limiter.release(slot_time, 'success')
+            self.circuit_breaker.record(overloaded=False)
+            return
+        error_class = classify_api_error(error)
+        self.circuit_breaker.record(overloaded=error_class in OVERLOAD_ERROR_CLASSES)
+        if error_class == 'validation':
+            self._record_stat('validation_failures')
+        else:
+            self._record_stat('api_failures')
+            self._record_stat(f'api_failures_{error_class}')
+        if error_class in OVERLOAD_ERROR_CLASSES:
+            self.concurrency_limiter.release(slot_time, 'overload')
+        elif error_class == 'validation':
+            self.concurrency_limiter.release(slot_time, 'success')
+        else:
+            self.concurrency_limiter.release(slot_time, 'failure')
+
+    @staticmethod
+    def _trace_lane_name(request: 'DeepSeekTranslator.TranslationRequest') -> str:
+        batch_info = f" 批次{request.batch_id}/{request.total_batches}" if request.total_batches > 1 else ""
+        return f"{request.namespace} {'+'.join(code for code, _ in request.languages)}{batch_info}"
+
+    def _dispatch_call(self, request: 'DeepSeekTranslator.TranslationRequest', texts: Dict[str, any],
+                       languages: List[Tuple[str, str]], config: AttemptConfig, attempt: int):
+        """执行一次翻译调用（线程引擎）；languages 多于一种时为分组调用"""
+        if len(languages) > 1:
+            return self.translate_batch_group(texts, languages, request.namespace, attempt, config)
+        (target_lang, target_lang_name), = languages
+        return self.translate_batch(texts, target_lang, target_lang_name, request.namespace, attempt, config)
+
+    async def _dispatch_call_async(self, request: 'DeepSeekTranslator.TranslationRequest', texts: Dict[str, any],
+                                   languages: List[Tuple[str, str]], config: AttemptConfig, attempt: int):
+        """_dispatch_call 的协程版本"""
+        if len(languages) > 1:
+            return await self.translate_batch_group_async(texts, languages, request.namespace, attempt, config)
+        (target_lang, target_lang_name), = languages
+        return await self.translate_batch_async(texts, target_lang, target_lang_name, request.namespace, attempt, config)
+
+    def _release_call_slot(self, slot_time: float, call):
+        """对冲模式下每个调用结束时释放各自的槽位；被取消的调用不计入成功或失败"""
+        if call.cancelled():
+            self.hedger.record('cancelled')
+            self.concurrency_limiter.release(slot_time, 'failure')
+        else:
+            self._release_slot(slot_time, call.exception())
+
+    def _call_hedged(self, request: 'DeepSeekTranslator.TranslationRequest', texts: Dict[str, any],
+                     languages: List[Tuple[str, str]], config: AttemptConfig, attempt: int,
+                     slot_time: float):
+        """以对冲方式执行一次调用（线程引擎）
+
+        主调用沿用已申请的槽位；耗时超过同模型延迟分位数仍未返回且窗口有空闲槽位时发出对冲调用。
+        返回先成功的 (结果, 该调用的配置)；两者都失败时抛出主调用的异常。已开始的HTTP请求无法中断，落后的调用结果会被丢弃。
+        """
+        if self._hedge_pool is None:
+            self._hedge_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2 * self.concurrency_limiter.max_window, thread_name_prefix='translate-hedge')
+        primary_context = contextvars.copy_context()
+        primary = self._hedge_pool.submit(primary_context.run, self._dispatch_call, request, texts, languages, config, attempt)
+        primary.add_done_callback(lambda call: self._release_call_slot(slot_time, call))
+        calls = [primary]
+        call_configs = [config]
+        started = time.perf_counter()
+        wait_time = self.hedger.next_wait(config.model, started)
+        while wait_time is not None and not primary.done():
+            concurrent.futures.wait(calls, timeout=wait_time)
+            wait_time = self.hedger.next_wait(config.model, started)
+        if not primary.done():
+            hedge_slot = self.concurrency_limiter.try_acquire()
+            if hedge_slot is None:
+                self.hedger.record('no_slot')
+            else:
+                self.hedger.record('fired')
+                hedge_context = contextvars.copy_context()
+                hedge_context.run(_hedge_call.set, True)
+                hedge_config = self.hedger.hedge_config(config)
+                hedge = self._hedge_pool.submit(hedge_context.run, self._dispatch_call, request, texts, languages,
+                                                hedge_config, attempt)
+                hedge.add_done_callback(lambda call: self._release_call_slot(hedge_slot, call))
+                calls.append(hedge)
+                call_configs.append(hedge_config)
+
+        pending = set(calls)
+        try:
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for call in sorted(done, key=calls.index):
+                    if call.exception() is None:
+                        if call is not primary:
+                            self.hedger.record('won')
+                        return call.result(), call_configs[calls.index(call)]
+            return primary.result(), config
+        finally:
+            for call in pending:
+                call.cancel()
+
+    async def _call_hedged_async(self, request: 'DeepSeekTranslator.TranslationRequest', texts: Dict[str, any],
+                                 languages: List[Tuple[str, str]], config: AttemptConfig, attempt: int,
+                                 slot_time: float):
+        """_call_hedged 的协程版本：落后的调用会被取消（中断其HTTP请求）"""
+        async def run_as_hedge(call_config: AttemptConfig):
+            _hedge_call.set(True)
+            return await self._dispatch_call_async(request, texts, languages, call_config, attempt)
+
+        primary = asyncio.ensure_future(self._dispatch_call_async(request, texts, languages, config, attempt))
+        primary.add_done_callback(lambda call: self._release_call_slot(slot_time, call))
+        calls = [primary]
+        call_configs = [config]
+        started = time.perf_counter()
+        wait_time = self.hedger.next_wait(config.model, started)
+        while wait_time is not None and not primary.done():
+            await asyncio.wait(calls, timeout=wait_time)
+            wait_time = self.hedger.next_wait(config.model, started)
+        if not primary.done():
+            hedge_slot = self.concurrency_limiter.try_acquire()
+            if hedge_slot is None:
+                self.hedger.record('no_slot')
+            else:
+                self.hedger.record('fired')
+                hedge_config = self.hedger.hedge_config(config)
+                hedge = asyncio.ensure_future(run_as_hedge(hedge_config))
+                hedge.add_done_callback(lambda call: self._release_call_slot(hedge_slot, call))
+                calls.append(hedge)
+                call_configs.append(hedge_config)
+
+        pending = set(calls)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in sorted(done, key=calls.index):
+                    if call.exception() is None:
+                        if call is not primary:
+                            self.hedger.record('won')
+                        return call.result(), call_configs[calls.index(call)]
+            return primary.result(), config
+        finally:
+            for call in pending:
+                call.cancel()
+
+    def execute_translation_request(self, request: 'DeepSeekTranslator.TranslationRequest') -> Tuple[int, str, str, Dict[str, str]]:
+        """
+        执行单个翻译请求（线程引擎），支持重试机制
+
+        Args:
+            request: 翻译请求对象
+
+        Returns:
+            (request_id, target_lang, target_lang_name, translation_result)
+        """
+        lane_token = TRACER.enter_lane(self._trace_lane_name(request))
+        request_start = time.perf_counter()
+        steps = self._request_steps(request)
+        calls, completed, first_slot = 0, False, None
+        try:
+            action, argument = next(steps)
+            while True:
+                if action == 'sleep':
+                    with TRACER.span('retry_sleep'):
+                        time.sleep(argument)
+                    action, argument = steps.send(None)
+                    continue
+
+                texts, languages, config, attempt = argument
+                calls += 1
+                pause_start = time.perf_counter()
+                if self.circuit_breaker.wait():
+                    TRACER.add('breaker_wait', pause_start, time.perf_counter() - pause_start)
+                slot_start = time.perf_counter()
+                slot_time = self.concurrency_limiter.acquire()
+                TRACER.add('slot_wait', slot_start, time.perf_counter() - slot_start)
+                first_slot = first_slot or time.perf_counter()
+                try:
+                    if self.hedger.enabled:
+                        result = self._call_hedged(request, texts, languages, config, attempt, slot_time)
+                    else:
+                        try:
+                            result = self._dispatch_call(request, texts, languages, config, attempt), config
+                        except Exception as e:
+                            self._release_slot(slot_time, e)
+                            raise
+                        self._release_slot(slot_time, None)
+                except Exception as e:
+                    action, argument = steps.throw(e)
                 else:
-                    # API请求失败（网络超时、连接错误等）
-                    api_failure_count += 1
-                    failure_type = "API失败"
-                    wait_time = 5  # API失败等待5秒
+                    action, argument = steps.send(result)
+        except StopIteration as stop:
+            completed = True
+            return stop.value
+        finally:
+            self._record_request_timing(request, first_slot or request_start, calls, completed)
+            TRACER.add('request', request_start, time.perf_counter() - request_start, namespace=request.namespace,
+                       languages=[code for code, _ in request.languages], batch=request.batch_id)
+            TRACER.exit_lane(lane_token)
+
+    async def execute_translation_request_async(self, request: 'DeepSeekTranslator.TranslationRequest') -> Tuple[int, str, str, Dict[str, str]]:
+        """
+        执行单个翻译请求（异步引擎），与 execute_translation_request 共用重试状态机
 
-                # 恢复原始模式
-                if validation_failure_count > 0:
-                    self.non_thinking_mode = original_mode
+        Args:
+            request: 翻译请求对象
 
-                if api_failure_count < max_individual_retries and validation_failure_count < max_individual_retries:
-                    # 记录失败并提示重试
-                    error_summary = error_str[:50] + ('...' if len(error_str) > 50 else '')
-                    log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}/{max_individual_retries}|验证失败{validation_failure_count}/{max_individual_retries}] [{request.namespace}] {batch_info}-> {request.target_lang_name} -> {failure_type}: {error_summary}，{wait_time}秒后重试...", "warning")
-                    time.sleep(wait_time)
+        Returns:
+            (request_id, target_lang, target_lang_name, translation_result)
+        """
+        lane_token = TRACER.enter_lane(self._trace_lane_name(request))
+        request_start = time.perf_counter()
+        steps = self._request_steps(request)
+        calls, completed, first_slot = 0, False, None
+        try:
+            action, argument = next(steps)
+            while True:
+                if action == 'sleep':
+                    with TRACER.span('retry_sleep'):
+                        await asyncio.sleep(argument)
+                    action, argument = steps.send(None)
                     continue
+
+                texts, languages, config, attempt = argument
+                calls += 1
+                pause_start = time.perf_counter()
+                if await self.circuit_breaker.wait_async():
+                    TRACER.add('breaker_wait', pause_start, time.perf_counter() - pause_start)
+                slot_start = time.perf_counter()
+                slot_time = await self.concurrency_limiter.acquire_async()
+                TRACER.add('slot_wait', slot_start, time.perf_counter() - slot_start)
+                first_slot = first_slot or time.perf_counter()
+                try:
+                    if self.hedger.enabled:
+                        result = await self._call_hedged_async(request, texts, languages, config, attempt, slot_time)
+                    else:
+                        try:
+                            result = await self._dispatch_call_async(request, texts, languages, config, attempt), config
+                        except Exception as e:
+                            self._release_slot(slot_time, e)
+                            raise
+                        self._release_slot(slot_time, None)
+                except Exception as e:
+                    action, argument = steps.throw(e)
                 else:
-                    # 最后一次失败，记录最终失败状态
-                    error_summary = error_str[:50] + ('...' if len(error_str) > 50 else '')
-                    log_progress(f"    [总尝试{total_attempts}|API失败{api_failure_count}/{max_individual_retries}|验证失败{validation_failure_count}/{max_individual_retries}] [{request.namespace}] {batch_info}{len(request.texts)}个文本 -> {request.target_lang_name} -> 最终失败: {error_summary} (达到重试上限)", "error")
-                    return (request.request_id, request.target_lang, request.target_lang_name, {})
+                    action, argument = steps.send(result)
+        except StopIteration as stop:
+            completed = True
+            return stop.value
+        finally:
+            self._record_request_timing(request, first_slot or request_start, calls, completed)
+            TRACER.add('request', request_start, time.perf_counter() - request_start, namespace=request.namespace,
+                       languages=[code for code, _ in request.languages], batch=request.batch_id)
+            TRACER.exit_lane(lane_token)
+
+    def estimate_request(self, request: 'DeepSeekTranslator.TranslationRequest') -> Dict[str, any]:
+        """估算单个请求的输入/输出token与耗时（不调用API）
+
+        输入token按实际组装的提示词估算；输出token与耗时使用批次规划器学习到的膨胀系数和每token耗时；
+        核心键全部命中翻译记忆的语言不计入
+        """
+        texts = {k: v for k, v in request.texts.items() if k != '__core_keys__'}
+        core_order = self._core_key_order(request.texts)
+        model = self.base_config.model
+        needed_texts = {k: texts[k] for k in core_order}
+        languages = [(code, name) for code, name in request.languages
+                     if len(self.translation_memory.lookup(needed_texts, code, self.prompt_hash, model)) < len(needed_texts)]
+        estimate = {
+            'request_id': request.request_id,
+            'namespace': request.namespace,
+            'languages': [code for code, _ in request.languages],
+            'batch': f"{request.batch_id}/{request.total_batches}",
+            'core_keys': len(core_order),
+            'context_keys': len(texts) - len(core_order),
+            'memory_hit': not languages,
+            'model': model,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'seconds': 0.0
+        }
+        if not languages:
+            return estimate
+        group_languages = languages if len(languages) > 1 else None
+        target_lang_name = self._group_display_name(languages) if group_languages else languages[0][1]
+        system_prompt, user_prompt, _, _ = self._build_translation_payload(texts, target_lang_name, self.base_config, group_languages)
+        output_tokens = sum(self.batch_planner.output_tokens(texts, code) for code, _ in languages)
+        estimate.update({
+            'input_tokens': self.batch_planner.estimate(system_prompt) + self.batch_planner.estimate(user_prompt),
+            'output_tokens': int(output_tokens),
+            'seconds': round(output_tokens * self.batch_planner.model_seconds_per_token(model), 2)
+        })
+        return estimate
+
+    def shared_prefix_tokens(self) -> int:
+        """前缀缓存布局下所有请求共享的提示词前缀的估算token数"""
+        if self.user_prompt_prefix is None:
+            return 0
+        return self.batch_planner.estimate(self.system_prompt_prefix) + self.batch_planner.estimate(self.user_prompt_prefix)
+
+    def order_for_prefix_cache(self, requests: List['DeepSeekTranslator.TranslationRequest']) -> List['DeepSeekTranslator.TranslationRequest']:
+        """按共享前缀排列请求（前缀缓存布局下）
+
+        所有请求共享规则部分，待翻译内容相同的请求（同一批次的不同语言）还共享内容部分。
+        先为每个批次发送一个请求使其内容进入缓存，其余请求按批次聚集在后，依次命中已缓存的较长前缀
+        """
+        if self.prompt_layout != 'prefix' or len(requests) < 2:
+            return requests
+        by_content: Dict[str, List['DeepSeekTranslator.TranslationRequest']] = {}
+        for request in requests:
+            content = json.dumps({k: v for k, v in request.texts.items() if k != '__core_keys__'}, ensure_ascii=False)
+            by_content.setdefault(content, []).append(request)
+        leaders = [batch[0] for batch in by_content.values()]
+        followers = [request for batch in by_content.values() for request in batch[1:]]
+        return leaders + followers
+
+    def request_cost(self, request: 'DeepSeekTranslator.TranslationRequest') -> float:
+        """请求的估算耗时（秒）：各语言的估算输出token（源文本token × 膨胀系数）× 每token耗时 × 该语言的平均调用次数"""
+        texts = {k: v for k, v in request.texts.items() if k != '__core_keys__'}
+        output_tokens = sum(self.batch_planner.output_tokens(texts, code) for code, _ in request.languages)
+        attempts = max(self.batch_planner.expected_attempts(code) for code, _ in request.languages)
+        return output_tokens * attempts * self.batch_planner.model_seconds_per_token(self.base_config.model)
+
+    def order_requests(self, requests: List['DeepSeekTranslator.TranslationRequest']) -> List['DeepSeekTranslator.TranslationRequest']:
+        """按调度策略确定提交顺序（不修改翻译器状态，规划模式直接使用）
+
+        并发槽位按提交顺序分配，lpt 将估算耗时最长的请求排在最前（重试较多的语言随平均调用次数提前），
+        使长批次与其余请求并行执行，而不是在最后单独成为关键路径；估算耗时相同的请求保持规划顺序
+        """
+        if self.schedule == 'lpt':
+            costs = {id(request): self.request_cost(request) for request in requests}
+            return sorted(requests, key=lambda request: -costs[id(request)])
+        return self.order_for_prefix_cache(requests)
+
+    def schedule_requests(self, requests: List['DeepSeekTranslator.TranslationRequest']) -> List['DeepSeekTranslator.TranslationRequest']:
+        """确定本次执行的提交顺序，并重置用于关键路径报告的执行记录"""
+        ordered = self.order_requests(requests)
+        self._scheduled = ordered
+        self._request_timings = {}
+        return ordered
+
+    def _record_request_timing(self, request: 'DeepSeekTranslator.TranslationRequest', start: float, calls: int, completed: bool):
+        """记录请求的实际执行区间（从首次获得并发槽位起，不含排队）；完成的请求按调用次数更新该语言的重试历史"""
+        with self._stats_lock:
+            self._request_timings[id(request)] = (start, time.perf_counter(), calls)
+        if completed and calls:
+            self.batch_planner.observe_attempts([code for code, _ in request.languages], calls)
+
+    def schedule_report(self) -> Optional[Dict[str, any]]:
+        """比较最近一次执行的预测关键路径与实际关键路径
+
+        预测按实际提交顺序、运行结束时校准后的每token耗时与平均调用次数，在实际峰值并发下模拟槽位分配；
+        关键路径以最后完成的请求表示（开始时间 + 耗时 = 总耗时）。只统计发送了API调用的请求
+        """
+        executed = [(request, self._request_timings[id(request)]) for request in self._scheduled
+                    if self._request_timings.get(id(request), (0, 0, 0))[2] > 0]
+        if not executed:
+            return None
+        concurrency = max(1, self.concurrency_limiter.peak_in_flight)
+        predicted = [self.request_cost(request) for request, _ in executed]
+        finishes = simulate_schedule(predicted, concurrency)
+        predicted_last = max(range(len(executed)), key=finishes.__getitem__)
+        actual_last = max(range(len(executed)), key=lambda index: executed[index][1][1])
+        origin = min(start for _, (start, _, _) in executed)
+        actual_start, actual_end, _ = executed[actual_last][1]
+        return {
+            'policy': self.schedule,
+            'concurrency': concurrency,
+            'requests': len(executed),
+            'predicted_makespan': round(finishes[predicted_last], 3),
+            'predicted_critical': {
+                'request': self._trace_lane_name(executed[predicted_last][0]),
+                'start': round(finishes[predicted_last] - predicted[predicted_last], 3),
+                'duration': round(predicted[predicted_last], 3)
+            },
+            'actual_makespan': round(actual_end - origin, 3),
+            'actual_critical': {
+                'request': self._trace_lane_name(executed[actual_last][0]),
+                'start': round(actual_start - origin, 3),
+                'duration': round(actual_end - actual_start, 3)
+            },
+            'longest_predicted': round(max(predicted), 3),
+            'longest_actual': round(max(end - start for _, (start, end, _) in executed), 3)
+        }
+
+    def _log_schedule_summary(self):
+        report = self.schedule_report()
+        if report is None:
+            return
+        predicted, actual = report['predicted_critical'], report['actual_critical']
+        log_progress(f"请求调度（{report['policy']}，峰值并发 {report['concurrency']}）：预测总耗时 {report['predicted_makespan']:.1f}s"
+                     f"（最后完成 {predicted['request']}，{predicted['start']:.1f}s 开始，耗时 {predicted['duration']:.1f}s），"
+                     f"实际 {report['actual_makespan']:.1f}s（最后完成 {actual['request']}，{actual['start']:.1f}s 开始，"
+                     f"耗时 {actual['duration']:.1f}s）；单请求最长：预测 {report['longest_predicted']:.1f}s，实际 {report['longest_actual']:.1f}s")
 
     def execute_requests_concurrently(self, requests: List['DeepSeekTranslator.TranslationRequest'],
-                                    max_workers: int = None) -> Dict[str, Dict[str, str]]:
+                                    max_workers: int = None,
+                                    on_pair_complete: Optional[Callable[[str, str, Dict[str, str]], None]] = None) -> Dict[str, Dict[str, str]]:
         """
         统一并发执行所有翻译请求
 
         Args:
             requests: 预处理好的翻译请求列表
-            max_workers: 最大并发数，默认为请求数量
+            max_workers: 最大线程数，默认为并发窗口上限（实际并发由自适应限制器控制）
+            on_pair_complete: 可选回调 (namespace, lang_code, translations)，某个命名空间/语言的所有批次完成后立即调用，
+                              已交给回调的结果不再出现在返回值中
 
         Returns:
             按命名空间和语言双重分组的翻译结果 {namespace: {lang_code: {key: translation, ...}, ...}, ...}
@@ -796,13 +4097,20 @@ class DeepSeekTranslator:
         if not requests:
             return {}
 
+        requests = self.schedule_requests(requests)
+        if self.engine == 'async':
+            return asyncio.run(self.execute_requests_async(requests, on_pair_complete))
+
         if max_workers is None:
-            max_workers = len(requests)  # 无并发限制，充分利用DeepSeek API
+            max_workers = min(len(requests), self.concurrency_limiter.max_window)
 
-        log_progress(f"开始并发执行 {len(requests)} 个翻译请求")
+        limiter = self.concurrency_limiter
+        log_progress(f"开始并发执行 {len(requests)} 个翻译请求（线程数 {max_workers}，初始并发窗口 {int(limiter.window)}）")
+        progress_step = max(1, len(requests) // 20)
 
         # 按命名空间和语言双重分组结果
         results_by_namespace_and_language = {}
+        stream = ResultStream(requests, on_pair_complete)
         completed_requests = 0
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -818,33 +4126,114 @@ class DeepSeekTranslator:
                 completed_requests += 1
 
                 try:
-                    request_id, target_lang, target_lang_name, result = future.result()
-
-                    # 按命名空间和语言双重分组结果
+                    self._collect_request_result(results_by_namespace_and_language, request, future.result())
+                except Exception as e:
                     namespace = getattr(request, 'namespace', 'default')
-                    if namespace not in results_by_namespace_and_language:
-                        results_by_namespace_and_language[namespace] = {}
+                    log_progress(f"  [{namespace}] 执行异常: {str(e)}", "error")
+                stream.request_done(results_by_namespace_and_language, request)
 
-                    if target_lang not in results_by_namespace_and_language[namespace]:
-                        results_by_namespace_and_language[namespace][target_lang] = {}
+                if completed_requests % progress_step == 0 or completed_requests == len(requests):
+                    log_progress(f"  进度 {completed_requests}/{len(requests)} - {limiter.status()}")
 
-                    results_by_namespace_and_language[namespace][target_lang].update(result)
+        self._log_execution_summary(results_by_namespace_and_language, stream)
+        return results_by_namespace_and_language
 
-                except Exception as e:
-                    namespace = getattr(request, 'namespace', 'default')
-                    log_progress(f"  [{namespace}] 执行异常: {str(e)}", "error")
+    async def execute_requests_async(self, requests: List['DeepSeekTranslator.TranslationRequest'],
+                                     on_pair_complete: Optional[Callable[[str, str, Dict[str, str]], None]] = None) -> Dict[str, Dict[str, str]]:
+        """
+        在单个事件循环中以协程方式执行所有翻译请求（异步引擎）
+
+        Args:
+            requests: 预处理好的翻译请求列表
+            on_pair_complete: 同 execute_requests_concurrently
+
+        Returns:
+            与 execute_requests_concurrently 相同结构的翻译结果
+        """
+        limiter = self.concurrency_limiter
+        loop = asyncio.get_running_loop()
+        # 同步回退传输在线程池中执行，线程数与并发窗口上限一致
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=limiter.max_window))
+        self.async_transport = create_async_transport(limiter.max_window, self.transport)
+        log_progress(f"开始异步执行 {len(requests)} 个翻译请求（{self.async_transport.name}，初始并发窗口 {int(limiter.window)}）")
+        progress_step = max(1, len(requests) // 20)
+
+        async def run_request(request):
+            try:
+                return request, await self.execute_translation_request_async(request), None
+            except Exception as e:
+                return request, None, e
+
+        # 写回（保存文件、更新清单）在单独的线程中串行执行，磁盘I/O不阻塞事件循环中的其他请求
+        writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='translate-writer')
+        writes = []
+
+        def write_pair(namespace: str, lang_code: str, translated: Dict[str, str]):
+            try:
+                on_pair_complete(namespace, lang_code, translated)
+            except Exception as e:
+                log_progress(f"  [{namespace}] 写回 {lang_code} 失败: {str(e)}", "error")
+
+        def submit_pair(namespace: str, lang_code: str, translated: Dict[str, str]):
+            writes.append(loop.run_in_executor(writer, write_pair, namespace, lang_code, translated))
+
+        results_by_namespace_and_language = {}
+        stream = ResultStream(requests, submit_pair if on_pair_complete is not None else None)
+        completed_requests = 0
+        try:
+            # 按提交顺序创建任务（as_completed 直接接收协程时会放入集合，启动顺序不确定），使槽位按调度顺序分配
+            tasks = [asyncio.ensure_future(run_request(request)) for request in requests]
+            for next_done in asyncio.as_completed(tasks):
+                request, outcome, error = await next_done
+                completed_requests += 1
+                if error is None:
+                    self._collect_request_result(results_by_namespace_and_language, request, outcome)
+                else:
+                    log_progress(f"  [{getattr(request, 'namespace', 'default')}] 执行异常: {str(error)}", "error")
+                stream.request_done(results_by_namespace_and_language, request)
 
-        # 统计最终结果
-        total_translations = sum(
+                if completed_requests % progress_step == 0 or completed_requests == len(requests):
+                    log_progress(f"  进度 {completed_requests}/{len(requests)} - {limiter.status()}")
+        finally:
+            await asyncio.gather(*writes)
+            writer.shutdown()
+            await self.async_transport.aclose()
+
+        self._log_execution_summary(results_by_namespace_and_language, stream)
+        return results_by_namespace_and_language
+
+    def _collect_request_result(self, results_by_namespace_and_language: Dict, request: 'DeepSeekTranslator.TranslationRequest',
+                                outcome: Tuple[int, str, str, Dict[str, str]]):
+        """将单个请求的结果按命名空间和语言双重分组合并"""
+        request_id, target_lang, target_lang_name, result = outcome
+        # 多语言分组请求的结果为 {lang_code: translation_result}
+        results_by_lang = result if request.extra_languages else {target_lang: result}
+        self._record_stat('requests_completed')
+        self._record_stat('keys_translated', sum(len(lang_result) for lang_result in results_by_lang.values()))
+
+        namespace = getattr(request, 'namespace', 'default')
+        if namespace not in results_by_namespace_and_language:
+            results_by_namespace_and_language[namespace] = {}
+
+        for lang_code, lang_result in results_by_lang.items():
+            if lang_code not in results_by_namespace_and_language[namespace]:
+                results_by_namespace_and_language[namespace][lang_code] = {}
+
+            results_by_namespace_and_language[namespace][lang_code].update(lang_result)
+
+    def _log_execution_summary(self, results_by_namespace_and_language: Dict, stream: ResultStream):
+        """统计最终结果（含已提前交给回调写回的部分）"""
+        total_translations = stream.translations_streamed + sum(
             len(translations)
             for namespace_results in results_by_namespace_and_language.values()
             for translations in namespace_results.values()
         )
+        namespaces = stream.namespaces_completed | set(results_by_namespace_and_language)
         log_progress(f"统一并发执行完成:")
-        log_progress(f"  完成命名空间数: {len(results_by_namespace_and_language)}")
+        log_progress(f"  完成命名空间数: {len(namespaces)}")
         log_progress(f"  总翻译数: {total_translations}")
-
-        return results_by_namespace_and_language
+        if stream.pairs_streamed:
+            log_progress(f"  逐个写回的命名空间/语言组合: {stream.pairs_streamed}")
 
 
 
@@ -905,19 +4294,36 @@ class DeepSeekTranslator:
         if total_items <= batch_size:
             return [dict(items)]
 
-        batches = []
+        ranges = [(i, min(i + batch_size, total_items)) for i in range(0, total_items, batch_size)]
+        batches = self._build_context_batches(items, ranges, context_size)
+
+        log_progress(f"    将 {len(texts)} 个文本分割为 {len(batches)} 个批次 (每批次 {batch_size} 个 + 上下文)")
+        return batches
+
+    def _build_context_batches(self, items: List[Tuple[str, any]], ranges: List[Tuple[int, int]],
+                               context_size: int = 4) -> List[Dict[str, any]]:
+        """
+        按给定的核心区间构建批次，并为每个批次添加上下文（首段仅后方、末段仅前方、中段前后各一半）
+
+        Args:
+            items: 有序的键值对列表
+            ranges: 核心区间列表 [(start, end), ...]，需连续覆盖 items
+            context_size: 上下文大小
 
-        for i in range(0, total_items, batch_size):
-            batch_start = i
-            batch_end = min(i + batch_size, total_items)
+        Returns:
+            批次列表，每个批次通过 '__core_keys__' 标记需要保存的核心键
+        """
+        total_items = len(items)
+        batches = []
 
+        for batch_start, batch_end in ranges:
             # 获取当前批次的核心内容
             core_items = items[batch_start:batch_end]
 
             # 计算上下文范围
             context_items = []
 
-            if i == 0:
+            if batch_start == 0:
                 # 第一段：仅添加后方上下文
                 context_start = batch_end
                 context_end = min(batch_end + context_size, total_items)
@@ -952,33 +4358,119 @@ class DeepSeekTranslator:
             batch_items = core_items + context_items
             batch_dict = dict(batch_items)
 
-            # 标记哪些是核心内容（需要保存），哪些是上下文（不保存）
-            core_keys = set(key for key, _ in core_items)
-            batch_dict['__core_keys__'] = list(core_keys)  # 转换为list以支持JSON序列化
+            # 标记哪些是核心内容（需要保存），哪些是上下文（不保存）；保持原有顺序，使相同输入得到相同的请求
+            batch_dict['__core_keys__'] = [key for key, _ in core_items]
 
             batches.append(batch_dict)
 
-        log_progress(f"    将 {len(texts)} 个文本分割为 {len(batches)} 个批次 (每批次 {batch_size} 个 + 上下文)")
         return batches
 
-def get_git_changes() -> List[FileChanges]:
-    """使用 Git 差异收集源目录下所有本地化文件的新增/修改（按命名空间聚合）。删除键不解析。"""
+class GitStats:
+    """Git 调用统计：启动的进程数、累计耗时与读取的对象数"""
+    def __init__(self):
+        self.spawns = 0
+        self.time = 0.0
+        self.objects = 0
+
+    def summary(self) -> str:
+        return f"Git：启动 {self.spawns} 个进程，读取 {self.objects} 个对象，耗时 {self.time:.2f}s"
+
+GIT_STATS = GitStats()
+
+def run_git(args: List[str]) -> subprocess.CompletedProcess:
+    """执行一次 git 命令并计入统计"""
+    start_time = time.time()
     try:
-        result = subprocess.run(
-            ['git', 'diff', '--name-only', 'HEAD~1', 'HEAD'],
-            capture_output=True, text=True, cwd='.'
-        )
+        return subprocess.run(['git', *args], capture_output=True, text=True, cwd='.')
+    finally:
+        GIT_STATS.spawns += 1
+        GIT_STATS.time += time.time() - start_time
+
+class GitObjectReader:
+    """长驻的 git cat-file --batch 进程：只启动一次，按需流式读取任意数量的对象"""
+
+    def __init__(self):
+        start_time = time.time()
+        self.process = subprocess.Popen(['git', 'cat-file', '--batch'], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd='.')
+        GIT_STATS.spawns += 1
+        GIT_STATS.time += time.time() - start_time
+
+    def read(self, spec: str) -> Optional[bytes]:
+        """读取对象内容（如 "HEAD~1:path/to/file.json"），对象不存在时返回 None"""
+        start_time = time.time()
+        try:
+            self.process.stdin.write(spec.encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+            header = self.process.stdout.readline()
+            parts = header.split()
+            # 成功时为 "<sha> <type> <size>"，否则为 "<spec> missing" 等
+            if len(parts) != 3 or not parts[2].isdigit():
+                return None
+            data = self.process.stdout.read(int(parts[2]))
+            self.process.stdout.read(1)  # 对象内容后的换行
+            GIT_STATS.objects += 1
+            return data
+        finally:
+            GIT_STATS.time += time.time() - start_time
+
+    def read_json(self, spec: str) -> Dict[str, any]:
+        """读取并解析JSON对象，不存在或无法解析时返回空字典"""
+        data = self.read(spec)
+        if data is None:
+            return {}
+        try:
+            content = json.loads(data.decode('utf-8'))
+            return content if isinstance(content, dict) else {}
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return {}
+
+    def close(self):
+        if self.process.stdin:
+            self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def resolve_base_ref(base_ref: Optional[str] = None) -> str:
+    """确定差异基准：参数 > TRANSLATION_BASE_REF 环境变量 > HEAD~1
+
+    特殊值 last-translate 表示最近一次修改 translate/ 的提交（即上次自动翻译的提交）。
+    """
+    ref = base_ref or os.getenv('TRANSLATION_BASE_REF') or 'HEAD~1'
+    if ref == 'last-translate':
+        result = run_git(['log', '-1', '--format=%H', '--', TRANSLATE_DIR])
+        commit = result.stdout.strip() if result.returncode == 0 else ""
+        if not commit:
+            log_progress(f"未找到修改 {TRANSLATE_DIR}/ 的提交，使用 HEAD~1 作为差异基准", "warning")
+            return 'HEAD~1'
+        log_progress(f"差异基准：最近一次修改 {TRANSLATE_DIR}/ 的提交 {commit[:12]}")
+        return commit
+    return ref
+
+def get_git_changes(base_ref: str = 'HEAD~1') -> List[FileChanges]:
+    """使用 Git 差异（base_ref..HEAD）收集源目录下所有本地化文件的新增/修改（按命名空间聚合）。删除键不解析。
+
+    旧版本文件内容通过单个 git cat-file --batch 进程批量读取。
+    """
+    try:
+        result = run_git(['diff', '--name-only', base_ref, 'HEAD'])
 
         if result.returncode != 0:
             log_progress("无法获取Git差异，使用全量翻译模式", "warning")
             return []
 
         changed_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-        log_progress(f"检测到 {len(changed_files)} 个变更文件")
+        log_progress(f"检测到 {len(changed_files)} 个变更文件（{base_ref}..HEAD）")
 
         # 按命名空间聚合变更键（仅新增/修改）
         aggregated: Dict[str, Dict[str, Dict[str, KeyChange]]] = {}
 
+        lang_files: List[Tuple[str, str]] = []
         for file_path in changed_files:
             # 仅处理源目录 assets 下的语言文件
             if '/assets/' not in file_path or '/lang/' not in file_path or not file_path.endswith('.json'):
@@ -990,9 +4482,15 @@ def get_git_changes() -> List[FileChanges]:
             assets_index = parts.index('assets')
             if assets_index + 1 >= len(parts):
                 continue
-            namespace = parts[assets_index + 1]
+            lang_files.append((parts[assets_index + 1], file_path))
+
+        file_key_changes = []
+        if lang_files:
+            with GitObjectReader() as reader:
+                for namespace, file_path in lang_files:
+                    file_key_changes.append((namespace, get_file_key_changes(file_path, base_ref, reader)))
 
-            changes = get_file_key_changes(file_path)
+        for namespace, changes in file_key_changes:
             if not changes:
                 continue
 
@@ -1021,26 +4519,62 @@ def get_git_changes() -> List[FileChanges]:
                     modified_keys=modified
                 ))
 
+        log_progress(GIT_STATS.summary())
         return file_changes
 
     except Exception as e:
         log_progress(f"Git差异检测失败: {e}", "error")
         return []
 
-def get_file_key_changes(file_path: str) -> Optional[Dict[str, List[KeyChange]]]:
-    """获取单个文件的键值对变更"""
+def get_manifest_changes(workspace: 'TranslationWorkspace') -> List[FileChanges]:
+    """对比当前合并源文本与源文本清单，按命名空间和语言收集源文本已变化的过期键"""
+    file_changes: List[FileChanges] = []
+    for namespace in workspace.namespaces:
+        source_dict = workspace.get_source(namespace)
+        if not source_dict:
+            continue
+        translations_by_lang = {
+            lang_code: workspace.translations[(namespace, lang_code)]
+            for lang_code in workspace.target_languages
+            if (namespace, lang_code) in workspace.translations
+        }
+        stale_by_lang = workspace.manifest.stale_keys(namespace, source_dict, translations_by_lang)
+        if not stale_by_lang:
+            continue
+
+        stale_key_count = len({key for keys in stale_by_lang.values() for key in keys})
+        log_progress(f"源文本清单：命名空间 {namespace} 有 {stale_key_count} 个过期键（涉及 {len(stale_by_lang)} 种语言）")
+        for lang_code, keys in stale_by_lang.items():
+            modified = []
+            for key in keys:
+                value = source_dict[key]
+                if isinstance(value, list):
+                    value = value[0] if value else ""
+                modified.append(KeyChange(key=key, old_value=None, new_value=value, operation=ChangeType.MODIFIED.value))
+            file_changes.append(FileChanges(
+                namespace=namespace,
+                file_path=f"{namespace}/{lang_code}.json",
+                added_keys=[],
+                deleted_keys=[],
+                modified_keys=modified
+            ))
+    return file_changes
+
+def get_file_key_changes(file_path: str, base_ref: str = 'HEAD~1',
+                         reader: Optional[GitObjectReader] = None) -> Optional[Dict[str, List[KeyChange]]]:
+    """获取单个文件相对 base_ref 的键值对变更（传入 reader 时复用已启动的 git cat-file 进程）"""
     try:
         # 获取旧版本文件内容
-        old_content_result = subprocess.run([
-            'git', 'show', f'HEAD~1:{file_path}'
-        ], capture_output=True, text=True, cwd='.')
-
-        old_data = {}
-        if old_content_result.returncode == 0:
-            try:
-                old_data = json.loads(old_content_result.stdout)
-            except json.JSONDecodeError:
-                pass
+        if reader is not None:
+            old_data = reader.read_json(f'{base_ref}:{file_path}')
+        else:
+            old_content_result = run_git(['show', f'{base_ref}:{file_path}'])
+            old_data = {}
+            if old_content_result.returncode == 0:
+                try:
+                    old_data = json.loads(old_content_result.stdout)
+                except json.JSONDecodeError:
+                    pass
 
         # 获取新版本文件内容
         new_data = {}
@@ -1140,14 +4674,50 @@ def load_json_file(file_path: str) -> Optional[Dict[str, str]]:
         log_progress(f"JSON解析错误 {file_path}: {e}", "error")
         return None
 
+class FileWriteStats:
+    """JSON 文件写入统计：实际写入的文件数与字节数、内容未变而跳过的文件数"""
+    def __init__(self):
+        self.written = 0
+        self.unchanged = 0
+        self.bytes_written = 0
+
+    def summary(self) -> str:
+        return f"文件写入：写入 {self.written} 个（{self.bytes_written} 字节），内容未变跳过 {self.unchanged} 个"
+
+FILE_WRITE_STATS = FileWriteStats()
+
+def order_like_source(translations: Dict[str, str], source_dict: Dict[str, any]) -> Dict[str, str]:
+    """按源文件中的键顺序排列译文（源文件中不存在的键保持原顺序排在最后），使写回的文件产生最小的 Git 差异"""
+    ordered = {key: translations[key] for key in source_dict if key in translations}
+    if len(ordered) < len(translations):
+        ordered.update((key, value) for key, value in translations.items() if key not in ordered)
+    return ordered
+
 def save_json_file(file_path: str, data: Dict[str, str]) -> bool:
-    """保存JSON文件"""
+    """保存JSON文件
+
+    序列化后的内容与现有文件哈希一致时跳过写入；否则先写入同目录临时文件再替换，进程中断时不会留下写了一半的文件
+    """
+    tmp_path = f"{file_path}.tmp"
     try:
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                if hashlib.sha256(f.read()).digest() == hashlib.sha256(content).digest():
+                    FILE_WRITE_STATS.unchanged += 1
+                    log_event('save', path=file_path, unchanged=True)
+                    return True
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+        FILE_WRITE_STATS.written += 1
+        FILE_WRITE_STATS.bytes_written += len(content)
+        log_event('save', path=file_path, unchanged=False, bytes=len(content), keys=len(data))
         return True
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         log_progress(f"保存文件失败 {file_path}: {e}", "error")
         return False
 
@@ -1183,26 +4753,42 @@ def load_namespace_translations(namespace: str, lang_code: str) -> Dict[str, str
 
     return {}
 
-def load_namespace_translations_from_translate(namespace: str, lang_code: str) -> Dict[str, str]:
+def load_namespace_translations_from_translate(namespace: str, lang_code: str,
+                                               workspace: Optional['TranslationWorkspace'] = None) -> Dict[str, str]:
     """仅从 translate 目录加载指定命名空间的翻译。
 
     用途：
     - 缺失键扫描与冗余清理仅针对工作目录（translate）
     - assets 目录在构建阶段参与合并，不参与完整性约束
+
+    传入 workspace 时从内存工作区读取（返回副本），不再访问磁盘。
     """
+    if workspace is not None:
+        return workspace.get_translations(namespace, lang_code)
     translate_file = Path(TRANSLATE_DIR) / namespace / "lang" / f"{lang_code}.json"
     if translate_file.exists():
         return load_json_file(str(translate_file)) or {}
     return {}
 
-def save_namespace_translations(namespace: str, lang_code: str, translations: Dict[str, str]) -> bool:
-    """保存指定命名空间的翻译到translate目录"""
+def save_namespace_translations(namespace: str, lang_code: str, translations: Dict[str, str],
+                                workspace: Optional['TranslationWorkspace'] = None) -> bool:
+    """保存指定命名空间的翻译到translate目录，键按源文件顺序排列（传入 workspace 时只更新内存，由工作区写回）"""
+    if workspace is not None:
+        workspace.set_translations(namespace, lang_code, translations)
+        return True
+    translations = order_like_source(translations, get_merged_reference_translations(namespace))
     translate_dir = Path(TRANSLATE_DIR) / namespace / "lang"
     translate_dir.mkdir(parents=True, exist_ok=True)
 
     translate_file = translate_dir / f"{lang_code}.json"
     return save_json_file(str(translate_file), translations)
 
+def translation_file_exists(namespace: str, lang_code: str, workspace: Optional['TranslationWorkspace'] = None) -> bool:
+    """translate 目录中是否存在指定命名空间和语言的翻译文件"""
+    if workspace is not None:
+        return workspace.has_translations(namespace, lang_code)
+    return (Path(TRANSLATE_DIR) / namespace / "lang" / f"{lang_code}.json").exists()
+
 def merge_namespace_translations(namespace: str, lang_code: str) -> Dict[str, any]:
     """合并同命名空间的所有键值对，包括重复键处理
 
@@ -1251,15 +4837,36 @@ def merge_namespace_translations(namespace: str, lang_code: str) -> Dict[str, an
 
     return merged_translations
 
-def get_merged_reference_translations(namespace: str) -> Dict[str, any]:
+def merge_reference_values(merged_dict: Dict[str, any], lang_data: Dict[str, str]):
+    """将一个源语言文件的键值对合并到参考字典中，重复键的不同值转换为列表"""
+    for key, value in lang_data.items():
+        if key in merged_dict:
+            # 处理重复键：转换为列表形式
+            existing_value = merged_dict[key]
+            if isinstance(existing_value, list):
+                # 如果已经是列表，添加新值
+                if value not in existing_value:
+                    existing_value.append(value)
+            else:
+                # 如果不是列表，创建新列表
+                if existing_value != value:
+                    merged_dict[key] = [existing_value, value]
+        else:
+            merged_dict[key] = value
+
+def get_merged_reference_translations(namespace: str, workspace: Optional['TranslationWorkspace'] = None) -> Dict[str, any]:
     """获取合并后的参考翻译，包含所有语言文件中的键值对
 
     Args:
         namespace: 命名空间名称
+        workspace: 内存工作区，传入时直接返回已合并的源字典
 
     Returns:
         Dict[str, any]: 合并后的参考翻译字典，重复键的值为列表
     """
+    if workspace is not None:
+        return workspace.get_source(namespace)
+
     merged_dict = {}
     namespace_lang_dir = Path(ASSETS_DIR) / namespace / "lang"
 
@@ -1270,28 +4877,279 @@ def get_merged_reference_translations(namespace: str) -> Dict[str, any]:
     for lang_file in namespace_lang_dir.glob('*.json'):
         try:
             with open(lang_file, 'r', encoding='utf-8') as f:
-                lang_data = json.load(f)
-                # 合并键值对，处理重复键转换为列表
-                for key, value in lang_data.items():
-                    if key in merged_dict:
-                        # 处理重复键：转换为列表形式
-                        existing_value = merged_dict[key]
-                        if isinstance(existing_value, list):
-                            # 如果已经是列表，添加新值
-                            if value not in existing_value:
-                                existing_value.append(value)
-                        else:
-                            # 如果不是列表，创建新列表
-                            if existing_value != value:
-                                merged_dict[key] = [existing_value, value]
-                    else:
-                        merged_dict[key] = value
+                merge_reference_values(merged_dict, json.load(f))
         except (json.JSONDecodeError, IOError) as e:
             log_progress(f"警告：无法读取语言文件 {lang_file}: {e}", "warning")
             continue
 
     return merged_dict
 
+class SourceManifest:
+    """源文本清单：记录每个命名空间/语言/键的译文是根据哪个源文本（哈希）生成的
+
+    智能翻译模式将当前合并源文本与清单对比得到过期键，结果与 Git 提交范围无关。
+    文件中每个命名空间保存所有语言共用的哈希，只有与共用值不同的语言单独记录在 overrides 中。
+    """
+
+    VERSION = 1
+
+    def __init__(self, file_path: Optional[str] = None):
+        self.file_path = file_path or SOURCE_MANIFEST_FILE
+        # {namespace: {lang_code: {key: source_hash}}}
+        self.entries: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self.exists = False
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def hash_source(value: any) -> str:
+        return hashlib.sha256(TranslationMemory.normalize_source(value).encode('utf-8')).hexdigest()[:12]
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.VERSION:
+                log_progress("源文本清单版本不匹配，将重新生成", "warning")
+                return
+            for namespace, section in data.get('namespaces', {}).items():
+                shared = section.get('keys', {})
+                overrides = section.get('overrides', {})
+                self.entries[namespace] = {
+                    lang_code: {**shared, **overrides.get(lang_code, {})}
+                    for lang_code in section.get('languages', [])
+                }
+            self.exists = True
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            log_progress(f"源文本清单读取失败，将重新生成: {e}", "warning")
+
+    def stale_keys(self, namespace: str, source_dict: Dict[str, any],
+                   translations_by_lang: Dict[str, Dict[str, str]]) -> Dict[str, List[str]]:
+        """找出源文本哈希与译文生成时不同的键（只考虑译文中已存在的键）
+
+        Returns:
+            {lang_code: [key, ...]}，键按源字典顺序排列
+        """
+        current = {key: self.hash_source(value) for key, value in source_dict.items()}
+        stale: Dict[str, List[str]] = {}
+        with self._lock:
+            namespace_entries = self.entries.get(namespace, {})
+            for lang_code, translations in translations_by_lang.items():
+                recorded = namespace_entries.get(lang_code)
+                if not recorded:
+                    continue
+                keys = [key for key, digest in current.items()
+                        if key in translations and key in recorded and recorded[key] != digest]
+                if keys:
+                    stale[lang_code] = keys
+        return stale
+
+    def record(self, namespace: str, lang_code: str, keys, source_dict: Dict[str, any]):
+        """记录本次新生成的译文所对应的源文本哈希"""
+        with self._lock:
+            recorded = self.entries.setdefault(namespace, {}).setdefault(lang_code, {})
+            for key in keys:
+                if key in source_dict:
+                    digest = self.hash_source(source_dict[key])
+                    if recorded.get(key) != digest:
+                        recorded[key] = digest
+                        self.dirty = True
+
+    def sync(self, namespace: str, lang_code: str, translations: Dict[str, str], source_dict: Dict[str, any]):
+        """与现有译文对齐：移除已删除的键；来源未知的已有译文视为由当前源文本生成"""
+        with self._lock:
+            recorded = self.entries.setdefault(namespace, {}).setdefault(lang_code, {})
+            for key in [k for k in recorded if k not in translations or k not in source_dict]:
+                del recorded[key]
+                self.dirty = True
+            for key in translations:
+                if key not in recorded and key in source_dict:
+                    recorded[key] = self.hash_source(source_dict[key])
+                    self.dirty = True
+
+    def save(self) -> bool:
+        """写入清单文件（内容无变化时跳过）"""
+        with self._lock:
+            if not self.dirty and self.exists:
+                return True
+            namespaces = {}
+            for namespace, by_lang in sorted(self.entries.items()):
+                languages = sorted(lang for lang, recorded in by_lang.items() if recorded)
+                if not languages:
+                    continue
+                # 每个键取出现次数最多的哈希作为共用值
+                candidates: Dict[str, Counter] = {}
+                for lang_code in languages:
+                    for key, digest in by_lang[lang_code].items():
+                        candidates.setdefault(key, Counter())[digest] += 1
+                shared = {key: counter.most_common(1)[0][0] for key, counter in candidates.items()}
+                overrides = {}
+                for lang_code in languages:
+                    differing = {key: digest for key, digest in by_lang[lang_code].items() if shared[key] != digest}
+                    if differing:
+                        overrides[lang_code] = differing
+                namespaces[namespace] = {'languages': languages, 'keys': shared, 'overrides': overrides}
+            data = {'version': self.VERSION, 'namespaces': namespaces}
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            temp_path = f"{self.file_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+                f.write('\n')
+            os.replace(temp_path, self.file_path)
+            with self._lock:
+                self.exists = True
+                self.dirty = False
+            return True
+        except OSError as e:
+            log_progress(f"保存源文本清单失败: {e}", "error")
+            return False
+
+class TranslationWorkspace:
+    """单次运行共享的内存工作区
+
+    运行开始时并行读取所有命名空间的源语言文件与 translate 目录下的翻译文件，
+    之后的差异检测、缺失扫描、结果合并与多余键清理都在内存中进行；
+    通过 save_namespace_translations 写入的修改只标记为脏，运行结束时由 flush() 写回有变化的文件。
+    """
+
+    def __init__(self, namespaces: Optional[List[str]] = None, target_languages: Optional[Dict[str, str]] = None,
+                 max_workers: int = 16):
+        self.namespaces = namespaces if namespaces is not None else get_namespace_list()
+        self.target_languages = target_languages if target_languages is not None else get_all_target_languages()
+        self.max_workers = max_workers
+        self.sources: Dict[str, Dict[str, any]] = {}
+        self.translations: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.manifest = SourceManifest()
+        # 统计
+        self.source_files_parsed = 0
+        self.translation_files_parsed = 0
+        self.parse_errors = 0
+        self.load_time = 0.0
+        self.files_written = 0
+        self.write_failures = 0
+        self.write_time = 0.0
+        self.load()
+
+    def load(self):
+        """并行读取所有源文件与翻译文件"""
+        start_time = time.time()
+        load_start = time.perf_counter()
+        source_files: List[Tuple[str, Path]] = []
+        translation_files: List[Tuple[Tuple[str, str], Path]] = []
+        for namespace in self.namespaces:
+            namespace_lang_dir = Path(ASSETS_DIR) / namespace / "lang"
+            if namespace_lang_dir.exists():
+                source_files.extend((namespace, lang_file) for lang_file in namespace_lang_dir.glob('*.json'))
+            for lang_code in self.target_languages:
+                translate_file = Path(TRANSLATE_DIR) / namespace / "lang" / f"{lang_code}.json"
+                if translate_file.exists():
+                    translation_files.append(((namespace, lang_code), translate_file))
+
+        paths = [path for _, path in source_files] + [path for _, path in translation_files]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(paths)))) as executor:
+            parsed = list(executor.map(lambda path: load_json_file(str(path)), paths))
+
+        # 按原有的文件顺序合并源字典，保证重复键列表的顺序不变
+        for (namespace, _), data in zip(source_files, parsed[:len(source_files)]):
+            merged = self.sources.setdefault(namespace, {})
+            if data is None:
+                self.parse_errors += 1
+                continue
+            merge_reference_values(merged, data)
+            self.source_files_parsed += 1
+        for (key, _), data in zip(translation_files, parsed[len(source_files):]):
+            if data is None:
+                self.parse_errors += 1
+                data = {}
+            else:
+                self.translation_files_parsed += 1
+            self.translations[key] = data
+
+        self.load_time = time.time() - start_time
+        TRACER.add('workspace_load', load_start, time.perf_counter() - load_start, 'orchestration')
+        log_progress(f"✓ 工作区加载完成：{len(self.namespaces)} 个命名空间，"
+                     f"源文件 {self.source_files_parsed} 个，翻译文件 {self.translation_files_parsed} 个，耗时 {self.load_time:.2f}s")
+
+    def get_source(self, namespace: str) -> Dict[str, any]:
+        """合并后的源字典（只读）"""
+        return self.sources.get(namespace, {})
+
+    def has_translations(self, namespace: str, lang_code: str) -> bool:
+        with self._lock:
+            return (namespace, lang_code) in self.translations
+
+    def get_translations(self, namespace: str, lang_code: str) -> Dict[str, str]:
+        """translate 目录中的现有翻译（副本，调用方可自由修改）"""
+        with self._lock:
+            return dict(self.translations.get((namespace, lang_code), {}))
+
+    def set_translations(self, namespace: str, lang_code: str, translations: Dict[str, str]):
+        """更新内存中的翻译（键按源文件顺序排列）；内容或顺序有变化（或文件尚不存在）时标记为待写回"""
+        key = (namespace, lang_code)
+        translations = order_like_source(translations, self.get_source(namespace))
+        with self._lock:
+            current = self.translations.get(key)
+            if current is not None and current == translations and list(current) == list(translations):
+                return
+            self.translations[key] = translations
+            self._dirty.add(key)
+
+    def record_translated(self, namespace: str, lang_code: str, keys):
+        """在源文本清单中记录本次新翻译的键"""
+        self.manifest.record(namespace, lang_code, keys, self.get_source(namespace))
+
+    def _write_dirty(self, pairs: Optional[List[Tuple[str, str]]] = None) -> int:
+        """写回有变化的翻译（pairs 为空时写回全部），写入失败的文件保持为脏"""
+        with self._lock:
+            dirty = sorted(self._dirty if pairs is None else self._dirty.intersection(pairs))
+            self._dirty.difference_update(dirty)
+            snapshot = {key: self.translations[key] for key in dirty}
+        written = 0
+        for namespace, lang_code in dirty:
+            if save_namespace_translations(namespace, lang_code, snapshot[(namespace, lang_code)]):
+                written += 1
+            else:
+                self.write_failures += 1
+                with self._lock:
+                    self._dirty.add((namespace, lang_code))
+        self.files_written += written
+        return written
+
+    def flush_pair(self, namespace: str, lang_code: str) -> int:
+        """立即写回单个命名空间/语言的翻译文件（源文本清单在 flush() 时统一保存）"""
+        start_time = time.time()
+        written = self._write_dirty([(namespace, lang_code)])
+        self.manifest.sync(namespace, lang_code, self.get_translations(namespace, lang_code), self.get_source(namespace))
+        self.write_time += time.time() - start_time
+        return written
+
+    def flush(self) -> int:
+        """将所有有变化的翻译写回 translate 目录并更新源文本清单，返回写入的文件数"""
+        start_time = time.time()
+        flush_start = time.perf_counter()
+        written = self._write_dirty()
+
+        with self._lock:
+            current = list(self.translations.items())
+        for (namespace, lang_code), translations in current:
+            self.manifest.sync(namespace, lang_code, translations, self.get_source(namespace))
+        self.manifest.save()
+        self.write_time += time.time() - start_time
+        TRACER.add('workspace_flush', flush_start, time.perf_counter() - flush_start, 'orchestration')
+        return written
+
+    def summary(self) -> str:
+        return (f"工作区：解析源文件 {self.source_files_parsed} 个、翻译文件 {self.translation_files_parsed} 个"
+                f"（解析失败 {self.parse_errors} 个），读取耗时 {self.load_time:.2f}s；"
+                f"写回 {self.files_written} 个文件（失败 {self.write_failures} 个），写入耗时 {self.write_time:.2f}s；"
+                f"{FILE_WRITE_STATS.summary()}")
+
 def find_existing_translations(lang_code: str) -> Dict[str, str]:
     """查找现有的翻译文件"""
     existing_translations = {}
@@ -1460,7 +5318,7 @@ def check_missing_translation_files() -> Dict[str, List[str]]:
 
 
 
-def check_missing_translation_files() -> List[Tuple[str, str]]:
+def check_missing_translation_files(workspace: Optional[TranslationWorkspace] = None) -> List[Tuple[str, str]]:
     """检查缺失的翻译文件
 
     Returns:
@@ -1484,8 +5342,7 @@ def check_missing_translation_files() -> List[Tuple[str, str]]:
 
         # 检查每种目标语言的翻译文件
         for lang_code, _ in get_all_target_languages().items():
-            translate_file = Path(TRANSLATE_DIR) / namespace / "lang" / f"{lang_code}.json"
-            if not translate_file.exists():
+            if not translation_file_exists(namespace, lang_code, workspace):
                 missing_files.append((namespace, lang_code))
 
     if missing_files:
@@ -1497,7 +5354,8 @@ def check_missing_translation_files() -> List[Tuple[str, str]]:
 
     return missing_files
 
-def create_virtual_changes_for_missing_files(missing_files: List[Tuple[str, str]]) -> List[FileChanges]:
+def create_virtual_changes_for_missing_files(missing_files: List[Tuple[str, str]],
+                                             workspace: Optional[TranslationWorkspace] = None) -> List[FileChanges]:
     """为缺失的翻译文件创建虚拟变更
 
     Args:
@@ -1517,7 +5375,7 @@ def create_virtual_changes_for_missing_files(missing_files: List[Tuple[str, str]
 
     for namespace, lang_codes in namespace_groups.items():
         # 使用合并后的参考翻译以获取所有键
-        source_dict = get_merged_reference_translations(namespace)
+        source_dict = get_merged_reference_translations(namespace, workspace)
         if not source_dict:
             continue
 
@@ -1548,14 +5406,14 @@ def create_virtual_changes_for_missing_files(missing_files: List[Tuple[str, str]
 
     return virtual_changes
 
-def create_virtual_changes_for_missing_keys() -> List[FileChanges]:
+def create_virtual_changes_for_missing_keys(workspace: Optional[TranslationWorkspace] = None) -> List[FileChanges]:
     """为已有翻译文件中的缺失键创建虚拟变更，只扫描缺失键，忽略输出目录的修改"""
     virtual_changes: List[FileChanges] = []
 
     # 遍历所有命名空间
     for namespace in get_namespace_list():
         # 使用合并后的参考翻译获取完整键集合
-        source_dict = get_merged_reference_translations(namespace)
+        source_dict = get_merged_reference_translations(namespace, workspace)
         if not source_dict:
             continue
 
@@ -1563,13 +5421,12 @@ def create_virtual_changes_for_missing_keys() -> List[FileChanges]:
 
         # 遍历所有目标语言
         for lang_code, _ in get_all_target_languages().items():
-            translate_file = Path(TRANSLATE_DIR) / namespace / "lang" / f"{lang_code}.json"
-            if not translate_file.exists():
+            if not translation_file_exists(namespace, lang_code, workspace):
                 # 文件缺失的场景由 create_virtual_changes_for_missing_files 处理
                 continue
 
             # 仅基于 translate 目录检查缺失，assets 将在构建时合并
-            existing_translations = load_namespace_translations_from_translate(namespace, lang_code)
+            existing_translations = load_namespace_translations_from_translate(namespace, lang_code, workspace)
             existing_keys = set(existing_translations.keys())
 
             # 仅扫描缺失键（忽略输出目录的修改）
@@ -1612,23 +5469,22 @@ def delete_keys_from_translations(namespace: str, keys_to_delete: List[str]) ->
             continue
 
         # 删除指定的键
-        modified = False
-        for key in keys_to_delete:
-            if key in translations:
-                del translations[key]
-                modified = True
-
-        # 如果有修改，保存文件
-        if modified:
+        removed = [key for key in keys_to_delete if key in translations]
+        for key in removed:
+            del translations[key]
+
+        # 如果有修改，保存文件（删除键不改变其余键的顺序）
+        if removed:
             if save_json_file(str(translate_file), translations):
-                log_progress(f"    ✓ 从 {lang_code} 翻译中删除了 {len([k for k in keys_to_delete if k in translations])} 个键")
+                log_progress(f"    ✓ 从 {lang_code} 翻译中删除了 {len(removed)} 个键")
             else:
                 log_progress(f"    ✗ 删除键失败: {translate_file}", "error")
                 success = False
 
     return success
 
-def needs_translation(namespace: str, lang_code: str, source_dict: Dict[str, str]) -> bool:
+def needs_translation(namespace: str, lang_code: str, source_dict: Dict[str, str],
+                      workspace: Optional[TranslationWorkspace] = None) -> bool:
     """判断是否需要翻译"""
     force_translate = os.getenv('FORCE_TRANSLATE', 'false').lower() == 'true'
 
@@ -1636,7 +5492,7 @@ def needs_translation(namespace: str, lang_code: str, source_dict: Dict[str, str
         return True
 
     # 检查已有翻译是否完整（仅检查translate目录）
-    existing_translations = load_namespace_translations_from_translate(namespace, lang_code)
+    existing_translations = load_namespace_translations_from_translate(namespace, lang_code, workspace)
 
     # 如果没有任何翻译，需要翻译
     if not existing_translations:
@@ -1650,10 +5506,38 @@ def needs_translation(namespace: str, lang_code: str, source_dict: Dict[str, str
 
     return False
 
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数（未指定时使用环境变量）"""
+    parser = argparse.ArgumentParser(description="使用DeepSeek API进行多语言自动翻译")
+    parser.add_argument('--engine', choices=TRANSLATION_ENGINES, default=None,
+                        help="并发引擎：thread（线程池）或 async（asyncio 单事件循环），默认读取 TRANSLATION_ENGINE")
+    parser.add_argument('--base-ref', default=None,
+                        help="Git差异基准（提交、分支或 last-translate），默认读取 TRANSLATION_BASE_REF，否则为 HEAD~1")
+    parser.add_argument('--plan', action='store_true',
+                        help="只规划不翻译：输出请求列表、估算token与预计耗时，不需要API密钥；"
+                             "不修改翻译文件、源文本清单与缓存，只写出运行日志（logs/ 与 translation.log，不纳入版本控制）")
+    parser.add_argument('--plan-concurrency', type=int, default=None,
+                        help="--plan 模式下额外预测该并发度的耗时")
+    return parser.parse_args(argv)
+
 def main():
     """主函数"""
+    args = parse_arguments()
     log_section("翻译脚本启动")
 
+    # 检查翻译模式
+    force_translate = os.getenv('FORCE_TRANSLATE', 'false').lower() == 'true'
+
+    if args.plan:
+        # 规划模式：与正常流程相同地检测变更并分批，但不调用API、不写回文件
+        non_thinking_mode = os.getenv('NON_THINKING_MODE', 'false').lower() == 'true'
+        translator = DeepSeekTranslator(os.getenv('DEEPSEEK_API_KEY', ''), non_thinking_mode, engine=args.engine)
+        try:
+            run_translation_plan(translator, TranslationWorkspace(), force_translate, args.base_ref, args.plan_concurrency)
+        finally:
+            translator.transport.close()
+        return
+
     # 检查环境变量
     api_key = os.getenv('DEEPSEEK_API_KEY')
     if not api_key:
@@ -1670,22 +5554,32 @@ def main():
         log_progress("🧠 思考模式：使用deepseek-reasoner模型以提升质量")
 
     # 创建翻译器
-    translator = DeepSeekTranslator(api_key, non_thinking_mode)
-    log_progress("✓ 翻译器初始化完成")
-
-    # 检查翻译模式
-    force_translate = os.getenv('FORCE_TRANSLATE', 'false').lower() == 'true'
+    translator = DeepSeekTranslator(api_key, non_thinking_mode, engine=args.engine)
+    log_progress(f"✓ 翻译器初始化完成（并发引擎: {translator.engine}）")
 
-    if force_translate:
-        log_progress("🔄 强制翻译模式：将重新翻译所有内容（使用合并翻译逻辑）")
-        # 使用全量翻译逻辑（已集成合并翻译）
-        run_full_translation(translator)
-    else:
-        log_progress("🔍 智能翻译模式：检测Git变更（使用合并翻译逻辑）")
-        # 使用智能差异翻译逻辑（已集成合并翻译）
-        run_smart_translation(translator)
+    # 一次性加载所有源文件与翻译文件
+    workspace = TranslationWorkspace()
 
-def run_full_translation(translator):
+    completed = False
+    try:
+        if force_translate:
+            log_progress("🔄 强制翻译模式：将重新翻译所有内容（使用合并翻译逻辑）")
+            # 使用全量翻译逻辑（已集成合并翻译）
+            run_full_translation(translator, workspace)
+        else:
+            log_progress("🔍 智能翻译模式：检测Git变更（使用合并翻译逻辑）")
+            # 使用智能差异翻译逻辑（已集成合并翻译）
+            run_smart_translation(translator, workspace, args.base_ref)
+        completed = True
+    finally:
+        workspace.flush()
+        log_progress(workspace.summary())
+        translator.finish_run()
+        # 译文全部写回且翻译记忆已保存后才清空检查点日志；中断或写入失败时保留供下次运行重放
+        if completed and not workspace.write_failures:
+            translator.checkpoint_journal.clear()
+
+def run_full_translation(translator, workspace: Optional[TranslationWorkspace] = None):
     """运行全量翻译（原有逻辑）"""
     # 获取所有命名空间
     log_progress("扫描命名空间...")
@@ -1705,31 +5599,125 @@ def run_full_translation(translator):
     log_section_end()
 
     # 调用原有的翻译逻辑
-    continue_full_translation(translator, progress_tracker, namespaces)
+    continue_full_translation(translator, progress_tracker, namespaces, workspace)
+
+def simulate_schedule(durations: List[float], concurrency: int) -> List[float]:
+    """按提交顺序将请求分配给最早空闲的并发槽位，返回各请求的预计完成时间"""
+    slots = [0.0] * max(1, concurrency)
+    finishes = []
+    for duration in durations:
+        start = heapq.heappop(slots)
+        finishes.append(start + duration)
+        heapq.heappush(slots, start + duration)
+    return finishes
+
+def simulate_wall_time(durations: List[float], concurrency: int) -> float:
+    """按提交顺序将请求分配给最早空闲的并发槽位，返回预计总耗时"""
+    return max(simulate_schedule(durations, concurrency), default=0.0)
+
+def run_translation_plan(translator, workspace: Optional[TranslationWorkspace] = None, force_translate: bool = False,
+                         base_ref: Optional[str] = None, concurrency: Optional[int] = None):
+    """只规划不调用API（--plan）：输出请求列表、估算token、费用与不同并发度下的预计耗时"""
+    if force_translate:
+        namespaces = get_namespace_list()
+        all_translation_tasks, all_requests = prepare_full_translation(translator, namespaces, workspace)
+    else:
+        all_translation_tasks, all_requests = prepare_smart_translation(translator, workspace, base_ref)
+
+    log_section("翻译计划")
+    if not all_requests:
+        log_progress("没有需要执行的翻译请求")
+        log_section_end()
+        return
+
+    estimates = [translator.estimate_request(request) for request in translator.order_requests(all_requests)]
+    for index, estimate in enumerate(estimates, 1):
+        description = (f"[{index:>4}] {estimate['namespace']} -> {'/'.join(estimate['languages'])} 批次 {estimate['batch']}："
+                       f"核心 {estimate['core_keys']} 键 + 上下文 {estimate['context_keys']} 键，")
+        if estimate['memory_hit']:
+            log_progress(description + "翻译记忆全部命中，不发送请求")
+        else:
+            log_progress(description + f"输入 ~{estimate['input_tokens']} token，输出 ~{estimate['output_tokens']} token，"
+                         f"预计 {estimate['seconds']:.1f}s")
+
+    sent = [estimate for estimate in estimates if not estimate['memory_hit']]
+    model = estimates[0]['model']
+    input_tokens = sum(estimate['input_tokens'] for estimate in sent)
+    output_tokens = sum(estimate['output_tokens'] for estimate in sent)
+    # 第一个请求之后，共享前缀按命中上下文缓存计
+    cache_hit_tokens = translator.shared_prefix_tokens() * max(0, len(sent) - 1)
+    cost = UsageLedger.estimate_cost(model, {'prompt_tokens': input_tokens, 'prompt_cache_hit_tokens': cache_hit_tokens,
+                                             'completion_tokens': output_tokens})
+    log_progress(f"合计：{len(all_translation_tasks)} 个任务、{len(estimates)} 个请求（翻译记忆命中跳过 {len(estimates) - len(sent)} 个），"
+                 f"核心键 {sum(estimate['core_keys'] for estimate in estimates)} 个")
+    log_progress(f"估算用量：输入 ~{input_tokens} token（共享前缀约 {cache_hit_tokens} token 可命中缓存），"
+                 f"输出 ~{output_tokens} token（不含推理token），估算费用 ${cost:.4f}")
+
+    durations = [estimate['seconds'] for estimate in sent]
+    limiter = translator.concurrency_limiter
+    levels = [concurrency] if concurrency else []
+    level = max(1, int(limiter.window))
+    while level < limiter.max_window:
+        levels.append(level)
+        level *= 2
+    levels.append(limiter.max_window)
+    predictions = "，".join(f"并发 {level} → {simulate_wall_time(durations, level):.0f}s"
+                            for level in sorted(set(levels)))
+    log_progress(f"预计耗时（{model} {translator.batch_planner.model_seconds_per_token(model):.3f}s/token，"
+                 f"单请求最长 {max(durations, default=0):.0f}s）：{predictions}")
+    log_section_end()
+
+def group_translation_tasks(translator, tasks: List[Dict], texts_field: str) -> List[Tuple[Dict, List[Tuple[str, str]]]]:
+    """将翻译任务整理为 [(代表任务, [(lang_code, lang_name), ...]), ...]
+
+    启用多语言分组时，命名空间与待翻译文本完全相同的任务合并，交由 prepare_translation_requests 按语言分组创建请求；
+    未启用时每个任务单独成组
+    """
+    if not translator.language_groups:
+        return [(task, [(task['lang_code'], task['lang_name'])]) for task in tasks]
+    merged: Dict[Tuple[str, str], Tuple[Dict, List[Tuple[str, str]]]] = {}
+    for task in tasks:
+        signature = (task['namespace'], json.dumps(task[texts_field], ensure_ascii=False))
+        if signature not in merged:
+            merged[signature] = (task, [])
+        merged[signature][1].append((task['lang_code'], task['lang_name']))
+    return list(merged.values())
+
+def prepare_smart_translation(translator, workspace: Optional[TranslationWorkspace] = None,
+                              base_ref: Optional[str] = None) -> Tuple[List[Dict], List['DeepSeekTranslator.TranslationRequest']]:
+    """检测差异与缺失并创建智能翻译的任务和请求（不调用API）
 
-def run_smart_translation(translator):
-    """运行智能差异翻译（一次性并发；基于Git差异收集键名）"""
-    # 使用 Git 收集每个源目录语言文件的键级差异，随后在合并源文本上处理
-    file_changes = get_git_changes()
+    Returns:
+        (翻译任务列表, 翻译请求列表)；没有需要翻译的内容时均为空
+    """
+    # 优先对比源文本清单找出过期键（与提交范围无关）；尚无清单时使用 Git 差异，运行结束后生成清单
+    with TRACER.span('change_detection', 'orchestration'):
+        if workspace is not None and workspace.manifest.exists:
+            file_changes = get_manifest_changes(workspace)
+            log_progress(f"源文本清单检测到 {len(file_changes)} 个过期键任务")
+        else:
+            if workspace is not None:
+                log_progress("未找到源文本清单，使用Git差异检测（本次运行结束后生成清单）")
+            file_changes = get_git_changes(resolve_base_ref(base_ref))
 
     # 检查输出文件缺失情况
-    missing_translations = check_missing_translation_files()
+    with TRACER.span('missing_scan', 'orchestration'):
+        missing_translations = check_missing_translation_files(workspace)
 
-    if missing_translations:
-        virtual_changes = create_virtual_changes_for_missing_files(missing_translations)
-        file_changes.extend(virtual_changes)
-        log_progress(f"为 {len(missing_translations)} 个缺失文件创建补全翻译任务")
+        if missing_translations:
+            virtual_changes = create_virtual_changes_for_missing_files(missing_translations, workspace)
+            file_changes.extend(virtual_changes)
+            log_progress(f"为 {len(missing_translations)} 个缺失文件创建补全翻译任务")
 
-    # 已有翻译文件的缺失键补全任务
-    missing_key_changes = create_virtual_changes_for_missing_keys()
-    if missing_key_changes:
-        file_changes.extend(missing_key_changes)
-        log_progress(f"为已有翻译文件创建缺失键补全任务：{len(missing_key_changes)} 个变更")
+        # 已有翻译文件的缺失键补全任务
+        missing_key_changes = create_virtual_changes_for_missing_keys(workspace)
+        if missing_key_changes:
+            file_changes.extend(missing_key_changes)
+            log_progress(f"为已有翻译文件创建缺失键补全任务：{len(missing_key_changes)} 个变更")
 
     if not file_changes:
         log_progress("未检测到差异或缺失，跳过翻译")
-        perform_cleanup_extra_keys()
-        return
+        return [], []
 
     log_progress(f"检测到 {len(file_changes)} 个变更任务")
 
@@ -1737,97 +5725,122 @@ def run_smart_translation(translator):
 
     # 收集所有翻译任务（一次性并发）
     all_translation_tasks = []
-    for changes in file_changes:
-        # 使用合并后的参考翻译
-        source_dict = get_merged_reference_translations(changes.namespace)
-        if not source_dict:
-            log_progress(f"无法加载命名空间 {changes.namespace} 的合并参考翻译", "error")
-            continue
+    with TRACER.span('source_merge', 'orchestration'):
+        for changes in file_changes:
+            # 使用合并后的参考翻译
+            source_dict = get_merged_reference_translations(changes.namespace, workspace)
+            if not source_dict:
+                log_progress(f"无法加载命名空间 {changes.namespace} 的合并参考翻译", "error")
+                continue
 
-        # 目标键集合：新增 + 修改（去重保持顺序）
-        keys_to_translate = list(dict.fromkeys([c.key for c in (changes.added_keys + changes.modified_keys)]))
-        if not keys_to_translate:
-            continue
+            # 目标键集合：新增 + 修改（去重保持顺序）
+            keys_to_translate = list(dict.fromkeys([c.key for c in (changes.added_keys + changes.modified_keys)]))
+            if not keys_to_translate:
+                continue
 
-        # 上下文策略：若少于10条则补齐上下文到10条；否则仅目标键
-        if len(keys_to_translate) < 10:
-            context_dict = get_context_for_keys(source_dict, keys_to_translate, max_context=10, force_context=False)
-            log_progress(f"差异翻译上下文补充：{len(keys_to_translate)} 个目标键 + {len(context_dict) - len(keys_to_translate)} 个上下文键 = {len(context_dict)} 个键值对")
-        else:
-            context_dict = {k: source_dict[k] for k in keys_to_translate if k in source_dict}
-            log_progress(f"差异翻译：{len(context_dict)} 个键值对（无需添加上下文）")
-
-        # 目标语言列表：默认所有语言；若为缺失文件的虚拟变更，则限制到该语言
-        target_languages = get_all_target_languages().copy()
-        if "/" in changes.file_path and changes.file_path.endswith('.json'):
-            file_name = Path(changes.file_path).name
-            target_lang_code = file_name[:-5]
-            if target_lang_code in target_languages:
-                target_languages = {target_lang_code: target_languages[target_lang_code]}
-                log_progress(f"  虚拟变更：只翻译缺失的语言 {target_languages[target_lang_code]} ({target_lang_code})")
+            # 上下文策略：若少于10条则补齐上下文到10条；否则仅目标键
+            if len(keys_to_translate) < 10:
+                context_dict = get_context_for_keys(source_dict, keys_to_translate, max_context=10, force_context=False)
+                log_progress(f"差异翻译上下文补充：{len(keys_to_translate)} 个目标键 + {len(context_dict) - len(keys_to_translate)} 个上下文键 = {len(context_dict)} 个键值对")
             else:
-                target_languages = {}
-                log_progress(f"  未知的语言代码: {target_lang_code}，跳过翻译")
-
-        for lang_code, lang_name in target_languages.items():
-            existing_translations = load_namespace_translations_from_translate(changes.namespace, lang_code)
-            all_translation_tasks.append({
-                'namespace': changes.namespace,
-                'lang_code': lang_code,
-                'lang_name': lang_name,
-                'context_dict': context_dict,
-                'keys_to_translate': keys_to_translate,
-                'existing_translations': existing_translations
-            })
+                context_dict = {k: source_dict[k] for k in keys_to_translate if k in source_dict}
+                log_progress(f"差异翻译：{len(context_dict)} 个键值对（无需添加上下文）")
+
+            # 目标语言列表：默认所有语言；若为缺失文件的虚拟变更，则限制到该语言
+            target_languages = get_all_target_languages().copy()
+            if "/" in changes.file_path and changes.file_path.endswith('.json'):
+                file_name = Path(changes.file_path).name
+                target_lang_code = file_name[:-5]
+                if target_lang_code in target_languages:
+                    target_languages = {target_lang_code: target_languages[target_lang_code]}
+                    log_progress(f"  虚拟变更：只翻译缺失的语言 {target_languages[target_lang_code]} ({target_lang_code})")
+                else:
+                    target_languages = {}
+                    log_progress(f"  未知的语言代码: {target_lang_code}，跳过翻译")
+
+            for lang_code, lang_name in target_languages.items():
+                existing_translations = load_namespace_translations_from_translate(changes.namespace, lang_code, workspace)
+                all_translation_tasks.append({
+                    'namespace': changes.namespace,
+                    'lang_code': lang_code,
+                    'lang_name': lang_name,
+                    'context_dict': context_dict,
+                    'keys_to_translate': keys_to_translate,
+                    'existing_translations': existing_translations
+                })
 
     if not all_translation_tasks:
         log_progress("没有需要执行的翻译任务")
-        perform_cleanup_extra_keys()
-        return
+        return [], []
 
     log_progress(f"准备 {len(all_translation_tasks)} 个翻译任务（全局并发）")
 
     # 统一准备与并发请求
-    all_requests = []
+    with TRACER.span('planning', 'orchestration'):
+        all_requests = []
+        planned_tasks = translator.source_dedup.deduplicate(all_translation_tasks, 'context_dict',
+                                                            translator.batch_planner.output_tokens)
+        for task, target_languages_list in group_translation_tasks(translator, planned_tasks, 'context_dict'):
+            prepared_context = translator.prepare_texts_for_translation(task['context_dict'])
+            requests = translator.prepare_translation_requests(prepared_context, target_languages_list, silent=True)
+            for request in requests:
+                request.namespace = task['namespace']
+                request.keys_to_translate = task['keys_to_translate']
+                all_requests.append(request)
+
+    return all_translation_tasks, all_requests
+
+def run_smart_translation(translator, workspace: Optional[TranslationWorkspace] = None, base_ref: Optional[str] = None):
+    """运行智能差异翻译（一次性并发；基于源文本清单或Git差异收集键名）"""
+    all_translation_tasks, all_requests = prepare_smart_translation(translator, workspace, base_ref)
+    if not all_translation_tasks:
+        perform_cleanup_extra_keys(workspace)
+        return
+
+    tasks_by_pair: Dict[Tuple[str, str], List[Dict]] = {}
     for task in all_translation_tasks:
-        prepared_context = translator.prepare_texts_for_translation(task['context_dict'])
-        target_languages_list = [(task['lang_code'], task['lang_name'])]
-        requests = translator.prepare_translation_requests(prepared_context, target_languages_list, batch_size=40, silent=True)
-        for request in requests:
-            request.namespace = task['namespace']
-            request.keys_to_translate = task['keys_to_translate']
-            request.existing_translations = task['existing_translations']
-            all_requests.append(request)
+        tasks_by_pair.setdefault((task['namespace'], task['lang_code']), []).append(task)
+    saved_count = 0
 
-    log_progress(f"开始并发翻译 {len(all_requests)} 个请求...")
-    results_by_namespace_and_language = translator.execute_requests_concurrently(all_requests)
+    def save_pair(ns: str, lang: str, translated: Dict[str, str]):
+        """某个命名空间/语言的所有批次完成后立即合并并写回"""
+        nonlocal saved_count
+        with TRACER.span('save', 'orchestration', namespace=ns, language=lang):
+            if not translated:
+                return
+            for task in tasks_by_pair.get((ns, lang), []):
+                keys = task['keys_to_translate']
+                target_translations = {k: translated[k] for k in keys if k in translated}
+                # 同一文件可能对应多个任务（差异 + 缺失键），以最新内容为基础合并，避免相互覆盖
+                final = load_namespace_translations_from_translate(ns, lang, workspace)
+                final.update(target_translations)
+                if save_namespace_translations(ns, lang, final, workspace):
+                    if workspace is not None:
+                        workspace.record_translated(ns, lang, target_translations)
+                    saved_count += 1
+                    log_progress(f"✓ {ns} -> {lang}: {len(target_translations)} 个新翻译")
+                else:
+                    log_progress(f"✗ 保存失败: {ns} -> {lang}", "error")
+            if workspace is not None:
+                workspace.flush_pair(ns, lang)
 
-    # 保存结果
-    saved_count = 0
-    for task in all_translation_tasks:
-        ns = task['namespace']
-        lang = task['lang_code']
-        keys = task['keys_to_translate']
-        existing = task['existing_translations']
-        if ns in results_by_namespace_and_language and lang in results_by_namespace_and_language[ns]:
-            translated = results_by_namespace_and_language[ns][lang]
-            target_translations = {k: translated[k] for k in keys if k in translated}
-            final = existing.copy()
-            final.update(target_translations)
-            if save_namespace_translations(ns, lang, final):
-                saved_count += 1
-                log_progress(f"✓ {ns} -> {lang}: {len(target_translations)} 个新翻译")
-            else:
-                log_progress(f"✗ 保存失败: {ns} -> {lang}", "error")
+    log_progress(f"开始并发翻译 {len(all_requests)} 个请求...")
+    with TRACER.span('execution', 'orchestration', requests=len(all_requests)):
+        # 合并到其他键的重复文本在所属请求完成后补齐译文再写回；执行异常时也写回已能补齐的组合
+        try:
+            translator.execute_requests_concurrently(all_requests, on_pair_complete=translator.source_dedup.fan_out(save_pair))
+        finally:
+            translator.source_dedup.flush()
 
     log_progress(f"✓ 成功保存 {saved_count}/{len(all_translation_tasks)} 个翻译文件")
 
     log_section("智能翻译完成")
     log_progress("🎉 所有变更已处理完成！")
-    perform_cleanup_extra_keys()
+    with TRACER.span('cleanup', 'orchestration'):
+        perform_cleanup_extra_keys(workspace)
     log_section_end()
 
-def perform_cleanup_extra_keys():
+def perform_cleanup_extra_keys(workspace: Optional[TranslationWorkspace] = None):
     """清理所有命名空间与语言中的多余键，并保存更新"""
     # 清理多余的键值对
     log_progress("开始清理多余的键值对...")
@@ -1840,7 +5853,7 @@ def perform_cleanup_extra_keys():
 
     for namespace in all_namespaces:
         # 获取源字典（参考翻译）
-        source_dict = get_merged_reference_translations(namespace)
+        source_dict = get_merged_reference_translations(namespace, workspace)
         if not source_dict:
             log_progress(f"⚠️ 命名空间 {namespace} 没有源字典", "warning")
             continue
@@ -1850,7 +5863,7 @@ def perform_cleanup_extra_keys():
         # 获取所有目标语言
         for lang_code, lang_name in get_all_target_languages().items():
             # 加载现有翻译（仅检查 translate 目录；assets 在构建时合并，不参与完整性检查）
-            existing_translations = load_namespace_translations_from_translate(namespace, lang_code)
+            existing_translations = load_namespace_translations_from_translate(namespace, lang_code, workspace)
             if not existing_translations:
                 log_progress(f"⚠️ 未在 translate 目录找到翻译文件: {namespace} -> {lang_code}", "warning")
                 continue
@@ -1870,7 +5883,7 @@ def perform_cleanup_extra_keys():
 
                 # 保存更新后的翻译（保存到 translate 目录）
                 try:
-                    if save_namespace_translations(namespace, lang_code, existing_translations):
+                    if save_namespace_translations(namespace, lang_code, existing_translations, workspace):
                         cleaned_count += 1
                         total_keys_removed += len(keys_to_remove)
                         log_progress(f"✓ 清理 {namespace} -> {lang_code}: 移除了 {len(keys_to_remove)} 个多余键", "info")
@@ -1883,49 +5896,54 @@ def perform_cleanup_extra_keys():
 
     log_progress(f"清理完成，共清理了 {cleaned_count} 个文件，移除了 {total_keys_removed} 个多余键")
 
-def continue_full_translation(translator, progress_tracker, namespaces):
-    """继续执行全量翻译的剩余逻辑 - 全并发版本"""
+def prepare_full_translation(translator, namespaces: List[str], workspace: Optional[TranslationWorkspace] = None
+                             ) -> Tuple[List[Dict], List['DeepSeekTranslator.TranslationRequest']]:
+    """收集全量翻译的任务并创建请求（不调用API）
+
+    Returns:
+        (翻译任务列表, 翻译请求列表)；所有内容已翻译时均为空
+    """
     log_progress("开始准备所有翻译请求...")
 
     # 第一阶段：收集所有需要翻译的内容
     all_translation_tasks = []
     force_translate = os.getenv('FORCE_TRANSLATE', 'false').lower() == 'true'
 
-    for namespace in namespaces:
-        # 使用合并后的参考翻译
-        source_dict = get_merged_reference_translations(namespace)
-        if not source_dict:
-            log_progress(f"跳过命名空间 {namespace}：无法加载合并参考翻译", "warning")
-            continue
+    with TRACER.span('source_merge', 'orchestration'):
+        for namespace in namespaces:
+            # 使用合并后的参考翻译
+            source_dict = get_merged_reference_translations(namespace, workspace)
+            if not source_dict:
+                log_progress(f"跳过命名空间 {namespace}：无法加载合并参考翻译", "warning")
+                continue
 
-        log_progress(f"✓ 命名空间 {namespace}：{len(source_dict)} 个键值对")
+            log_progress(f"✓ 命名空间 {namespace}：{len(source_dict)} 个键值对")
 
-        for lang_code, lang_name in get_all_target_languages().items():
-            # 检查是否需要翻译
-            if not needs_translation(namespace, lang_code, source_dict):
-                continue
+            for lang_code, lang_name in get_all_target_languages().items():
+                # 检查是否需要翻译
+                if not needs_translation(namespace, lang_code, source_dict, workspace):
+                    continue
 
-            # 加载已有翻译（仅从translate目录）
-            existing_translate = load_namespace_translations_from_translate(namespace, lang_code)
+                # 加载已有翻译（仅从translate目录）
+                existing_translate = load_namespace_translations_from_translate(namespace, lang_code, workspace)
 
-            # 确定需要翻译的内容
-            if force_translate:
-                keys_to_translate = source_dict.copy()
-            else:
-                keys_to_translate = {k: v for k, v in source_dict.items() if k not in existing_translate}
+                # 确定需要翻译的内容
+                if force_translate:
+                    keys_to_translate = source_dict.copy()
+                else:
+                    keys_to_translate = {k: v for k, v in source_dict.items() if k not in existing_translate}
 
-            if keys_to_translate:
-                all_translation_tasks.append({
-                    'namespace': namespace,
-                    'lang_code': lang_code,
-                    'lang_name': lang_name,
-                    'texts': keys_to_translate,
-                    'existing_translations': existing_translate
-                })
+                if keys_to_translate:
+                    all_translation_tasks.append({
+                        'namespace': namespace,
+                        'lang_code': lang_code,
+                        'lang_name': lang_name,
+                        'texts': keys_to_translate,
+                        'existing_translations': existing_translate
+                    })
 
     if not all_translation_tasks:
-        log_progress("所有内容已翻译完成")
-        return
+        return [], []
 
     log_progress(f"✓ 准备完成：{len(all_translation_tasks)} 个翻译任务")
 
@@ -1933,64 +5951,84 @@ def continue_full_translation(translator, progress_tracker, namespaces):
     log_progress("准备翻译请求...")
     all_requests = []
 
-    for task in all_translation_tasks:
-        prepared_texts = translator.prepare_texts_for_translation(task['texts'])
-        target_languages = [(task['lang_code'], task['lang_name'])]
+    with TRACER.span('planning', 'orchestration'):
+        planned_tasks = translator.source_dedup.deduplicate(all_translation_tasks, 'texts', translator.batch_planner.output_tokens)
+        for task, target_languages in group_translation_tasks(translator, planned_tasks, 'texts'):
+            prepared_texts = translator.prepare_texts_for_translation(task['texts'])
 
-        # 创建翻译请求
-        requests = translator.prepare_translation_requests(prepared_texts, target_languages, batch_size=40, namespace=task['namespace'])
+            # 创建翻译请求（启用多语言分组时，待翻译文本相同的语言合并为分组请求）
+            requests = translator.prepare_translation_requests(prepared_texts, target_languages, namespace=task['namespace'])
 
-        # 为每个请求添加任务信息
-        for request in requests:
-            request.namespace = task['namespace']
-            request.existing_translations = task['existing_translations']
-            all_requests.append(request)
+            # 为每个请求添加任务信息
+            for request in requests:
+                request.namespace = task['namespace']
+                all_requests.append(request)
 
     log_progress(f"✓ 生成了 {len(all_requests)} 个翻译请求")
+    return all_translation_tasks, all_requests
 
-    # 第三阶段：一次性并发执行所有请求
-    log_progress("开始全并发翻译...")
-    results_by_namespace_and_language = translator.execute_requests_concurrently(all_requests)
+def continue_full_translation(translator, progress_tracker, namespaces, workspace: Optional[TranslationWorkspace] = None):
+    """继续执行全量翻译的剩余逻辑 - 全并发版本"""
+    all_translation_tasks, all_requests = prepare_full_translation(translator, namespaces, workspace)
+    if not all_translation_tasks:
+        log_progress("所有内容已翻译完成")
+        return
+    force_translate = os.getenv('FORCE_TRANSLATE', 'false').lower() == 'true'
 
-    # 第四阶段：保存翻译结果
-    log_progress("保存翻译结果...")
+    tasks_by_pair = {(task['namespace'], task['lang_code']): task for task in all_translation_tasks}
     saved_count = 0
 
-    for task in all_translation_tasks:
-        namespace = task['namespace']
-        lang_code = task['lang_code']
-        existing_translations = task['existing_translations']
-
-        # 获取该任务的翻译结果
-        if (namespace in results_by_namespace_and_language and
-            lang_code in results_by_namespace_and_language[namespace]):
-            translated_results = results_by_namespace_and_language[namespace][lang_code]
-
-            # 计算真正的新翻译数量
-            if force_translate:
-                # 强制翻译模式：所有翻译结果都是新的（覆盖现有翻译）
-                final_translations = translated_results
-                new_translations_count = len(translated_results)
-            else:
-                # 增量翻译模式：translated_results中的所有键都是新的
-                # （因为keys_to_translate已经过滤掉了existing_translations中存在的键）
-                new_translations_count = len(translated_results)
-                final_translations = existing_translations.copy()
-                final_translations.update(translated_results)
-
-            # 保存翻译结果
-            if save_namespace_translations(namespace, lang_code, final_translations):
-                saved_count += 1
-                log_progress(f"✓ {namespace} -> {lang_code}: {new_translations_count} 个新翻译")
+    # 保存阶段：某个命名空间/语言的所有批次完成后立即保存，不等待其他仍在重试的请求
+    def save_pair(namespace: str, lang_code: str, translated_results: Dict[str, str]):
+        nonlocal saved_count
+        with TRACER.span('save', 'orchestration', namespace=namespace, language=lang_code):
+            task = tasks_by_pair.pop((namespace, lang_code), None)
+            if task is None:
+                return
+            existing_translations = task['existing_translations']
+
+            # 获取该任务的翻译结果
+            if translated_results:
+                # 计算真正的新翻译数量
+                if force_translate:
+                    # 强制翻译模式：所有翻译结果都是新的（覆盖现有翻译）
+                    final_translations = translated_results
+                    new_translations_count = len(translated_results)
+                else:
+                    # 增量翻译模式：translated_results中的所有键都是新的
+                    # （因为keys_to_translate已经过滤掉了existing_translations中存在的键）
+                    new_translations_count = len(translated_results)
+                    final_translations = existing_translations.copy()
+                    final_translations.update(translated_results)
+
+                # 保存翻译结果
+                if save_namespace_translations(namespace, lang_code, final_translations, workspace):
+                    if workspace is not None:
+                        workspace.record_translated(namespace, lang_code, translated_results)
+                        workspace.flush_pair(namespace, lang_code)
+                    saved_count += 1
+                    log_progress(f"✓ {namespace} -> {lang_code}: {new_translations_count} 个新翻译")
+                else:
+                    log_progress(f"✗ 保存失败: {namespace} -> {lang_code}", "error")
             else:
-                log_progress(f"✗ 保存失败: {namespace} -> {lang_code}", "error")
-        else:
-            log_progress(f"✗ 未找到翻译结果: {namespace} -> {lang_code}", "warning")
+                log_progress(f"✗ 未找到翻译结果: {namespace} -> {lang_code}", "warning")
+
+    # 第三阶段：一次性并发执行所有请求
+    log_progress("开始全并发翻译...")
+    with TRACER.span('execution', 'orchestration', requests=len(all_requests)):
+        # 合并到其他键的重复文本在所属请求完成后补齐译文再写回；执行异常时也写回已能补齐的组合
+        try:
+            translator.execute_requests_concurrently(all_requests, on_pair_complete=translator.source_dedup.fan_out(save_pair))
+        finally:
+            translator.source_dedup.flush()
+    for namespace, lang_code in tasks_by_pair:
+        log_progress(f"✗ 未找到翻译结果: {namespace} -> {lang_code}", "warning")
 
     log_progress(f"🎉 全并发翻译完成！成功保存 {saved_count}/{len(all_translation_tasks)} 个翻译文件")
 
     # 翻译完成后统一执行清理
-    perform_cleanup_extra_keys()
+    with TRACER.span('cleanup', 'orchestration'):
+        perform_cleanup_extra_keys(workspace)
     flush_logs()
 
 if __name__ == "__main__":